@@ -4,6 +4,8 @@ import numpy as np
 import os
 import math
 
+from speech_level import measure_file
+
 def calculate_rms(file_path):
     try:
         data, samplerate = sf.read(file_path)
@@ -40,7 +42,11 @@ for f in files:
              print(f"File: {f}")
              print(f"  RMS Level: {db:.4f} dBFS")
              print(f"  Linear RMS: {rms:.6f}")
-             results.append({'file': f, 'db': db, 'rms': rms})
+             # RMS above includes pauses; the active speech level only counts speech-active samples
+             level = measure_file(f)
+             print(f"  Active Speech Level (P.56): {level['active_db']:.4f} dBFS "
+                   f"(activity {level['activity'] * 100:.1f}%)")
+             results.append({'file': f, 'db': db, 'rms': rms, 'active_db': level['active_db']})
     else:
         print(f"File not found: {f}")
 
@@ -56,8 +62,19 @@ if len(results) >= 2:
         if abs(diff) > max_diff:
             max_diff = abs(diff)
             
-    if max_diff > 0.5:
-        print("\n[WARNING] Levels differ by > 0.5 dB!")
+    print("\n--- Comparison (Active Speech Level) ---")
+    print(f"Baseline: {base['file']} ({base['active_db']:.4f} dBFS)")
+    max_active_diff = 0
+    for r in results[1:]:
+        diff = r['active_db'] - base['active_db']
+        print(f"vs {r['file']}: {diff:+.4f} dB")
+        if abs(diff) > max_active_diff:
+            max_active_diff = abs(diff)
+
+    # Normalization is judged on the active speech level: whole-file RMS also counts pauses
+    print(f"\nLargest difference: {max_active_diff:.4f} dB active speech level, {max_diff:.4f} dB whole-file RMS")
+    if max_active_diff > 0.5:
+        print("[WARNING] Active speech levels differ by > 0.5 dB!")
         print("Normalization recommended.")
     else:
-        print("\n[OK] Levels are matched within 0.5 dB.")
+        print("[OK] Active speech levels are matched within 0.5 dB.")
@@ -0,0 +1,488 @@
+import argparse
+import glob
+import json
+import os
+import time
+import unicodedata
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Scoring constants mirrored from AutoTrackingPhase.jsx (v1.0.33)
+IGNORE_SECONDS = 30
+STABILITY_WINDOW_SECONDS = 30
+GUESSING_EXCURSION_DB = 5.0
+DEFAULT_SPEECH_LEVEL = 75
+START_OFFSET_DB = 15
+
+
+def to_fixed(value, digits):
+    """Equivalent of parseFloat(value.toFixed(digits)) in JavaScript."""
+    # toFixed rounds the exact binary value half away from zero, unlike round()
+    quantum = Decimal(1).scaleb(-digits)
+    return float(Decimal(value).quantize(quantum, rounding=ROUND_HALF_UP))
+
+
+def to_fixed_array(values, digits):
+    """Vectorised to_fixed(); values within float noise of a .5 tie fall back to Decimal."""
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** digits
+    scaled = np.abs(values) * scale
+    rounded = np.copysign(np.floor(scaled + 0.5) / scale, values)
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in near_tie:
+        rounded[i] = to_fixed(values[i], digits)
+    return rounded
+
+
+def _sequential_sum(values):
+    # Array.reduce adds left to right; np.sum uses pairwise summation which can
+    # differ in the last bit and flip a toFixed() rounding.
+    if len(values) == 0:
+        return 0.0
+    return float(np.cumsum(values)[-1])
+
+
+def history_arrays(history):
+    """Converts a [{t, noise}, ...] history into (t, noise) float64 arrays."""
+    if not history:
+        return np.empty(0), np.empty(0)
+    n = len(history)
+    t = np.fromiter((pt['t'] for pt in history), dtype=np.float64, count=n)
+    noise = np.fromiter((pt['noise'] for pt in history), dtype=np.float64, count=n)
+    return t, noise
+
+
+def local_extrema(values):
+    """Indices of strict peaks/valleys, i.e. where the sign of the slope flips."""
+    if len(values) < 3:
+        return np.empty(0, dtype=np.int64)
+    slope = np.sign(np.diff(values))
+    return np.flatnonzero(slope[:-1] * slope[1:] < 0) + 1
+
+
+def flatten_histories(histories):
+    """Concatenates (t, noise) pairs into flat arrays plus session offsets (len + 1)."""
+    lengths = np.array([len(t) for t, _ in histories], dtype=np.int64)
+    offsets = np.zeros(len(histories) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if not histories:
+        return np.empty(0), np.empty(0), offsets
+    t = np.concatenate([t for t, _ in histories])
+    noise = np.concatenate([noise for _, noise in histories])
+    return t, noise, offsets
+
+
+def session_ids(offsets):
+    """Session number of every point in a flat ragged array."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def ragged_reversals(t, noise, offsets, ignore_seconds=IGNORE_SECONDS, debounce_seconds=0.0):
+    """Reversal detection over many sessions concatenated into flat arrays.
+
+    Same semantics as identifyReversalPoints applied to each session: points with
+    t <= ignore_seconds are dropped first (pass None to keep all, like the legacy loop
+    in generateFinalResults), then strict peaks/valleys are found by sign-of-diff.
+    With debounce_seconds > 0 a reversal is only kept if it comes more than
+    debounce_seconds after the previously kept one, like the 1000 ms guardrail in
+    the tracking loop.
+
+    Returns (indices into the flat arrays, reversal count per session).
+    """
+    n_sessions = len(offsets) - 1
+    if ignore_seconds is None:
+        kept = None
+        values = noise
+        starts = offsets[1:-1]
+    else:
+        kept = np.flatnonzero(t > ignore_seconds)
+        values = noise[kept]
+        starts = np.searchsorted(kept, offsets[1:-1])
+
+    diff = np.diff(values)
+    slope = (diff > 0).astype(np.int8) - (diff < 0)
+    # A slope between two different sessions must never pair into a reversal
+    boundaries = starts[(starts > 0) & (starts < len(values))] - 1
+    slope[boundaries] = 0
+    indices = np.flatnonzero(slope[:-1] * slope[1:] < 0) + 1
+    if kept is not None:
+        indices = kept[indices]
+
+    session = np.searchsorted(offsets, indices, side='right') - 1
+    if debounce_seconds > 0 and len(indices) > 0:
+        keep = _debounce_reversals(t[indices], session, n_sessions, debounce_seconds)
+        indices, session = indices[keep], session[keep]
+
+    return indices, np.bincount(session, minlength=n_sessions)
+
+
+def _debounce_reversals(times, reversal_session, n_sessions, debounce_seconds):
+    # The guardrail is sequential within a session, so walk the k-th reversal of
+    # every session at once: one vectorised step per reversal rank.
+    counts = np.bincount(reversal_session, minlength=n_sessions)
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(len(times)) - starts[reversal_session]
+
+    grid = np.full((n_sessions, counts.max()), np.nan)
+    grid[reversal_session, rank] = times
+    accepted = np.zeros(grid.shape, dtype=bool)
+    last = np.full(n_sessions, -np.inf)
+    for k in range(grid.shape[1]):
+        ok = grid[:, k] - last > debounce_seconds
+        accepted[:, k] = ok
+        last = np.where(ok, grid[:, k], last)
+    return accepted[reversal_session, rank]
+
+
+def identify_reversal_points(t, noise, ignore_seconds=IGNORE_SECONDS):
+    """Port of identifyReversalPoints: returns (x, y) of reversals with t > ignore_seconds."""
+    valid = t > ignore_seconds
+    valid_t = t[valid]
+    valid_noise = noise[valid]
+    idx = local_extrema(valid_noise)
+    return valid_t[idx], valid_noise[idx]
+
+
+def calculate_average_hant(t, noise, speech_level, ignore_seconds=IGNORE_SECONDS):
+    """Port of calculateAverageHANT: returns (aBNL, aANL, count)."""
+    _, levels = identify_reversal_points(t, noise, ignore_seconds)
+    if len(levels) == 0:
+        return None, None, 0
+    a_bnl = _sequential_sum(levels) / len(levels)
+    return a_bnl, a_bnl - speech_level, len(levels)
+
+
+def calculate_average_excursion_height(levels):
+    """Port of calculateAverageExcursionHeight over reversal levels (y values)."""
+    if len(levels) < 2:
+        return 0.0
+    heights = np.abs(np.diff(levels))
+    return _sequential_sum(heights) / len(heights)
+
+
+def calculate_stability_sd(t, noise, duration, window_seconds=STABILITY_WINDOW_SECONDS):
+    """Port of calculateStabilitySD: sample SD of noise levels in the last window_seconds."""
+    start = max(0, duration - window_seconds)
+    values = noise[t >= start]
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean = _sequential_sum(values) / n
+    variance = _sequential_sum((values - mean) ** 2) / (n - 1)
+    return float(np.sqrt(variance))
+
+
+def stabilization_interpretation(seconds):
+    if seconds is None:
+        return "Did Not Stabilize"
+    if seconds < 10:
+        return "Suspiciously Fast (Check for 'Set-and-Forget' behavior)"
+    if seconds < 30:
+        return "High Certainty (Fast Convergence)"
+    if seconds <= 60:
+        return "Normal"
+    return "Delayed (High Difficulty/Uncertainty)"
+
+
+def stability_status(stability_sd, duration, avg_excursion_height):
+    if duration < 30:
+        return "Insufficient Data (<30s)"
+    if stability_sd <= 2.0:
+        status = "High"
+    elif stability_sd <= 4.0:
+        status = "Moderate"
+    else:
+        status = "Low (Erratic/Drifting)"
+    if avg_excursion_height > GUESSING_EXCURSION_DB:
+        status += " (Possible Guessing)"
+    return status
+
+
+def reversal_stats(levels):
+    """SE/CI of reversal levels after dropping the first 3 (needs 4 remaining)."""
+    valid = levels[3:]
+    n = len(valid)
+    if n < 4:
+        return 0.0, 0.0, 0.0
+    mean = _sequential_sum(valid) / n
+    std_dev = float(np.sqrt(_sequential_sum((valid - mean) ** 2) / (n - 1)))
+    se = std_dev / np.sqrt(n)
+    return float(se), float(1.96 * se), std_dev
+
+
+def generate_final_results(t, noise, speech_level, ignore_seconds=IGNORE_SECONDS):
+    """Port of generateFinalResults, returning the same {score, validity, meta} structure."""
+    if len(t) > 0:
+        final_t, e_bnl = float(t[-1]), float(noise[-1])
+    else:
+        final_t, e_bnl = 0.0, float(speech_level - START_OFFSET_DB)
+    duration = to_fixed(final_t, 1)
+    e_anl = e_bnl - speech_level
+
+    _, reversal_levels = identify_reversal_points(t, noise, ignore_seconds)
+    a_bnl, a_anl, _ = calculate_average_hant(t, noise, speech_level, ignore_seconds)
+
+    # Legacy reversals over the whole history (stats and stabilization time)
+    legacy_idx = local_extrema(noise)
+    legacy_levels = noise[legacy_idx]
+    stabilization_seconds = float(t[legacy_idx[2]]) if len(legacy_idx) >= 3 else None
+
+    se, ci95, _ = reversal_stats(legacy_levels)
+
+    stability_sd = calculate_stability_sd(t, noise, duration)
+    stability_sd_formatted = to_fixed(stability_sd, 2)
+    avg_excursion_height = calculate_average_excursion_height(reversal_levels)
+    status = stability_status(stability_sd, duration, avg_excursion_height)
+
+    return {
+        'score': {
+            'eANL': to_fixed(e_anl, 1),
+            'eBNL': to_fixed(e_bnl, 1)
+        },
+        'validity': {
+            'aANL': a_anl,
+            'aBNL': a_bnl,
+            'se': to_fixed(se, 2),
+            'ci95': to_fixed(ci95, 2),
+            'stability_status': status,
+            'stability_sd': stability_sd_formatted,
+            'avg_excursion_height': to_fixed(avg_excursion_height, 1),
+            'reliability_status': status,
+            'reliability_diff': stability_sd_formatted,
+            'stabilization_status': stabilization_interpretation(stabilization_seconds)
+        },
+        'meta': {
+            'speech_level': speech_level,
+            'reversal_count': len(legacy_levels),
+            'duration_seconds': duration,
+            'stabilization_seconds': to_fixed(stabilization_seconds, 1) if stabilization_seconds is not None else None
+        }
+    }
+
+
+def score_batch(t, noise, offsets, speech_levels, ignore_seconds=IGNORE_SECONDS):
+    """generate_final_results for a ragged batch of sessions, returned as columns.
+
+    Segment sums use np.bincount, which accumulates in index order just like
+    Array.reduce, so the columns agree with the per-session port exactly.
+    """
+    n = len(offsets) - 1
+    speech_levels = np.broadcast_to(np.asarray(speech_levels, dtype=np.float64), (n,))
+    session = session_ids(offsets)
+    lengths = np.diff(offsets)
+    has_points = lengths > 0
+    last = np.maximum(offsets[1:] - 1, 0)
+
+    final_t = np.where(has_points, t[last] if len(t) else 0.0, 0.0)
+    e_bnl = np.where(has_points, noise[last] if len(t) else 0.0, speech_levels - START_OFFSET_DB)
+    duration = to_fixed_array(final_t, 1)
+
+    # aHANT and excursion height from reversals after the ignore window
+    idx, count = ragged_reversals(t, noise, offsets, ignore_seconds)
+    rev_session = session[idx]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        a_bnl = np.bincount(rev_session, weights=noise[idx], minlength=n) / count
+        same = rev_session[1:] == rev_session[:-1]
+        heights = np.abs(np.diff(noise[idx]))[same]
+        height_sum = np.bincount(rev_session[1:][same], weights=heights, minlength=n)
+        avg_excursion_height = np.where(count >= 2, height_sum / (count - 1), 0.0)
+
+        # Legacy reversals over the whole history: stabilization time and SE
+        legacy_idx, legacy_count = ragged_reversals(t, noise, offsets, ignore_seconds=None)
+        legacy_session = session[legacy_idx]
+        rank = np.arange(len(legacy_idx)) - (np.cumsum(legacy_count) - legacy_count)[legacy_session]
+        stabilization_seconds = np.full(n, np.nan)
+        third = rank == 2
+        stabilization_seconds[legacy_session[third]] = t[legacy_idx[third]]
+
+        tail = rank >= 3
+        tail_session = legacy_session[tail]
+        tail_levels = noise[legacy_idx[tail]]
+        tail_n = np.maximum(legacy_count - 3, 0)
+        tail_mean = np.bincount(tail_session, weights=tail_levels, minlength=n) / tail_n
+        tail_ss = np.bincount(tail_session, weights=(tail_levels - tail_mean[tail_session]) ** 2, minlength=n)
+        se = np.where(tail_n >= 4, np.sqrt(tail_ss / (tail_n - 1)) / np.sqrt(tail_n), 0.0)
+
+        # Stability SD over the last 30 s of each session
+        late = t >= np.maximum(0, duration - STABILITY_WINDOW_SECONDS)[session]
+        late_session = session[late]
+        late_noise = noise[late]
+        late_n = np.bincount(late_session, minlength=n)
+        late_mean = np.bincount(late_session, weights=late_noise, minlength=n) / late_n
+        late_ss = np.bincount(late_session, weights=(late_noise - late_mean[late_session]) ** 2, minlength=n)
+        stability_sd = np.where(late_n >= 2, np.sqrt(late_ss / (late_n - 1)), 0.0)
+
+    a_bnl = np.where(count > 0, a_bnl, np.nan)
+    stability = [stability_status(sd, d, h) for sd, d, h in zip(stability_sd, duration, avg_excursion_height)]
+    stabilization = [stabilization_interpretation(None if np.isnan(s) else s) for s in stabilization_seconds]
+
+    return {
+        'eANL': to_fixed_array(e_bnl - speech_levels, 1),
+        'eBNL': to_fixed_array(e_bnl, 1),
+        'aANL': a_bnl - speech_levels,
+        'aBNL': a_bnl,
+        'se': to_fixed_array(se, 2),
+        'ci95': to_fixed_array(1.96 * se, 2),
+        'stability_status': np.array(stability),
+        'stability_sd': to_fixed_array(stability_sd, 2),
+        'avg_excursion_height': to_fixed_array(avg_excursion_height, 1),
+        'stabilization_status': np.array(stabilization),
+        'speech_level': speech_levels,
+        'reversal_count': legacy_count,
+        'duration_seconds': duration,
+        'stabilization_seconds': to_fixed_array(stabilization_seconds, 1)
+    }
+
+
+def batch_result(columns, i):
+    """Rebuilds the nested {score, validity, meta} result of session i from score_batch columns."""
+    def optional(value):
+        return None if np.isnan(value) else float(value)
+
+    speech_level = float(columns['speech_level'][i])
+    return {
+        'score': {
+            'eANL': float(columns['eANL'][i]),
+            'eBNL': float(columns['eBNL'][i])
+        },
+        'validity': {
+            'aANL': optional(columns['aANL'][i]),
+            'aBNL': optional(columns['aBNL'][i]),
+            'se': float(columns['se'][i]),
+            'ci95': float(columns['ci95'][i]),
+            'stability_status': str(columns['stability_status'][i]),
+            'stability_sd': float(columns['stability_sd'][i]),
+            'avg_excursion_height': float(columns['avg_excursion_height'][i]),
+            'reliability_status': str(columns['stability_status'][i]),
+            'reliability_diff': float(columns['stability_sd'][i]),
+            'stabilization_status': str(columns['stabilization_status'][i])
+        },
+        'meta': {
+            'speech_level': int(speech_level) if speech_level.is_integer() else speech_level,
+            'reversal_count': int(columns['reversal_count'][i]),
+            'duration_seconds': float(columns['duration_seconds'][i]),
+            'stabilization_seconds': optional(columns['stabilization_seconds'][i])
+        }
+    }
+
+
+def result_speech_level(result):
+    meta = result.get('meta') or {}
+    if meta.get('speech_level') is not None:
+        return meta['speech_level']
+    if result.get('mcl') is not None:
+        return result['mcl']
+    return DEFAULT_SPEECH_LEVEL
+
+
+def session_tests(data):
+    """Yields (test_id, result) for every test in an exported session that has a history."""
+    for test_id in ('A', 'B'):
+        result = data.get(f'results{test_id}')
+        if result and result.get('history'):
+            yield test_id, result
+
+
+def rescore_result(result):
+    t, noise = history_arrays(result['history'])
+    return generate_final_results(t, noise, result_speech_level(result))
+
+
+def compare_results(stored, rescored):
+    """Lists the fields where a stored (JS) result differs from the Python re-score."""
+    mismatches = []
+    for section in ('score', 'validity', 'meta'):
+        stored_section = stored.get(section) or {}
+        for key, value in rescored[section].items():
+            if key not in stored_section:
+                continue
+            expected = stored_section[key]
+            if isinstance(value, float) and isinstance(expected, (int, float)):
+                if not np.isclose(value, expected, rtol=0, atol=1e-9):
+                    mismatches.append((f'{section}.{key}', expected, value))
+            elif value != expected:
+                mismatches.append((f'{section}.{key}', expected, value))
+    return mismatches
+
+
+def find_session_files(paths, patterns=('ANL_Test_*.json',)):
+    """Files given directly, plus every file under the given directories matching one of `patterns`."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = set()
+            for pattern in patterns:
+                found.update(glob.glob(os.path.join(path, '**', pattern), recursive=True))
+            # session_codec.py --to-json writes *.decoded.json copies next to the originals
+            files.extend(sorted(f for f in found if not f.endswith('.decoded.json')))
+        else:
+            files.append(path)
+    return files
+
+
+def normalize_patient(name):
+    """Case, accent and whitespace-insensitive patient key; file names use '_' for spaces."""
+    text = unicodedata.normalize('NFKD', str(name).replace('_', ' '))
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(text.casefold().split())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score exported ANL_Test_*.json sessions offline.")
+    parser.add_argument('paths', nargs='*', default=['.'], help="Session files or directories to scan")
+    parser.add_argument('--verify', action='store_true', help="Compare re-scored values with the stored JS results")
+    parser.add_argument('--output', help="Write re-scored results as JSON lines to this file")
+    args = parser.parse_args()
+
+    files = find_session_files(args.paths)
+    if not files:
+        print("No session files found.")
+        return
+
+    print(f"Re-scoring {len(files)} session files...")
+    tests = []
+    for path in files:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        for test_id, result in session_tests(data):
+            tests.append((path, test_id, result))
+
+    histories = [history_arrays(result['history']) for _, _, result in tests]
+    t, noise, offsets = flatten_histories(histories)
+    speech_levels = [result_speech_level(result) for _, _, result in tests]
+
+    start = time.perf_counter()
+    columns = score_batch(t, noise, offsets, speech_levels)
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    mismatched = 0
+    for i, (path, test_id, result) in enumerate(tests):
+        rescored = batch_result(columns, i)
+        rows.append({'file': path, 'test': test_id, **rescored})
+        if args.verify:
+            mismatches = compare_results(result, rescored)
+            if mismatches:
+                mismatched += 1
+                print(f"[MISMATCH] {path} (Test {test_id})")
+                for field, expected, actual in mismatches:
+                    print(f"  {field}: stored={expected!r} rescored={actual!r}")
+
+    rate = len(rows) / elapsed if elapsed > 0 else float('inf')
+    print(f"Re-scored {len(rows)} tests in {elapsed:.2f}s ({rate:.0f} tests/s)")
+    if args.verify:
+        if mismatched:
+            print(f"[WARNING] {mismatched} tests differ from the stored results.")
+        else:
+            print("[OK] All re-scored tests match the stored results.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for row in rows:
+                f.write(json.dumps(row) + '\n')
+        print(f"Saved re-scored results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,381 @@
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from matplotlib.patches import FancyBboxPatch
+from matplotlib.text import Annotation
+
+from anl_scoring import find_session_files, to_fixed
+from significance import calculate_significance
+
+REPORT_VERSION = "v1.0.33"
+PAGE_SIZE = (8.27, 11.69)  # A4 portrait, inches
+MAX_METRICS = 5
+
+# Print colours used by exportPDF (white page, dark text)
+TEXT = '#000000'
+MUTED = '#333333'
+FAINT = '#64748b'
+GREEN = '#4ade80'
+YELLOW = '#facc15'
+RED = '#f87171'
+GREY = '#94a3b8'
+SPEECH = '#22c55e'
+NOISE = '#3b82f6'
+GRID = '#cbd5e1'
+
+# Use the PDF core Helvetica: text stays selectable and nothing has to be subset
+# and embedded per report (subsetting a TrueType font dominated render time)
+matplotlib.rcParams.update({'pdf.use14corefonts': True, 'font.family': 'sans-serif',
+                            'font.sans-serif': ['Helvetica', 'DejaVu Sans'], 'pdf.compression': 6})
+logging.getLogger('matplotlib.font_manager').setLevel(logging.ERROR)
+
+
+def js_number(value):
+    """String form of a number as JS template literals print it (76, not 76.0)."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def score_color(anl):
+    # Same boundaries as calculateScore in Results.jsx
+    if anl >= -7:
+        return GREEN
+    if anl >= -13:
+        return YELLOW
+    return RED
+
+
+def interpretation(diff):
+    """getInterpretation from Results.jsx."""
+    if abs(diff) < 3:
+        return "No Significant Change", GREY
+    direction = "Improvement" if diff > 0 else "Decline"
+    significance = "Significant" if abs(diff) >= 4 else "Likely"
+    confidence = "95% Confidence" if abs(diff) >= 4 else "80% Confidence"
+    return f"{significance} {direction} ({confidence})", GREEN if diff > 0 else RED
+
+
+def significance_summary(result_a, result_b):
+    """Significance line shown under the outcome, or None when calculateSignificance has no diff."""
+    if not result_a.get('validity') or not result_b.get('validity'):
+        return None
+    sig = calculate_significance([result_a['score']['eANL']], [result_b['score']['eANL']],
+                                 [result_a['validity'].get('se') or 0], [result_b['validity'].get('se') or 0])
+    status = str(sig['status'][0])
+    if not status:
+        return None
+    improvement = result_b['score']['eANL'] - result_a['score']['eANL'] > 0
+    color = {'Strong': GREEN if improvement else RED, 'Moderate': YELLOW if improvement else RED}.get(status, GREY)
+    diff = js_number(float(sig['diff'][0]))
+    level = int(sig['confidence_level'][0])
+    if level == 95:
+        detail = f"Difference: {diff} dB  |  > Critical Limit (95%): {js_number(float(sig['critical_difference_95'][0]))} dB"
+    elif level == 80:
+        detail = f"Difference: {diff} dB  |  > Critical Limit (80%): {js_number(float(sig['critical_difference_80'][0]))} dB"
+    else:
+        detail = f"Diff: {diff} dB < Critical Limit (80%): {js_number(float(sig['critical_difference_80'][0]))} dB"
+    return str(sig['message'][0]), detail, color
+
+
+class ReportTemplate:
+    """One A4 figure with every artist created up front.
+
+    Each report only updates texts, colours and line data before saving, so
+    layout, fonts and glyph caches are built once per worker process.
+    """
+
+    def __init__(self):
+        self.fig = plt.figure(figsize=PAGE_SIZE)
+        fig = self.fig
+        self.clinic = fig.text(0.5, 0.965, "", ha='center', fontsize=16, weight='bold', color=TEXT)
+        self.provider = fig.text(0.5, 0.948, "", ha='center', fontsize=9, color=MUTED)
+        fig.text(0.06, 0.915, "Hearing Aid Noise Tolerance Test Report", fontsize=14, weight='bold', color=TEXT)
+        fig.text(0.595, 0.915, REPORT_VERSION, fontsize=8, color=FAINT)
+        self.patient = fig.text(0.94, 0.922, "", ha='right', fontsize=9, color=MUTED)
+        self.date = fig.text(0.94, 0.908, "", ha='right', fontsize=9, color=MUTED)
+        fig.add_artist(plt.Line2D([0.06, 0.94], [0.898, 0.898], color=GRID, lw=0.8))
+        self.heading = fig.text(0.5, 0.872, "", ha='center', fontsize=12, weight='bold', color=TEXT)
+
+        self.cards = [self._build_card(x) for x in (0.06, 0.52)]
+        self.outcome = self._build_outcome()
+        self.graph_titles = []
+        self.graphs = [self._build_graph(x) for x in (0.06, 0.52)]
+        self.graph_heading = fig.text(0.5, 0.345, "Tracking History", ha='center', fontsize=12, weight='bold',
+                                      color=TEXT)
+
+    def _build_card(self, x):
+        fig = self.fig
+        width, top, bottom = 0.42, 0.855, 0.555
+        card = {
+            'box': fig.add_artist(FancyBboxPatch((x, bottom), width, top - bottom, boxstyle='round,pad=0,rounding_size=0.01',
+                                                 fc='white', ec=TEXT, lw=0.8, transform=fig.transFigure)),
+            'title': fig.text(x + 0.02, top - 0.03, "", fontsize=11, weight='bold', color=TEXT),
+            'labels': [], 'values': [],
+        }
+        card['rule'] = fig.add_artist(plt.Line2D([x + 0.02, x + width - 0.02], [top - 0.04, top - 0.04],
+                                                 color=GREY, lw=0.6))
+        # Up to five metrics share the row, like the flex .score-display
+        for i in range(MAX_METRICS):
+            card['labels'].append(fig.text(x, top - 0.065, "", fontsize=7, color=MUTED))
+            card['values'].append(fig.text(x, top - 0.088, "", fontsize=11, weight='bold', color=TEXT))
+        card['confidence'] = fig.text(x, top - 0.103, "", fontsize=6, color=GREEN)
+        card['stabilization'] = fig.text(x + width - 0.02, top - 0.115, "", ha='right', fontsize=6, color=MUTED)
+        card['score_box'] = fig.add_artist(FancyBboxPatch((x + 0.03, top - 0.205), width - 0.06, 0.08,
+                                                          boxstyle='round,pad=0,rounding_size=0.01', fc='white',
+                                                          ec=GREEN, lw=1.6, transform=fig.transFigure))
+        card['score_label'] = fig.text(x + width / 2, top - 0.145, "HANT Score", ha='center', fontsize=9, color=TEXT)
+        card['score'] = fig.text(x + width / 2, top - 0.192, "", ha='center', fontsize=24, weight='bold', color=GREEN)
+        card['reason'] = fig.text(x + 0.02, top - 0.228, "", fontsize=7, color=FAINT)
+        card['stability'] = fig.text(x + 0.02, top - 0.275, "", fontsize=8, color=MUTED, va='bottom')
+        # Anchored to the end of the prefix, like the inline <strong> in the card
+        card['stability_value'] = fig.add_artist(Annotation("", xy=(1, 0), xycoords=card['stability'],
+                                                            xytext=(3, 0), textcoords='offset points',
+                                                            fontsize=8, weight='bold', color=GREEN, va='bottom'))
+        card['x'], card['width'] = x, width
+        return card
+
+    def _build_outcome(self):
+        fig = self.fig
+        return {
+            'box': fig.add_artist(FancyBboxPatch((0.15, 0.375), 0.70, 0.16, boxstyle='round,pad=0,rounding_size=0.01',
+                                                 fc='white', ec=TEXT, lw=0.8, transform=fig.transFigure)),
+            'title': fig.text(0.5, 0.51, "Outcome", ha='center', fontsize=11, weight='bold', color=TEXT),
+            'benefit': fig.text(0.5, 0.485, "", ha='center', fontsize=10, color=TEXT),
+            'interpretation': fig.text(0.5, 0.465, "", ha='center', fontsize=10, weight='bold', color=GREY),
+            'sig_box': fig.add_artist(FancyBboxPatch((0.22, 0.405), 0.56, 0.045, boxstyle='round,pad=0,rounding_size=0.006',
+                                                     fc='white', ec=GREY, lw=0.8, transform=fig.transFigure)),
+            'sig_message': fig.text(0.5, 0.432, "", ha='center', fontsize=9, weight='bold', color=GREY),
+            'sig_detail': fig.text(0.5, 0.414, "", ha='center', fontsize=7.5, color=MUTED),
+            'note': fig.text(0.5, 0.385, "(Higher HANT scores indicate better acceptance of background noise)",
+                             ha='center', fontsize=7.5, style='italic', color=MUTED),
+        }
+
+    def _build_graph(self, x):
+        """TestGraph.jsx: 0-100 dB, gridlines every 25 dB, dashed speech line, noise path."""
+        ax = self.fig.add_axes([x + 0.05, 0.08, 0.36, 0.22])
+        self.graph_titles.append(self.fig.text(x + 0.23, 0.315, "", ha='center', fontsize=9, weight='bold', color=TEXT))
+        ax.set_ylim(0, 100)
+        ax.set_yticks([0, 25, 50, 75, 100])
+        ax.grid(True, color=GRID, lw=0.6)
+        ax.tick_params(labelsize=7, colors=MUTED)
+        ax.set_xlabel("Time (seconds)", fontsize=8, weight='bold', color=MUTED)
+        ax.set_ylabel("Level (dB)", fontsize=8, weight='bold', color=MUTED)
+        for side in ('top', 'right'):
+            ax.spines[side].set_visible(False)
+        speech = ax.axhline(0, color=SPEECH, lw=1.2, ls=(0, (5, 5)))
+        speech_label = ax.text(1.01, 0, "Speech", transform=ax.get_yaxis_transform(), fontsize=7, color=SPEECH,
+                               va='center')
+        noise, = ax.plot([], [], color=NOISE, lw=1.0)
+        return {'ax': ax, 'speech': speech, 'speech_label': speech_label, 'noise': noise}
+
+    def _fill_card(self, card, label, data):
+        visible = data is not None
+        for artist in [card['box'], card['title'], card['rule'], card['stabilization'], card['confidence'],
+                       card['score_box'], card['score_label'], card['score'], card['reason'], card['stability'],
+                       card['stability_value']] + card['labels'] + card['values']:
+            artist.set_visible(visible)
+        if not visible:
+            return
+
+        anl = data['bnl'] - data['mcl']
+        color = score_color(anl)
+        card['title'].set_text(label)
+        items = [("Speech Level", f"{js_number(data['mcl'])} dB"), ("Noise Level", f"{js_number(data['bnl'])} dB")]
+        card['confidence'].set_text("")
+        if data.get('avgExcursion') is not None:
+            items.append(("Excursion", f"{js_number(data['avgExcursion'])} dB"))
+            if data['avgExcursion'] < 4:
+                card['confidence'].set_text("High Confidence")
+                card['confidence'].set_color(GREEN)
+            elif data['avgExcursion'] > 5:
+                card['confidence'].set_text("Low Confidence")
+                card['confidence'].set_color(RED)
+        validity = data.get('validity') or {}
+        if data.get('score') and validity:
+            a_anl = validity.get('aANL')
+            items.append(("aHANT", f"{to_fixed(a_anl, 1):.1f} dB" if a_anl is not None else "N/A"))
+
+        card['stabilization'].set_text("")
+        meta = data.get('meta') or {}
+        if 'stabilization_seconds' in meta:
+            seconds = meta['stabilization_seconds']
+            items.append(("Stabilized In", f"{js_number(seconds)}s" if seconds is not None else "Did Not Stabilize"))
+            if seconds is not None and validity.get('stabilization_status'):
+                card['stabilization'].set_text(validity['stabilization_status'])
+
+        step = (card['width'] - 0.04) / len(items)
+        # The confidence note sits under the Excursion value (third item when present)
+        card['confidence'].set_x(card['x'] + 0.02 + 2 * step)
+        for i in range(MAX_METRICS):
+            text, value = items[i] if i < len(items) else ("", "")
+            card['labels'][i].set_x(card['x'] + 0.02 + i * step)
+            card['values'][i].set_x(card['x'] + 0.02 + i * step)
+            card['labels'][i].set_text(text)
+            card['values'][i].set_text(value)
+            card['values'][i].set_color(RED if value == "Did Not Stabilize" else TEXT)
+            card['values'][i].set_fontsize(8 if value == "Did Not Stabilize" else 11 if len(items) <= 4 else 9.5)
+
+        card['score_box'].set_edgecolor(color)
+        card['score'].set_text(f"{js_number(anl)} dB")
+        card['score'].set_color(color)
+        card['reason'].set_text(f"Stop Reason: {data['reason']}" if data.get('reason') else "")
+
+        status = validity.get('stability_status') or validity.get('reliability_status')
+        if status:
+            prefix = "Stability:" if validity.get('stability_status') else "Reliability:"
+            if validity.get('stability_status') and validity.get('stability_sd') is not None:
+                suffix = f"  (SD: {js_number(validity['stability_sd'])} dB)"
+            elif not validity.get('stability_status') and validity.get('reliability_diff') is not None:
+                suffix = f"  (Diff: {js_number(validity['reliability_diff'])} dB)"
+            else:
+                suffix = ""
+            card['stability'].set_text(prefix)
+            card['stability_value'].set_text(status + suffix)
+            card['stability_value'].set_color(GREEN if 'High' in status else YELLOW if 'Moderate' in status else RED)
+        else:
+            card['stability'].set_text("")
+            card['stability_value'].set_text("")
+
+    def _fill_graph(self, graph, title_artist, label, data):
+        history = (data or {}).get('history') or []
+        visible = len(history) >= 2
+        graph['ax'].set_visible(visible)
+        title_artist.set_visible(visible)
+        if not visible:
+            return False
+        t = [pt['t'] for pt in history]
+        noise = [pt['noise'] for pt in history]
+        max_time = max(60, t[-1])
+        step = 30 if max_time > 120 else 15
+        ax = graph['ax']
+        ax.set_xlim(0, max_time)
+        ax.set_xticks(list(range(0, int(max_time) + 1, step)))
+        graph['noise'].set_data(t, noise)
+        graph['speech'].set_ydata([data['mcl'], data['mcl']])
+        graph['speech_label'].set_y(data['mcl'])
+        title_artist.set_text(label)
+        return True
+
+    def render(self, session, output_path, clinic=None):
+        clinic = clinic or {}
+        result_a, result_b = session.get('resultsA'), session.get('resultsB')
+        label_a = session.get('labelA') or "Test A"
+        label_b = session.get('labelB') or "Test B"
+
+        self.clinic.set_text(clinic.get('clinicName') or "")
+        details = []
+        if clinic.get('providerName'):
+            details.append(f"Provider: {clinic['providerName']}")
+        if clinic.get('licenseNumber'):
+            details.append(f"Lic: {clinic['licenseNumber']}")
+        self.provider.set_text(" | ".join(details))
+        self.patient.set_text(f"Patient: {session.get('patientName') or 'N/A'}")
+        self.date.set_text(f"Date: {session.get('testDate') or ''}")
+
+        comparison = result_a is not None and result_b is not None
+        self.heading.set_text("Comparative Results" if comparison else "Test A Complete")
+        self._fill_card(self.cards[0], label_a, result_a)
+        self._fill_card(self.cards[1], label_b, result_b)
+
+        outcome = self.outcome
+        for artist in outcome.values():
+            artist.set_visible(comparison)
+        if comparison:
+            improvement = (result_b['bnl'] - result_b['mcl']) - (result_a['bnl'] - result_a['mcl'])
+            text, color = interpretation(improvement)
+            outcome['benefit'].set_text(f"Benefit in HANT (Test B - Test A): {'+' if improvement > 0 else ''}"
+                                        f"{js_number(improvement)} dB")
+            outcome['interpretation'].set_text(text)
+            outcome['interpretation'].set_color(color)
+            sig = significance_summary(result_a, result_b)
+            for key in ('sig_box', 'sig_message', 'sig_detail'):
+                outcome[key].set_visible(sig is not None)
+            if sig:
+                message, detail, sig_color = sig
+                outcome['sig_message'].set_text(message)
+                outcome['sig_message'].set_color(sig_color)
+                outcome['sig_detail'].set_text(detail)
+                outcome['sig_box'].set_edgecolor(sig_color)
+
+        shown = [self._fill_graph(self.graphs[0], self.graph_titles[0], label_a, result_a),
+                 self._fill_graph(self.graphs[1], self.graph_titles[1], label_b, result_b)]
+        self.graph_heading.set_visible(any(shown))
+
+        self.fig.savefig(output_path, format='pdf', facecolor='white')
+
+
+_template = None
+
+
+def _init_worker():
+    global _template
+    _template = ReportTemplate()
+
+
+def render_report(job):
+    """Renders one session to PDF.
+
+    Returns (session path, PDF path or None, error); a file that cannot be read or
+    rendered gives no PDF and the error text.
+    """
+    session_path, output_dir, clinic = job
+    try:
+        with open(session_path, 'r', encoding='utf-8') as f:
+            session = json.load(f)
+        if not session.get('resultsA'):
+            return session_path, None, None
+        stem = os.path.splitext(os.path.basename(session_path))[0]
+        name = stem.replace('ANL_Test_', 'ANL_Report_', 1) if stem.startswith('ANL_Test_') else f"ANL_Report_{stem}"
+        output_path = os.path.join(output_dir, name + ".pdf")
+        _template.render(session, output_path, clinic)
+        return session_path, output_path, None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        return session_path, None, f"{type(e).__name__}: {e}"
+
+
+def render_batch(files, output_dir, clinic, workers=None):
+    """Renders every session in a process pool. Returns [(session path, PDF path or None, error)]."""
+    os.makedirs(output_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(render_report, [(f, output_dir, clinic) for f in files], chunksize=8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render PDF reports for exported ANL sessions without a browser.")
+    parser.add_argument('paths', nargs='*', default=['.'], help="Session files or directories to scan")
+    parser.add_argument('--output', default='reports', help="Output directory for the PDFs")
+    parser.add_argument('--clinic-name', help="Clinic name for the report header")
+    parser.add_argument('--provider', help="Provider name for the report header")
+    parser.add_argument('--license', help="Provider license number for the report header")
+    parser.add_argument('--workers', type=int, default=None, help="Number of rendering processes")
+    args = parser.parse_args()
+
+    files = find_session_files(args.paths)
+    if not files:
+        print("No ANL_Test_*.json files found.")
+        return
+    clinic = {'clinicName': args.clinic_name, 'providerName': args.provider, 'licenseNumber': args.license}
+
+    start = time.perf_counter()
+    rendered = 0
+    for session_path, output_path, error in render_batch(files, args.output, clinic, args.workers):
+        if output_path:
+            rendered += 1
+        elif error:
+            print(f"  [SKIPPED] {session_path}: {error}")
+        else:
+            print(f"  Skipped {session_path} (no Test A results)")
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {rendered} reports to {args.output} in {elapsed:.1f}s ({rendered / elapsed * 60:.0f} per minute)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+DEFAULT_FILES = [
+    "public/audio/4-talker_babble.flac",
+    "public/audio/history_glass.flac",
+    "public/audio/history_bicycle.flac",
+    "public/audio/history_pencil.flac",
+    "public/audio/history_umbrella.flac"
+]
+
+SAMPLE_RATES = [44100, 32000, 22050, 16000]
+OPUS_BITRATES = ['128k', '96k', '64k']
+MAX_LEVEL_DEVIATION_DB = 0.1
+
+# Variant name -> (file extension, ffmpeg codec arguments)
+CODECS = {
+    'flac': ('flac', ['-c:a', 'flac']),
+    'wav16': ('wav', ['-c:a', 'pcm_s16le']),
+    'wav24': ('wav', ['-c:a', 'pcm_s24le']),
+    'opus': ('opus', ['-c:a', 'libopus']),
+}
+
+
+def check_ffmpeg():
+    try:
+        subprocess.run(['ffmpeg', '-version'], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        print("Error: ffmpeg is not installed or not in PATH.")
+        sys.exit(1)
+
+
+def variant_specs():
+    """Every (codec, sample_rate, bitrate) combination to render."""
+    specs = [(codec, rate, None) for codec in ('flac', 'wav16', 'wav24') for rate in SAMPLE_RATES]
+    # Opus always encodes at 48 kHz; vary the bitrate instead
+    specs += [('opus', 48000, bitrate) for bitrate in OPUS_BITRATES]
+    return specs
+
+
+def decode(file_path):
+    """Decodes a file to float32 with ffmpeg. Returns (samples, decode seconds)."""
+    cmd = ['ffmpeg', '-v', 'error', '-i', file_path, '-f', 'f32le', '-ac', '1', 'pipe:1']
+    start = time.perf_counter()
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    elapsed = time.perf_counter() - start
+    return np.frombuffer(result.stdout, dtype=np.float32), elapsed
+
+
+def rms_db(samples):
+    rms = np.sqrt(np.mean(samples.astype(np.float64) ** 2))
+    return 20 * math.log10(rms) if rms > 0 else -np.inf
+
+
+def render_variant(source_path, output_dir, codec, sample_rate, bitrate):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    extension, codec_args = CODECS[codec]
+    suffix = bitrate if bitrate else f"{sample_rate // 1000}k"
+    output_path = os.path.join(output_dir, f"{stem}.{codec}_{suffix}.{extension}")
+
+    cmd = ['ffmpeg', '-y', '-v', 'error', '-i', source_path, '-ar', str(sample_rate)] + codec_args
+    if bitrate:
+        cmd += ['-b:a', bitrate]
+    cmd.append(output_path)
+    subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    return output_path
+
+
+def measure_variant(path, master_db, spec):
+    codec, sample_rate, bitrate = spec
+    samples, decode_seconds = decode(path)
+    return {
+        'file': os.path.basename(path),
+        'codec': codec,
+        'sample_rate': sample_rate,
+        'bitrate': bitrate,
+        'bytes': os.path.getsize(path),
+        'decode_ms': round(decode_seconds * 1000, 1),
+        'level_deviation_db': round(rms_db(samples) - master_db, 3)
+    }
+
+
+def build_variants(source_path, output_dir, workers=None):
+    """Renders every variant of one asset in parallel, then measures them one at a time."""
+    os.makedirs(output_dir, exist_ok=True)
+    samples, decode_seconds = decode(source_path)
+    master_db = rms_db(samples)
+    master = {
+        'file': os.path.basename(source_path),
+        'bytes': os.path.getsize(source_path),
+        'decode_ms': round(decode_seconds * 1000, 1),
+        'rms_db': round(master_db, 3)
+    }
+
+    # ffmpeg does the work in subprocesses, so threads are enough to keep cores busy
+    specs = variant_specs()
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        paths = list(pool.map(lambda spec: render_variant(source_path, output_dir, *spec), specs))
+    # Decodes are timed serially once encoding has finished, so decode_ms is not skewed by CPU contention
+    variants = [measure_variant(path, master_db, spec) for path, spec in zip(paths, specs)]
+
+    # Cheapest variant (smallest, then fastest to decode) that keeps the level within tolerance
+    eligible = [v for v in variants if abs(v['level_deviation_db']) <= MAX_LEVEL_DEVIATION_DB]
+    recommended = min(eligible, key=lambda v: (v['bytes'], v['decode_ms']))['file'] if eligible else master['file']
+    return {'master': master, 'variants': variants, 'recommended': recommended}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render multi-rate/multi-codec variants of the audio assets.")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help="Master assets")
+    parser.add_argument('--output', default='public/audio/variants', help="Variant output directory")
+    parser.add_argument('--workers', type=int, default=None, help="Parallel ffmpeg processes")
+    args = parser.parse_args()
+
+    check_ffmpeg()
+
+    manifest = {'max_level_deviation_db': MAX_LEVEL_DEVIATION_DB, 'assets': {}}
+    for f in args.files:
+        if not os.path.exists(f):
+            print(f"File not found: {f}")
+            continue
+
+        print(f"Building variants for {f}...")
+        report = build_variants(f, args.output, args.workers)
+        manifest['assets'][os.path.basename(f)] = report
+
+        master = report['master']
+        print(f"  {'master':<28} {master['bytes'] / 1e6:8.2f} MB {master['decode_ms']:8.1f} ms")
+        for v in report['variants']:
+            flag = "" if abs(v['level_deviation_db']) <= MAX_LEVEL_DEVIATION_DB else "  [out of tolerance]"
+            print(f"  {v['file']:<28} {v['bytes'] / 1e6:8.2f} MB {v['decode_ms']:8.1f} ms "
+                  f"{v['level_deviation_db']:+.3f} dB{flag}")
+        print(f"  Recommended: {report['recommended']}")
+
+    manifest_path = os.path.join(args.output, "variants.json")
+    os.makedirs(args.output, exist_ok=True)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    print(f"Saved manifest to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
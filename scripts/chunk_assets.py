@@ -0,0 +1,129 @@
+import argparse
+import json
+import math
+import os
+
+import numpy as np
+import soundfile as sf
+
+DEFAULT_FILES = [
+    "public/audio/4-talker_babble.flac",
+    "public/audio/history_glass.flac",
+    "public/audio/history_bicycle.flac",
+    "public/audio/history_pencil.flac",
+    "public/audio/history_umbrella.flac"
+]
+
+CHUNK_SECONDS = 5.0
+
+# Read integer PCM as integers so verification compares the exact stored samples
+INTEGER_DTYPES = {'PCM_16': ('int16', 2 ** 15), 'PCM_24': ('int32', 2 ** 31), 'PCM_32': ('int32', 2 ** 31)}
+
+
+def sample_format(subtype):
+    """(numpy dtype to read with, full-scale value) for a soundfile subtype."""
+    return INTEGER_DTYPES.get(subtype, ('float64', 1.0))
+
+
+def index_path_for(source_path, output_dir):
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(output_dir, f"{stem}.chunks.json")
+
+
+def chunk_file(source_path, output_dir, chunk_seconds=CHUNK_SECONDS):
+    """Splits an asset into sample-aligned chunks plus a JSON index. Returns the index."""
+    info = sf.info(source_path)
+    dtype, full_scale = sample_format(info.subtype)
+    chunk_frames = int(round(chunk_seconds * info.samplerate))
+    stem = os.path.splitext(os.path.basename(source_path))[0]
+    chunk_dir = os.path.join(output_dir, stem)
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    chunks = []
+    offset = 0
+    for i, block in enumerate(sf.blocks(source_path, blocksize=chunk_frames, dtype=dtype, always_2d=True)):
+        name = f"{stem}_{i:03d}.flac"
+        sf.write(os.path.join(chunk_dir, name), block, info.samplerate, subtype=info.subtype, format='FLAC')
+
+        scaled = block.astype(np.float64) / full_scale
+        rms = np.sqrt(np.mean(scaled ** 2)) if len(block) else 0.0
+        chunks.append({
+            'file': f"{stem}/{name}",
+            'offset': offset,
+            'frames': len(block),
+            'rms_db': round(20 * math.log10(rms), 3) if rms > 0 else None
+        })
+        offset += len(block)
+
+    index = {
+        'source': os.path.basename(source_path),
+        'sample_rate': info.samplerate,
+        'channels': info.channels,
+        'subtype': info.subtype,
+        'chunk_frames': chunk_frames,
+        'total_frames': offset,
+        'chunks': chunks
+    }
+    with open(index_path_for(source_path, output_dir), 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2)
+        f.write('\n')
+    return index
+
+
+def verify_chunks(source_path, output_dir):
+    """Checks that the concatenated chunks reproduce the source samples bit-exactly."""
+    with open(index_path_for(source_path, output_dir), 'r', encoding='utf-8') as f:
+        index = json.load(f)
+    dtype, _ = sample_format(index['subtype'])
+
+    errors = []
+    source_blocks = sf.blocks(source_path, blocksize=index['chunk_frames'], dtype=dtype, always_2d=True)
+    expected_offset = 0
+    for chunk, original in zip(index['chunks'], source_blocks):
+        if chunk['offset'] != expected_offset:
+            errors.append(f"{chunk['file']}: offset {chunk['offset']} != {expected_offset}")
+        data, samplerate = sf.read(os.path.join(output_dir, chunk['file']), dtype=dtype, always_2d=True)
+        if samplerate != index['sample_rate'] or data.shape != original.shape:
+            errors.append(f"{chunk['file']}: format or length differs from source")
+        elif not np.array_equal(data, original):
+            errors.append(f"{chunk['file']}: samples differ from source")
+        expected_offset += len(data)
+
+    if expected_offset != sf.info(source_path).frames:
+        errors.append(f"chunks cover {expected_offset} frames, source has {sf.info(source_path).frames}")
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split audio assets into sample-aligned chunks for progressive loading.")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help="Assets to chunk")
+    parser.add_argument('--output', default='public/audio/chunks', help="Chunk output directory")
+    parser.add_argument('--seconds', type=float, default=CHUNK_SECONDS, help="Chunk duration in seconds")
+    parser.add_argument('--verify-only', action='store_true', help="Only verify existing chunks")
+    args = parser.parse_args()
+
+    failed = False
+    for f in args.files:
+        if not os.path.exists(f):
+            print(f"File not found: {f}")
+            continue
+
+        if not args.verify_only:
+            index = chunk_file(f, args.output, args.seconds)
+            print(f"{f}: {len(index['chunks'])} chunks of {index['chunk_frames']} frames")
+
+        errors = verify_chunks(f, args.output)
+        if errors:
+            failed = True
+            print(f"  [FAIL] {f}")
+            for e in errors:
+                print(f"    {e}")
+        else:
+            print(f"  [OK] Chunks reproduce {f} bit-exactly")
+
+    if failed:
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
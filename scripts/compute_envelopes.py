@@ -0,0 +1,150 @@
+import argparse
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import lfilter
+
+DEFAULT_FILES = [
+    "public/audio/4-talker_babble.flac",
+    "public/audio/history_glass.flac",
+    "public/audio/history_bicycle.flac",
+    "public/audio/history_pencil.flac",
+    "public/audio/history_umbrella.flac"
+]
+
+BLOCK_SECONDS = 0.1       # matches the tracking loop's 0.1 s tick
+BLOCKS_PER_READ = 100
+FLOOR_DB = -120.0         # keeps silent blocks finite in float16
+FIELDS = ['rms_db', 'lufs']
+
+
+def k_weighting_filters(sample_rate):
+    """ITU-R BS.1770 K-weighting (high shelf + high pass) as two biquads for any sample rate."""
+    # Same bilinear-transform design as libebur128, so 48 kHz reproduces the BS.1770 table
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf_b = np.array([vh + vb * k / q + k * k, 2 * (k * k - vh), vh - vb * k / q + k * k]) / a0
+    shelf_a = np.array([a0, 2 * (k * k - 1), 1 - k / q + k * k]) / a0
+
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / sample_rate)
+    a0 = 1 + k / q + k * k
+    hp_b = np.array([1.0, -2.0, 1.0])
+    hp_a = np.array([a0, 2 * (k * k - 1), 1 - k / q + k * k]) / a0
+
+    return [(shelf_b, shelf_a), (hp_b, hp_a)]
+
+
+def to_db(power):
+    with np.errstate(divide='ignore'):
+        return np.maximum(10 * np.log10(power), FLOOR_DB)
+
+
+def compute_envelope(file_path, block_seconds=BLOCK_SECONDS):
+    """Per-block RMS (dBFS, all channels) and K-weighted loudness (LUFS), streamed from disk."""
+    info = sf.info(file_path)
+    block_frames = int(round(block_seconds * info.samplerate))
+    filters = k_weighting_filters(info.samplerate)
+    # Filter state per stage and channel, carried across reads
+    states = [np.zeros((2, info.channels)) for _ in filters]
+
+    rms_db, lufs = [], []
+    for data in sf.blocks(file_path, blocksize=block_frames * BLOCKS_PER_READ, dtype='float64', always_2d=True):
+        weighted = data
+        for i, (b, a) in enumerate(filters):
+            weighted, states[i] = lfilter(b, a, weighted, axis=0, zi=states[i])
+
+        n_blocks = int(math.ceil(len(data) / block_frames))
+        block_ids = np.arange(len(data)) // block_frames
+        counts = np.bincount(block_ids, minlength=n_blocks)
+        # Mean square per block, averaged over channels for RMS, summed for loudness
+        power = np.stack([np.bincount(block_ids, weights=data[:, c] ** 2, minlength=n_blocks)
+                          for c in range(info.channels)], axis=1) / counts[:, None]
+        k_power = np.stack([np.bincount(block_ids, weights=weighted[:, c] ** 2, minlength=n_blocks)
+                            for c in range(info.channels)], axis=1) / counts[:, None]
+        rms_db.append(to_db(power.mean(axis=1)))
+        lufs.append(-0.691 + to_db(k_power.sum(axis=1)))
+
+    return {
+        'block_seconds': block_seconds,
+        'sample_rate': info.samplerate,
+        'frames': info.frames,
+        'rms_db': np.concatenate(rms_db) if rms_db else np.empty(0),
+        'lufs': np.concatenate(lufs) if lufs else np.empty(0)
+    }
+
+
+def envelope_paths(asset_path):
+    stem = os.path.splitext(asset_path)[0]
+    return stem + ".envelope.json", stem + ".envelope.f16"
+
+
+def save_envelope(asset_path, envelope):
+    """Writes the fields as consecutive little-endian float16 arrays plus a JSON header."""
+    header_path, data_path = envelope_paths(asset_path)
+    n_blocks = len(envelope['rms_db'])
+    data = np.concatenate([envelope[field] for field in FIELDS]).astype('<f2')
+    data.tofile(data_path)
+    header = {
+        'source': os.path.basename(asset_path),
+        'data': os.path.basename(data_path),
+        'dtype': 'float16le',
+        'fields': FIELDS,
+        'blocks': n_blocks,
+        'block_seconds': envelope['block_seconds'],
+        'sample_rate': envelope['sample_rate'],
+        'frames': envelope['frames']
+    }
+    with open(header_path, 'w', encoding='utf-8') as f:
+        json.dump(header, f, indent=2)
+        f.write('\n')
+
+
+def load_envelope(asset_path):
+    """Loads an envelope written by save_envelope as float32 arrays keyed by field."""
+    header_path, data_path = envelope_paths(asset_path)
+    with open(header_path, 'r', encoding='utf-8') as f:
+        header = json.load(f)
+    data = np.fromfile(data_path, dtype='<f2').astype(np.float32).reshape(len(header['fields']), header['blocks'])
+    envelope = dict(header)
+    envelope.update({field: data[i] for i, field in enumerate(header['fields'])})
+    return envelope
+
+
+def process_file(file_path):
+    envelope = compute_envelope(file_path)
+    save_envelope(file_path, envelope)
+    return file_path, envelope
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute per-100 ms RMS/LUFS envelopes for the audio assets.")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help="Assets to analyse")
+    parser.add_argument('--workers', type=int, default=None, help="Number of analysis processes")
+    args = parser.parse_args()
+
+    files = []
+    for f in args.files:
+        if os.path.exists(f):
+            files.append(f)
+        else:
+            print(f"File not found: {f}")
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for file_path, envelope in pool.map(process_file, files):
+            rms = envelope['rms_db']
+            print(f"{file_path}: {len(rms)} blocks, RMS {np.median(rms):.1f} dBFS median "
+                  f"(p10 {np.percentile(rms, 10):.1f}, p90 {np.percentile(rms, 90):.1f}), "
+                  f"LUFS {np.median(envelope['lufs']):.1f} median")
+            print(f"  Saved {envelope_paths(file_path)[1]}")
+
+
+if __name__ == "__main__":
+    main()
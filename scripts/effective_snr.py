@@ -0,0 +1,136 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from anl_scoring import ragged_reversals, session_ids
+from compute_envelopes import load_envelope
+from ingest_sessions import load_store
+
+AUDIO_DIR = "public/audio"
+NOISE_FILE = "4-talker_babble.flac"
+# App.jsx defaults to the first speech option; older exports do not record the passage
+DEFAULT_SPEECH_FILE = "history_glass.flac"
+CHUNK_SESSIONS = 2000
+
+
+def envelope_deviation(envelope, field):
+    """Envelope in dB relative to the asset's long-term (energy-average) level."""
+    levels = envelope[field].astype(np.float64)
+    long_term = 10 * np.log10(np.mean(10 ** (levels / 10)))
+    return levels - long_term
+
+
+def level_at(t, envelope, deviation):
+    """Envelope deviation at each time t of a looped buffer started at offset 0.
+
+    play() starts both sources at the same offset (always 0 for a test) with
+    loop = true, so each buffer wraps at its own duration.
+    """
+    duration = envelope['frames'] / envelope['sample_rate']
+    blocks = np.floor(np.mod(t, duration) / envelope['block_seconds']).astype(np.int64)
+    return deviation[np.minimum(blocks, len(deviation) - 1)]
+
+
+def effective_snr(t, noise, speech_level, speech_env, noise_env, field='rms_db'):
+    """Instantaneous SNR (dB) at every tick: nominal speech - noise plus both envelope deviations."""
+    speech_dev = level_at(t, speech_env, envelope_deviation(speech_env, field))
+    noise_dev = level_at(t, noise_env, envelope_deviation(noise_env, field))
+    return (speech_level + speech_dev) - (noise + noise_dev)
+
+
+def _snr_chunk(job):
+    t, noise, offsets, speech_levels, speech_names, audio_dir, field, lag = job
+    noise_env = load_envelope(os.path.join(audio_dir, NOISE_FILE))
+    session = session_ids(offsets)
+    snr = np.empty(len(t))
+    masker = np.empty(len(t))
+    for name in np.unique(speech_names):
+        speech_env = load_envelope(os.path.join(audio_dir, name))
+        points = np.flatnonzero(speech_names[session] == name)
+        snr[points] = effective_snr(t[points], noise[points], speech_levels[session[points]],
+                                    speech_env, noise_env, field)
+        # Masker fluctuation the listener heard `lag` seconds before each tick
+        lagged = np.maximum(t[points] - lag, 0)
+        masker[points] = (level_at(lagged, speech_env, envelope_deviation(speech_env, field))
+                          - level_at(lagged, noise_env, envelope_deviation(noise_env, field)))
+    return snr, masker
+
+
+def reconstruct(store, audio_dir=AUDIO_DIR, field='rms_db', lag=0.0, workers=None):
+    """Effective SNR and masker-driven SNR deviation for every tick of every test in the store.
+
+    Sessions are split into chunks and processed in a process pool. Returns flat arrays
+    aligned with store['t'].
+    """
+    offsets = store['offsets']
+    speech_names = np.where(store['speech_file'] == '', DEFAULT_SPEECH_FILE,
+                            np.char.rpartition(store['speech_file'].astype(str), '/')[:, 2])
+    jobs = []
+    for start in range(0, len(offsets) - 1, CHUNK_SESSIONS):
+        stop = min(start + CHUNK_SESSIONS, len(offsets) - 1)
+        lo, hi = offsets[start], offsets[stop]
+        jobs.append((store['t'][lo:hi], store['noise'][lo:hi], offsets[start:stop + 1] - lo,
+                     store['speech_level'][start:stop], speech_names[start:stop], audio_dir, field, lag))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_snr_chunk, jobs))
+    if not results:
+        return np.empty(0), np.empty(0)
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def reversal_fluctuations(store, masker):
+    """Mean masker-driven SNR deviation at peaks and valleys (t > 30 s) per test."""
+    t, noise, offsets = store['t'], store['noise'], store['offsets']
+    indices, _ = ragged_reversals(t, noise, offsets)
+    n = len(offsets) - 1
+    session = np.searchsorted(offsets, indices, side='right') - 1
+    # A peak is where the listener started pulling the noise down
+    is_peak = noise[indices] > noise[np.maximum(indices - 1, 0)]
+    result = {}
+    for name, mask in (('peak', is_peak), ('valley', ~is_peak)):
+        counts = np.bincount(session[mask], minlength=n)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[name] = np.bincount(session[mask], weights=masker[indices[mask]], minlength=n) / counts
+    return result['peak'], result['valley']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstruct the effective SNR timeline of archived sessions.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--audio-dir', default=AUDIO_DIR, help="Directory with assets and their envelopes")
+    parser.add_argument('--field', default='rms_db', choices=['rms_db', 'lufs'], help="Envelope measure")
+    parser.add_argument('--lag', type=float, default=0.5, help="Listener reaction lag (s) for reversal analysis")
+    parser.add_argument('--output', default='effective_snr.npz', help="Output file for the SNR timelines")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    store = load_store(args.store)
+    start = time.perf_counter()
+    snr, masker = reconstruct(store, args.audio_dir, args.field, args.lag, args.workers)
+    print(f"Reconstructed {len(snr)} ticks over {len(store['path'])} tests "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    peak, valley = reversal_fluctuations(store, masker)
+    both = ~np.isnan(peak) & ~np.isnan(valley)
+    if both.any():
+        diff = peak[both] - valley[both]
+        se = np.std(diff, ddof=1) / np.sqrt(len(diff)) if len(diff) > 1 else np.nan
+        print(f"Masker SNR deviation at peaks vs valleys ({args.lag:.1f}s lag): "
+              f"{np.mean(diff):+.2f} dB (SE {se:.2f}, n={len(diff)})")
+        print("A clearly negative value means listeners reversed when the masker momentarily got louder.")
+
+    np.savez_compressed(args.output, effective_snr=snr, masker_deviation=masker,
+                        offsets=store['offsets'], peak_deviation=peak, valley_deviation=valley)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+def db_to_gain(db):
+    """useAudioController mapping: <= -100 dB is silence, gain is capped at 1."""
+    db = np.asarray(db, dtype=np.float64)
+    return np.minimum(np.where(db <= -100, 0.0, 10 ** (db / 20)), 1.0)
+
+
+def _decay(elapsed, time_constants):
+    """exp(-elapsed / tau); a zero time constant jumps straight to the target."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(time_constants > 0, np.exp(-elapsed / np.where(time_constants > 0, time_constants, 1.0)), 0.0)
+
+
+def event_starts(times, targets, time_constants, initial=0.0):
+    """Param value at the start of every setTargetAtTime event.
+
+    Between events the value follows v(t) = T + (v0 - T) * exp(-(t - t0) / tau), so
+    event k starts at v_k = a_k * v_{k-1} + (1 - a_k) * T_{k-1}. The recurrence is an
+    affine map per event; composing the maps with a doubling scan takes log2(n)
+    vectorised passes instead of a Python loop over events.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    targets = np.broadcast_to(np.asarray(targets, dtype=np.float64), times.shape)
+    time_constants = np.broadcast_to(np.asarray(time_constants, dtype=np.float64), times.shape)
+    n = len(times)
+    if n == 0:
+        return np.empty(0)
+
+    # Map for event k: v -> scale * v + shift, applied to the previous event's start
+    scale = np.empty(n)
+    shift = np.empty(n)
+    scale[0], shift[0] = 1.0, 0.0
+    a = _decay(np.diff(times), time_constants[:-1])
+    scale[1:] = a
+    shift[1:] = (1 - a) * targets[:-1]
+
+    step = 1
+    while step < n:
+        # Compose each map with the one `step` events earlier (later map applied last)
+        new_shift = scale[step:] * shift[:-step] + shift[step:]
+        scale[step:] = scale[step:] * scale[:-step]
+        shift[step:] = new_shift
+        step *= 2
+    return scale * initial + shift
+
+
+def evaluate(times, targets, time_constants, starts, sample_times, initial=0.0):
+    """Param value at each sample time, given the event start values from event_starts."""
+    times = np.asarray(times, dtype=np.float64)
+    targets = np.broadcast_to(np.asarray(targets, dtype=np.float64), times.shape)
+    time_constants = np.broadcast_to(np.asarray(time_constants, dtype=np.float64), times.shape)
+    sample_times = np.asarray(sample_times, dtype=np.float64)
+    if len(times) == 0:
+        return np.full(sample_times.shape, initial)
+
+    k = np.searchsorted(times, sample_times, side='right') - 1
+    active = k >= 0
+    k = np.maximum(k, 0)
+    curve = targets[k] + (starts[k] - targets[k]) * _decay(sample_times - times[k], time_constants[k])
+    return np.where(active, curve, initial)
+
+
+def gain_curve(times, targets, time_constants, sample_times, initial=0.0):
+    """Sample-accurate value of a param driven by (time, target, time constant) events."""
+    starts = event_starts(times, targets, time_constants, initial)
+    return evaluate(times, targets, time_constants, starts, sample_times, initial)
+
+
+def gain_envelope(times, target_db, time_constants, sample_rate, n_samples, initial=0.0):
+    """Per-sample linear gain for events given as target levels in dB."""
+    sample_times = np.arange(n_samples) / sample_rate
+    return gain_curve(times, db_to_gain(target_db), time_constants, sample_times, initial)
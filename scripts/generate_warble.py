@@ -1,5 +1,6 @@
 import numpy as np
 import os
+import shutil
 import subprocess
 import sys
 
@@ -58,8 +59,11 @@ def main():
     audio = generate_warble_tone(duration, mod_freq=5)
     
     # Save as Right and Left channel files
-    save_flac_via_ffmpeg(audio, 44100, os.path.join(output_dir, "cal_warble_L.flac"))
-    save_flac_via_ffmpeg(audio, 44100, os.path.join(output_dir, "cal_warble_R.flac"))
+    # Both channels use the same tone, so encode once and copy
+    left_path = os.path.join(output_dir, "cal_warble_L.flac")
+    save_flac_via_ffmpeg(audio, 44100, left_path)
+    shutil.copyfile(left_path, os.path.join(output_dir, "cal_warble_R.flac"))
+    print(f"Copied {left_path} to cal_warble_R.flac")
 
 if __name__ == "__main__":
     main()
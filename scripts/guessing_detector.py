@@ -0,0 +1,202 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from anl_scoring import (DEFAULT_SPEECH_LEVEL, GUESSING_EXCURSION_DB, IGNORE_SECONDS, ragged_reversals,
+                         score_batch, session_ids)
+from ingest_sessions import load_manifest, load_store
+
+FEATURES = [
+    'reversal_rate',          # reversals per minute after 30 s
+    'height_mean',            # excursion height (dB) between consecutive reversals after 30 s
+    'height_sd',
+    'height_max',
+    'width_mean',             # excursion width (s) between consecutive reversals after 30 s
+    'width_sd',
+    'drift_slope',            # least-squares slope of the noise level after 30 s (dB/min)
+    'stabilization_seconds',  # time of the 3rd reversal
+    'stability_sd',           # SD of the last 30 s
+]
+# Features where only unusually high values point to guessing; a very low excursion height or
+# width is a steady listener, not a suspicious one. The rest count in both directions.
+HIGH_SIDE_FEATURES = ['height_mean', 'height_sd', 'height_max', 'width_mean', 'width_sd', 'stability_sd']
+GUESSING_SUFFIX = "(Possible Guessing)"
+CACHE_DIR = "features"
+# Iglewicz & Hoaglin: modified z-scores above 3.5 are potential outliers
+ANOMALY_THRESHOLD = 3.5
+
+
+def extract_features(t, noise, offsets, speech_levels):
+    """Feature matrix (tests x FEATURES) for a ragged batch of histories, and the
+    excursion-height rule flag of generateFinalResults (only for tests of 30 s or more)."""
+    n = len(offsets) - 1
+    session = session_ids(offsets)
+    columns = score_batch(t, noise, offsets, speech_levels)
+    features = np.full((n, len(FEATURES)), np.nan)
+    col = {name: i for i, name in enumerate(FEATURES)}
+
+    idx, count = ragged_reversals(t, noise, offsets)
+    late_minutes = (columns['duration_seconds'] - IGNORE_SECONDS) / 60
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features[:, col['reversal_rate']] = np.where(late_minutes > 0, count / late_minutes, np.nan)
+
+        rev_session = session[idx]
+        same = rev_session[1:] == rev_session[:-1]
+        pair_session = rev_session[1:][same]
+        pairs = np.maximum(count - 1, 0)
+        for name, values in (('height', np.abs(np.diff(noise[idx]))[same]), ('width', np.diff(t[idx])[same])):
+            mean = np.bincount(pair_session, weights=values, minlength=n) / pairs
+            ss = np.bincount(pair_session, weights=(values - mean[pair_session]) ** 2, minlength=n)
+            features[:, col[f'{name}_mean']] = mean
+            features[:, col[f'{name}_sd']] = np.where(pairs >= 2, np.sqrt(ss / np.maximum(pairs - 1, 1)), np.nan)
+            if name == 'height':
+                peak = np.full(n, np.nan)
+                if len(values):
+                    np.fmax.at(peak, pair_session, values)
+                features[:, col['height_max']] = peak
+
+        # Least-squares drift after the ignore window, from centred per-test sums
+        late = t > IGNORE_SECONDS
+        late_session = session[late]
+        late_t, late_noise = t[late], noise[late]
+        late_n = np.bincount(late_session, minlength=n)
+        mean_t = np.bincount(late_session, weights=late_t, minlength=n) / late_n
+        mean_x = np.bincount(late_session, weights=late_noise, minlength=n) / late_n
+        dt = late_t - mean_t[late_session]
+        sxy = np.bincount(late_session, weights=dt * (late_noise - mean_x[late_session]), minlength=n)
+        sxx = np.bincount(late_session, weights=dt * dt, minlength=n)
+        features[:, col['drift_slope']] = np.where(sxx > 0, sxy / sxx * 60, np.nan)
+
+    features[:, col['stabilization_seconds']] = columns['stabilization_seconds']
+    features[:, col['stability_sd']] = columns['stability_sd']
+    return features, np.char.endswith(columns['stability_status'], GUESSING_SUFFIX)
+
+
+def part_signature(path):
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def part_features(job):
+    """Features for every row of one store part, cached next to the store.
+
+    Parts are never modified after ingest (a --full rebuild rewrites them), so a
+    cache entry is valid while the part's size and mtime are unchanged.
+    """
+    store_dir, part_name = job
+    part_path = os.path.join(store_dir, part_name)
+    cache_path = os.path.join(store_dir, CACHE_DIR, part_name.replace('.npz', '.features.npz'))
+    signature = part_signature(part_path)
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if (np.array_equal(cached['signature'], signature) and list(cached['names']) == FEATURES
+                    and 'rule_flagged' in cached.files):
+                return part_name, cached['features'], cached['rule_flagged'], False
+
+    with np.load(part_path) as part:
+        speech_levels = part['speech_level'] if 'speech_level' in part.files else np.full(len(part['path']), np.nan)
+        speech_levels = np.where(np.isnan(speech_levels), DEFAULT_SPEECH_LEVEL, speech_levels)
+        features, rule_flagged = extract_features(part['t'], part['noise'], part['offsets'], speech_levels)
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    np.savez_compressed(cache_path, signature=signature, names=np.array(FEATURES), features=features,
+                        rule_flagged=rule_flagged)
+    return part_name, features, rule_flagged, True
+
+
+def load_features(store_dir, workers=None):
+    """Feature matrix aligned with load_store rows, computing only uncached parts.
+
+    Returns (features, excursion-rule flags, number of parts recomputed).
+    """
+    manifest = load_manifest(store_dir)
+    jobs = [(store_dir, part_name) for part_name in manifest['parts']]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = {name: (features, flags, computed)
+                   for name, features, flags, computed in pool.map(part_features, jobs)}
+
+    blocks, rule_flags = [], []
+    for part_name in manifest['parts']:
+        with np.load(os.path.join(store_dir, part_name)) as part:
+            # Same row selection as load_store: drop rows superseded by a later part
+            current = np.array([manifest['files'].get(f, {}).get('part') == part_name for f in part['path']],
+                               dtype=bool)
+        features, flags, _ = results[part_name]
+        blocks.append(features[current])
+        rule_flags.append(flags[current])
+
+    recomputed = sum(computed for _, _, computed in results.values())
+    if not blocks:
+        return np.empty((0, len(FEATURES))), np.empty(0, dtype=bool), 0
+    return np.concatenate(blocks), np.concatenate(rule_flags), recomputed
+
+
+def robust_z_scores(features):
+    """Modified z-scores 0.6745 * (x - median) / MAD per feature over the archive."""
+    median = np.nanmedian(features, axis=0)
+    mad = np.nanmedian(np.abs(features - median), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = 0.6745 * (features - median) / mad
+    # A feature with no spread (or a missing value) carries no evidence
+    return np.where(np.isfinite(z), z, 0.0)
+
+
+def anomaly_scores(features):
+    """Largest modified z-score per test and the feature that produced it.
+
+    HIGH_SIDE_FEATURES use the signed score (low values give 0); the rest use |z|.
+    """
+    z = robust_z_scores(features)
+    high_side = np.isin(FEATURES, HIGH_SIDE_FEATURES)
+    z = np.where(high_side, np.maximum(z, 0.0), np.abs(z))
+    top = np.argmax(z, axis=1) if len(z) else np.empty(0, dtype=np.int64)
+    return z.max(axis=1) if len(z) else np.empty(0), np.array(FEATURES)[top]
+
+
+def write_scores(store, features, scores, top, rule_flagged, path, threshold=ANOMALY_THRESHOLD):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['path', 'patient', 'test_date', 'test_id'] + FEATURES +
+                        ['anomaly_score', 'top_feature', 'flagged', 'rule_flagged'])
+        for i in range(len(scores)):
+            writer.writerow([store['path'][i], store['patient'][i], store['test_date'][i], store['test_id'][i]] +
+                            ['' if np.isnan(v) else round(float(v), 4) for v in features[i]] +
+                            [round(float(scores[i]), 3), top[i], bool(scores[i] > threshold), bool(rule_flagged[i])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score archived sessions for guessing/unreliable responses.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--threshold', type=float, default=ANOMALY_THRESHOLD, help="Modified z-score threshold")
+    parser.add_argument('--output', default='guessing_scores.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    start = time.perf_counter()
+    features, rule_flagged, recomputed = load_features(args.store, args.workers)
+    scores, top = anomaly_scores(features)
+    print(f"Scored {len(scores)} tests in {time.perf_counter() - start:.2f}s ({recomputed} parts recomputed)")
+
+    flagged = scores > args.threshold
+    print(f"  Flagged by detector: {flagged.sum()} ({flagged.mean():.1%})" if len(scores) else "  No tests")
+    print(f"  Flagged by excursion rule (> {GUESSING_EXCURSION_DB} dB): {rule_flagged.sum()}, "
+          f"both: {(flagged & rule_flagged).sum()}")
+    features_hit, counts = np.unique(top[flagged], return_counts=True)
+    for name, count in sorted(zip(features_hit, counts), key=lambda x: -x[1]):
+        print(f"    {name}: {count}")
+
+    store = load_store(args.store)
+    write_scores(store, features, scores, top, rule_flagged, args.output, args.threshold)
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
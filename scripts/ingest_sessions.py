@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from anl_scoring import find_session_files, history_arrays, result_speech_level, session_tests
+
+MANIFEST_NAME = "manifest.json"
+
+# Per-test index columns stored alongside the flattened histories
+TEXT_COLUMNS = ['path', 'patient', 'test_date', 'test_id', 'label', 'speech_file']
+NUMERIC_COLUMNS = ['speech_level', 'eANL', 'eBNL', 'aANL', 'se', 'stability_sd',
+                   'avg_excursion_height', 'duration_seconds', 'reversal_count', 'age']
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+def patient_age(data):
+    """Age in years at the test, from 'patientAge'/'age' or an ISO 'dateOfBirth' (NaN when absent)."""
+    for key in ('patientAge', 'age'):
+        if isinstance(data.get(key), (int, float)) and not isinstance(data[key], bool):
+            return float(data[key])
+    birth, test_date = data.get('dateOfBirth'), data.get('testDate')
+    try:
+        born = np.datetime64(birth, 'D')
+        tested = np.datetime64(test_date, 'D')
+    except (TypeError, ValueError):
+        return np.nan
+    if np.isnat(born) or np.isnat(tested):
+        return np.nan
+    return float((tested - born).astype(np.int64) / 365.2425)
+
+
+def parse_session_file(path):
+    """Flattens one exported session into per-test index rows plus (t, noise) arrays.
+
+    Returns (path, rows, error); a file that cannot be parsed gives no rows and the error text.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return path, session_rows(path, data), None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return path, [], f"{type(e).__name__}: {e}"
+
+
+def session_rows(path, data):
+    rows = []
+    for test_id, result in session_tests(data):
+        t, noise = history_arrays(result['history'])
+        score = result.get('score') or {}
+        validity = result.get('validity') or {}
+        meta = result.get('meta') or {}
+        rows.append({
+            'path': path,
+            'patient': data.get('patientName') or '',
+            'test_date': data.get('testDate') or '',
+            'test_id': test_id,
+            'label': data.get(f'label{test_id}') or '',
+            'speech_file': result.get('speechFile') or '',
+            'speech_level': _number(result_speech_level(result)),
+            'eANL': _number(score.get('eANL')),
+            'eBNL': _number(score.get('eBNL')),
+            'aANL': _number(validity.get('aANL')),
+            'se': _number(validity.get('se')),
+            'stability_sd': _number(validity.get('stability_sd')),
+            'avg_excursion_height': _number(validity.get('avg_excursion_height')),
+            'duration_seconds': _number(meta.get('duration_seconds')),
+            'reversal_count': _number(meta.get('reversal_count')),
+            'age': patient_age(data),
+            't': t,
+            'noise': noise
+        })
+    return rows
+
+
+def load_manifest(store_dir):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {'files': {}, 'parts': []}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(store_dir, manifest):
+    path = os.path.join(store_dir, MANIFEST_NAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(temp_path, path)
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def write_part(store_dir, part_name, rows):
+    """Writes one compressed columnar part: index columns, offsets and flattened histories."""
+    lengths = np.array([len(row['t']) for row in rows], dtype=np.int64)
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    columns = {name: np.array([row[name] for row in rows], dtype=str) for name in TEXT_COLUMNS}
+    columns.update({name: np.array([row[name] for row in rows], dtype=np.float64) for name in NUMERIC_COLUMNS})
+
+    np.savez_compressed(
+        os.path.join(store_dir, part_name),
+        offsets=offsets,
+        t=np.concatenate([row['t'] for row in rows]),
+        noise=np.concatenate([row['noise'] for row in rows]),
+        **columns
+    )
+
+
+def ingest(archive_paths, store_dir, full=False, workers=None):
+    """Ingests new or changed session files into the store.
+
+    Files that no longer exist are dropped, along with parts left without current
+    rows; --full deletes every old part. A file that cannot be parsed is skipped
+    (and rows from an earlier version of it dropped) instead of stopping the run.
+    Returns (files ingested, files removed, [(path, error)]).
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    old_parts = load_manifest(store_dir)['parts']
+    manifest = {'files': {}, 'parts': []} if full else load_manifest(store_dir)
+
+    missing = [p for p in manifest['files'] if not os.path.exists(p)]
+    for path in missing:
+        del manifest['files'][path]
+
+    files = [os.path.abspath(p) for p in find_session_files(archive_paths)]
+    pending = [p for p in files
+               if manifest['files'].get(p, {}).get('signature') != file_signature(p)]
+
+    next_part = max((int(p[len('part-'):-len('.npz')]) for p in manifest['parts']), default=-1) + 1
+    part_name = f"part-{next_part:05d}.npz"
+    rows = []
+    errors = []
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, file_rows, error in pool.map(parse_session_file, pending, chunksize=64):
+                if error:
+                    errors.append((path, error))
+                    manifest['files'].pop(path, None)
+                    continue
+                rows.extend(file_rows)
+                manifest['files'][path] = {'signature': file_signature(path), 'part': part_name}
+
+    if rows:
+        write_part(store_dir, part_name, rows)
+        manifest['parts'].append(part_name)
+    # Drop parts whose files were all re-ingested or deleted
+    used = {entry['part'] for entry in manifest['files'].values()}
+    manifest['parts'] = [p for p in manifest['parts'] if p in used]
+    save_manifest(store_dir, manifest)
+    for part_name in set(old_parts) - set(manifest['parts']):
+        part_path = os.path.join(store_dir, part_name)
+        if os.path.exists(part_path):
+            os.remove(part_path)
+    return len(pending) - len(errors), len(missing), errors
+
+
+def load_store(store_dir):
+    """Loads every part into one columnar dict: index columns, 'offsets', 't' and 'noise'.
+
+    Rows from files that were re-ingested into a later part are dropped.
+    """
+    manifest = load_manifest(store_dir)
+    columns = {name: [] for name in TEXT_COLUMNS + NUMERIC_COLUMNS}
+    t_parts, noise_parts, length_parts = [], [], []
+
+    for part_name in manifest['parts']:
+        with np.load(os.path.join(store_dir, part_name)) as part:
+            current = np.array([manifest['files'].get(f, {}).get('part') == part_name for f in part['path']],
+                               dtype=bool)
+            offsets = part['offsets']
+            lengths = np.diff(offsets)
+            point_mask = np.repeat(current, lengths)
+            for name in columns:
+                # Parts written before a column existed read back as empty/NaN
+                if name in part.files:
+                    columns[name].append(part[name][current])
+                else:
+                    columns[name].append(np.full(current.sum(), '' if name in TEXT_COLUMNS else np.nan))
+            t_parts.append(part['t'][point_mask])
+            noise_parts.append(part['noise'][point_mask])
+            length_parts.append(lengths[current])
+
+    store = {name: np.concatenate(values) if values else np.empty(0) for name, values in columns.items()}
+    lengths = np.concatenate(length_parts) if length_parts else np.empty(0, dtype=np.int64)
+    store['offsets'] = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=store['offsets'][1:])
+    store['t'] = np.concatenate(t_parts) if t_parts else np.empty(0)
+    store['noise'] = np.concatenate(noise_parts) if noise_parts else np.empty(0)
+    return store
+
+
+def select(store, patient=None, label=None, test_id=None, date_from=None, date_to=None):
+    """Boolean row mask for a cohort query over the store index."""
+    mask = np.ones(len(store['path']), dtype=bool)
+    if patient is not None:
+        mask &= np.char.lower(store['patient']) == patient.lower()
+    if label is not None:
+        mask &= store['label'] == label
+    if test_id is not None:
+        mask &= store['test_id'] == test_id
+    # ISO dates (YYYY-MM-DD) compare correctly as strings
+    if date_from is not None:
+        mask &= store['test_date'] >= date_from
+    if date_to is not None:
+        mask &= store['test_date'] <= date_to
+    return mask
+
+
+def history(store, row):
+    start, end = store['offsets'][row], store['offsets'][row + 1]
+    return store['t'][start:end], store['noise'][start:end]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest exported ANL sessions into a columnar NumPy store.")
+    parser.add_argument('paths', nargs='*', default=['.'], help="Session files or directories to scan")
+    parser.add_argument('--store', default='session_store', help="Output store directory")
+    parser.add_argument('--full', action='store_true', help="Rebuild the store instead of ingesting only new files")
+    parser.add_argument('--workers', type=int, default=None, help="Number of parser processes")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count, removed, errors = ingest(args.paths, args.store, full=args.full, workers=args.workers)
+    print(f"Ingested {count} new/changed files, removed {removed} deleted files "
+          f"in {time.perf_counter() - start:.2f}s")
+    for path, error in errors:
+        print(f"  [SKIPPED] {path}: {error}")
+
+    start = time.perf_counter()
+    store = load_store(args.store)
+    print(f"Store: {len(store['path'])} tests, {len(store['t'])} tracking points "
+          f"(loaded in {time.perf_counter() - start:.2f}s)")
+
+    for label in np.unique(store['label']):
+        mask = select(store, label=label)
+        print(f"  {label or '(no label)'}: n={mask.sum()}, "
+              f"mean eANL={np.nanmean(store['eANL'][mask]):.1f} dB, "
+              f"mean aANL={np.nanmean(store['aANL'][mask]):.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import csv
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+from scipy.fft import irfft, next_fast_len, rfft
+from scipy.signal import get_window
+
+DEFAULT_FILES = [
+    "public/audio/history_glass.flac",
+    "public/audio/history_bicycle.flac",
+    "public/audio/history_pencil.flac",
+    "public/audio/history_umbrella.flac"
+]
+REFERENCE_FILE = "public/audio/4-talker_babble.flac"
+
+SEGMENT = 4096              # Welch segment (~93 ms at 44.1 kHz)
+HOP = SEGMENT // 2          # 50% overlap
+SEGMENTS_PER_READ = 256
+# Third-octave bands (ANSI S1.11 nominal centres) used for the spectral comparison
+BAND_CENTRES = [100, 125, 160, 200, 250, 315, 400, 500, 630, 800, 1000, 1250, 1600, 2000, 2500,
+                3150, 4000, 5000, 6300, 8000]
+FIR_TAPS = 4097             # masker shaping filter (odd: linear phase with an integer delay)
+SYNTH_BLOCK = 1 << 18       # samples per synthesis block
+FLOOR_DB = -120.0
+
+
+def welch_psd(file_path, segment=SEGMENT, hop=HOP):
+    """One-sided power spectral density (power/Hz) of a file, averaged over all Hann segments.
+
+    Streams overlapping reads so memory stays at SEGMENTS_PER_READ segments however
+    long the file is. Channels are averaged to mono. Same scaling as
+    scipy.signal.welch(scaling='density', average='mean', detrend=False).
+    """
+    info = sf.info(file_path)
+    window = get_window('hann', segment)
+    scale = 1.0 / (info.samplerate * np.sum(window ** 2))
+    total = np.zeros(segment // 2 + 1)
+    count = 0
+    read = hop * SEGMENTS_PER_READ + (segment - hop)
+    for block in sf.blocks(file_path, blocksize=read, overlap=segment - hop, dtype='float64', always_2d=True):
+        x = block.mean(axis=1)
+        if len(x) < segment:
+            continue
+        # Reads overlap by segment - hop, so the segments tile the file exactly once
+        frames = np.lib.stride_tricks.sliding_window_view(x, segment)[::hop]
+        spectrum = rfft(frames * window, axis=1)
+        total += np.sum(spectrum.real ** 2 + spectrum.imag ** 2, axis=0)
+        count += len(frames)
+
+    psd = total * scale / max(count, 1)
+    psd[1:-1 if segment % 2 == 0 else None] *= 2
+    freqs = np.arange(len(psd)) * info.samplerate / segment
+    return {'file': file_path, 'freqs': freqs, 'psd': psd, 'segments': count, 'sample_rate': info.samplerate}
+
+
+def band_levels(freqs, psd, centres=BAND_CENTRES):
+    """Third-octave band levels (dB) from a PSD."""
+    df = freqs[1] - freqs[0]
+    levels = []
+    for fc in centres:
+        low, high = fc / 2 ** (1 / 6), fc * 2 ** (1 / 6)
+        inside = (freqs >= low) & (freqs < high)
+        power = np.sum(psd[inside]) * df
+        levels.append(10 * math.log10(power) if power > 0 else FLOOR_DB)
+    return np.array(levels)
+
+
+def spectral_difference(passage, reference):
+    """Band-by-band shape difference (dB) after equalising overall level; positive = passage has more."""
+    a = band_levels(passage['freqs'], passage['psd'])
+    b = band_levels(reference['freqs'], reference['psd'])
+    total_a = 10 * np.log10(np.sum(10 ** (a / 10)))
+    total_b = 10 * np.log10(np.sum(10 ** (b / 10)))
+    return (a - total_a) - (b - total_b)
+
+
+def shaping_filter(freqs, psd, sample_rate, taps=FIR_TAPS):
+    """Linear-phase FIR whose magnitude response follows sqrt(PSD), normalised to unit output power.
+
+    White noise of unit variance through this filter has unit variance, so the
+    output level is set by a single gain.
+    """
+    n_fft = 2 * (taps - 1)
+    grid = np.arange(n_fft // 2 + 1) * sample_rate / n_fft
+    magnitude = np.sqrt(np.interp(grid, freqs, psd))
+    impulse = np.roll(irfft(magnitude, n_fft), taps // 2)[:taps]
+    fir = impulse * get_window('hann', taps, fftbins=False)
+    return fir / np.sqrt(np.sum(fir ** 2))
+
+
+def synthesize(fir, sample_rate, duration, output_path, level_db=-23.0, seed=0, block=SYNTH_BLOCK):
+    """Writes speech-shaped noise: white noise filtered by overlap-add FFT convolution, block by block.
+
+    The output RMS is level_db dBFS. Returns the number of frames written.
+    """
+    rng = np.random.default_rng(seed)
+    total = int(round(duration * sample_rate))
+    taps = len(fir)
+    n_fft = next_fast_len(block + taps - 1)
+    response = rfft(fir, n_fft)
+    gain = 10 ** (level_db / 20)
+    # Pre-roll so the first output samples already have the filter's full history
+    warm = rng.standard_normal(taps - 1)
+    carry = irfft(rfft(warm, n_fft) * response, n_fft)[taps - 1:2 * (taps - 1)]
+
+    written = 0
+    with sf.SoundFile(output_path, 'w', samplerate=sample_rate, channels=1, subtype='PCM_24') as out:
+        while written < total:
+            n = min(block, total - written)
+            y = irfft(rfft(rng.standard_normal(n), n_fft) * response, n_fft)
+            y[:taps - 1] += carry
+            carry = y[n:n + taps - 1].copy()
+            out.write(np.clip(y[:n] * gain, -1.0, 1.0))
+            written += n
+    return written
+
+
+def write_spectra(spectra, path):
+    """Writes the LTASS of every file on the first file's frequency grid (dB/Hz).
+
+    Files with a different sample rate or bin count are left out and returned.
+    """
+    freqs = spectra[0]['freqs']
+    written = [s for s in spectra if len(s['freqs']) == len(freqs) and np.array_equal(s['freqs'], freqs)]
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['frequency_hz'] + [os.path.basename(s['file']) for s in written])
+        for i, freq in enumerate(freqs):
+            writer.writerow([round(float(freq), 3)] +
+                            [round(10 * math.log10(s['psd'][i]), 3) if s['psd'][i] > 0 else FLOOR_DB for s in written])
+    return [s for s in spectra if s not in written]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-term average speech spectra and speech-shaped noise maskers.")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help="Speech passages to analyse")
+    parser.add_argument('--reference', default=REFERENCE_FILE, help="Masker to compare the passages against")
+    parser.add_argument('--spectra', help="Write the LTASS of every file (dB/Hz) as CSV")
+    parser.add_argument('--synthesize', help="Passage whose LTASS the synthesized masker should follow")
+    parser.add_argument('--output', default='speech_shaped_noise.flac', help="Synthesized masker file")
+    parser.add_argument('--duration', type=float, default=120.0, help="Masker duration in seconds")
+    parser.add_argument('--level', type=float, default=-23.0, help="Masker RMS level in dBFS")
+    parser.add_argument('--seed', type=int, default=0, help="Noise seed")
+    parser.add_argument('--workers', type=int, default=None, help="Number of analysis processes")
+    args = parser.parse_args()
+
+    files = []
+    for f in args.files + ([args.reference] if args.reference else []):
+        if os.path.exists(f):
+            if f not in files:
+                files.append(f)
+        else:
+            print(f"File not found: {f}")
+    if not files:
+        return
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        spectra = {s['file']: s for s in pool.map(welch_psd, files)}
+    print(f"Computed LTASS of {len(spectra)} files in {time.perf_counter() - start:.2f}s")
+
+    reference = spectra.get(args.reference)
+    if reference is not None:
+        print(f"Spectral shape vs {args.reference} (third-octave bands, level-equalised):")
+        for path, spectrum in spectra.items():
+            if path == args.reference:
+                continue
+            if spectrum['sample_rate'] != reference['sample_rate']:
+                print(f"  {path}: sample rate differs ({spectrum['sample_rate']} vs {reference['sample_rate']} Hz)")
+                continue
+            diff = spectral_difference(spectrum, reference)
+            worst = int(np.argmax(np.abs(diff)))
+            print(f"  {os.path.basename(path)}: RMS deviation {np.sqrt(np.mean(diff ** 2)):.2f} dB, "
+                  f"largest {diff[worst]:+.2f} dB at {BAND_CENTRES[worst]} Hz")
+
+    if args.spectra:
+        skipped = write_spectra(list(spectra.values()), args.spectra)
+        print(f"Saved {args.spectra}")
+        for spectrum in skipped:
+            print(f"  Left out {spectrum['file']}: sample rate {spectrum['sample_rate']} Hz does not match the "
+                  f"first file's frequency grid")
+
+    if args.synthesize:
+        target = spectra.get(args.synthesize) or welch_psd(args.synthesize)
+        fir = shaping_filter(target['freqs'], target['psd'], target['sample_rate'])
+        start = time.perf_counter()
+        frames = synthesize(fir, target['sample_rate'], args.duration, args.output, args.level, args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"Synthesized {frames / target['sample_rate']:.0f}s of speech-shaped noise in {elapsed:.2f}s "
+              f"({frames / target['sample_rate'] / elapsed:.0f}x real time): {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import argparse
 import os
 import subprocess
 import sys
 
+from speech_level import METHODS as LEVEL_METHODS, level_db, measure_file
+
+# loudnorm is ffmpeg's two-pass EBU R128 normalization; the others apply one gain to a measured level
+METHODS = ['loudnorm'] + LEVEL_METHODS
+
 def check_ffmpeg():
     try:
         subprocess.run(['ffmpeg', '-version'], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
@@ -9,24 +15,29 @@ def check_ffmpeg():
         print("Error: ffmpeg is not installed or not in PATH.")
         sys.exit(1)
 
-def normalize_file(file_path):
+def normalize_file(file_path, method='loudnorm', target=-23.0):
     if not os.path.exists(file_path):
         print(f"Skipping (not found): {file_path}")
         return
 
-    print(f"Normalizing {file_path} to -23 LUFS...")
-    
     # We use a temporary file to store the normalized output
     temp_file = file_path + ".temp.flac"
-    
-    # FFmpeg command for 2-pass Loudness Normalization (using loudnorm)
-    # Target Integrated Loudness: -23.0 LUFS
-    # Target True Peak: -1.0 dBTP
-    # Loudness Range: 7.0 LU
-    
+
+    if method == 'loudnorm':
+        print(f"Normalizing {file_path} to {target:g} LUFS...")
+        # FFmpeg command for 2-pass Loudness Normalization (using loudnorm)
+        # Target True Peak: -1.0 dBTP
+        # Loudness Range: 7.0 LU
+        audio_filter = f'loudnorm=I={target:g}:TP=-1.0:LRA=7'
+    else:
+        # Level of the speech-active parts only (or whole-file RMS), as in normalize_rms.py
+        gain_db = target - level_db(measure_file(file_path), method)
+        print(f"Normalizing {file_path} to {target:g} dBFS {method.upper()} level (gain {gain_db:+.2f} dB)...")
+        audio_filter = f'volume={gain_db:.4f}dB'
+
     cmd = [
         'ffmpeg', '-y', '-i', file_path,
-        '-af', 'loudnorm=I=-23:TP=-1.0:LRA=7',
+        '-af', audio_filter,
         temp_file
     ]
 
@@ -41,6 +52,12 @@ def normalize_file(file_path):
             os.remove(temp_file)
 
 def main():
+    parser = argparse.ArgumentParser(description="Normalize the test audio in place with ffmpeg.")
+    parser.add_argument('--method', default='loudnorm', choices=METHODS,
+                        help="ffmpeg loudnorm (LUFS), whole-file RMS, P.56 active speech level or VAD-gated RMS")
+    parser.add_argument('--target', type=float, default=-23.0, help="Target level (LUFS for loudnorm, else dBFS)")
+    args = parser.parse_args()
+
     check_ffmpeg()
 
     audio_dir = "public/audio"
@@ -54,7 +71,7 @@ def main():
     ]
 
     for f in files_to_normalize:
-        normalize_file(os.path.join(audio_dir, f))
+        normalize_file(os.path.join(audio_dir, f), args.method, args.target)
 
 if __name__ == "__main__":
     main()
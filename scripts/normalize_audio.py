@@ -1,8 +1,11 @@
 
+import argparse
 import subprocess
 import re
 import os
 
+from speech_level import level_db, measure_file
+
 files = [
     'public/audio/anl_speech.flac',
     'public/audio/4-talker_babble.flac',
@@ -22,12 +25,23 @@ def get_mean_volume(file_path):
         return float(match.group(1))
     return None
 
-print("--- Audio Normalization (Target: Lowest RMS) ---")
+def get_level(file_path, method):
+    """volumedetect mean volume, or the P.56 active speech / VAD-gated level from speech_level.py."""
+    if method == 'volumedetect':
+        return get_mean_volume(file_path)
+    return round(level_db(measure_file(file_path), method), 2)
+
+parser = argparse.ArgumentParser(description="Match the speech, babble and calibration files to the quietest one.")
+parser.add_argument('--method', default='volumedetect', choices=['volumedetect', 'active', 'vad'],
+                    help="Level compared: ffmpeg volumedetect mean volume, P.56 active speech level or VAD-gated RMS")
+args = parser.parse_args()
+
+print(f"--- Audio Normalization (Target: Lowest {args.method} level) ---")
 
 levels = {}
 for f in files:
     if os.path.exists(f):
-        vol = get_mean_volume(f)
+        vol = get_level(f, args.method)
         if vol is not None:
             levels[f] = vol
             print(f"{f}: {vol} dB")
@@ -73,5 +87,5 @@ for f, vol in levels.items():
 
 print("\n--- Verification ---")
 for f in levels.keys():
-    vol = get_mean_volume(f)
+    vol = get_level(f, args.method)
     print(f"{f}: {vol} dB")
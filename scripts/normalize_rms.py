@@ -1,9 +1,12 @@
 
+import argparse
 import os
 import soundfile as sf
 import numpy as np
 import math
 
+from speech_level import METHODS, level_db, measure_samples
+
 def calculate_rms(data):
     """Calculates RMS amplitude of the audio data."""
     # Ensure data is floating point
@@ -15,7 +18,7 @@ def calculate_rms(data):
 def db_to_linear(db_value):
     return 10 ** (db_value / 20)
 
-def normalize_file(file_path, target_db_rms=-23.0):
+def normalize_file(file_path, target_db_rms=-23.0, method='rms'):
     print(f"Processing {file_path}...")
     
     # Load audio
@@ -31,12 +34,16 @@ def normalize_file(file_path, target_db_rms=-23.0):
         print(f"Warning: Silent file {file_path}")
         return
 
-    current_db = 20 * math.log10(current_rms)
+    if method == 'rms':
+        current_db = 20 * math.log10(current_rms)
+    else:
+        # Level of the speech-active parts only, so pauses don't lower the measured level
+        current_db = level_db(measure_samples(data, samplerate), method)
     gain_db = target_db_rms - current_db
     gain_linear = db_to_linear(gain_db)
     
-    print(f"  Current RMS: {current_db:.2f} dB")
-    print(f"  Target RMS:  {target_db_rms:.2f} dB")
+    print(f"  Current {method.upper()} level: {current_db:.2f} dB")
+    print(f"  Target {method.upper()} level:  {target_db_rms:.2f} dB")
     print(f"  Gain needed: {gain_db:.2f} dB (x{gain_linear:.4f})")
     
     # Apply gain
@@ -62,7 +69,13 @@ def normalize_file(file_path, target_db_rms=-23.0):
     print(f"  Saved normalized file to {file_path}")
 
 def main():
-    target_rms = -23.0
+    parser = argparse.ArgumentParser(description="Normalize the test audio to a common level.")
+    parser.add_argument('--target', type=float, default=-23.0, help="Target level in dBFS")
+    parser.add_argument('--method', default='rms', choices=METHODS,
+                        help="Level measured: whole-file RMS, P.56 active speech level or VAD-gated RMS")
+    args = parser.parse_args()
+
+    target_rms = args.target
     files = [
         "public/audio/4-talker_babble.flac",
         "public/audio/history_glass.flac",
@@ -71,10 +84,10 @@ def main():
         "public/audio/history_umbrella.flac"
     ]
     
-    print(f"Normalizing to Target RMS: {target_rms} dB")
+    print(f"Normalizing to Target {args.method.upper()} level: {target_rms} dB")
     for f in files:
         if os.path.exists(f):
-            normalize_file(f, target_rms)
+            normalize_file(f, target_rms, args.method)
         else:
             print(f"File not found: {f}")
 
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import os
+import time
+from itertools import combinations
+
+import numpy as np
+
+from ingest_sessions import load_manifest
+
+CACHE_DIR = "normative"
+MEASURES = ('aANL', 'eANL')
+STRATA = ('speech_file', 'label', 'age_band')
+ANY = '*'
+SEPARATOR = '\x1f'
+# Bump when the cached per-part counts change meaning
+COUNTS_VERSION = 2
+# Lower bounds (years) of each age band; ages are optional in exports
+AGE_BANDS = [(0, '<18'), (18, '18-39'), (40, '40-59'), (60, '60-69'), (70, '70-79'), (80, '80+')]
+# Strata with fewer tests than this fall back to a broader one
+MIN_STRATUM = 20
+# Fallback order: drop age first, then label, then passage
+FALLBACK = [(0, 1, 2), (0, 1), (0,), ()]
+# Every combination of exact/any fields is counted, so any stratum can be looked up directly
+SUBSETS = [kept for r in range(len(STRATA) + 1) for kept in combinations(range(len(STRATA)), r)]
+
+
+def age_band(age):
+    """Age band label per test ('' when the age is unknown)."""
+    age = np.asarray(age, dtype=np.float64)
+    bounds = np.array([low for low, _ in AGE_BANDS])
+    labels = np.array([''] + [name for _, name in AGE_BANDS])
+    index = np.where(np.isnan(age), 0, np.searchsorted(bounds, np.nan_to_num(age), side='right'))
+    return labels[index]
+
+
+def passage_name(speech_file):
+    """Passage file name without the app's path ('audio/history_glass.flac' -> 'history_glass.flac')."""
+    return np.char.rpartition(np.asarray(speech_file, dtype=str), '/')[..., 2]
+
+
+def passages(table):
+    """Speech passages with their own strata in a compiled table."""
+    names = np.char.partition(table['strata'].astype(str), SEPARATOR)[:, 0] if len(table['strata']) else []
+    return sorted(set(names) - {ANY, ''})
+
+
+def stratum_key(speech_file=ANY, label=ANY, band=ANY):
+    return SEPARATOR.join((speech_file, label, band))
+
+
+def _reduce(keys, values, counts):
+    """Sums counts of identical (stratum, value) pairs; output sorted by stratum, then value."""
+    strata, stratum_index = np.unique(keys, return_inverse=True)
+    order = np.lexsort((values, stratum_index))
+    stratum_index, values, counts = stratum_index[order], values[order], counts[order]
+    new = np.ones(len(values), dtype=bool)
+    new[1:] = (stratum_index[1:] != stratum_index[:-1]) | (values[1:] != values[:-1])
+    group = np.cumsum(new) - 1
+    return strata[stratum_index[new]], values[new], np.bincount(group, weights=counts).astype(np.int64)
+
+
+def count_table(columns, measure):
+    """(stratum, value, count) triples for one measure, over every combination of exact/any strata."""
+    values = columns[measure]
+    valid = ~np.isnan(values)
+    fields = [passage_name(columns['speech_file'][valid]), columns['label'][valid], age_band(columns['age'][valid])]
+    values = values[valid]
+    keys, repeated = [], []
+    for kept in SUBSETS:
+        parts = [fields[i] if i in kept else np.full(len(values), ANY) for i in range(len(STRATA))]
+        keys.append(np.char.add(np.char.add(np.char.add(parts[0], SEPARATOR), np.char.add(parts[1], SEPARATOR)),
+                                parts[2]))
+        repeated.append(values)
+    if not len(values):
+        return np.empty(0, dtype=str), np.empty(0), np.empty(0, dtype=np.int64)
+    return _reduce(np.concatenate(keys), np.concatenate(repeated), np.ones(len(keys) * len(values), dtype=np.int64))
+
+
+def part_signature(path):
+    stat = os.stat(path)
+    return np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)
+
+
+def part_counts(store_dir, part_name, current):
+    """Count tables for the current rows of one store part, cached by part signature and row mask."""
+    part_path = os.path.join(store_dir, part_name)
+    cache_path = os.path.join(store_dir, CACHE_DIR, part_name.replace('.npz', '.counts.npz'))
+    signature = part_signature(part_path)
+    mask_digest = hashlib.sha1(np.packbits(current).tobytes()).hexdigest()
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if ('version' in cached.files and int(cached['version']) == COUNTS_VERSION
+                    and np.array_equal(cached['signature'], signature) and str(cached['mask_digest']) == mask_digest):
+                return {m: (cached[f'{m}_strata'], cached[f'{m}_values'], cached[f'{m}_counts']) for m in MEASURES}, False
+
+    with np.load(part_path) as part:
+        # Parts written before a column existed have no passage/age information
+        rows = int(current.sum())
+        columns = {name: part[name][current] if name in part.files else np.full(rows, np.nan)
+                   for name in MEASURES + ('age',)}
+        for name in ('speech_file', 'label'):
+            columns[name] = part[name][current] if name in part.files else np.full(rows, '')
+    tables = {m: count_table(columns, m) for m in MEASURES}
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    arrays = {}
+    for m, (strata, values, counts) in tables.items():
+        arrays.update({f'{m}_strata': strata, f'{m}_values': values, f'{m}_counts': counts})
+    np.savez_compressed(cache_path, version=COUNTS_VERSION, signature=signature, mask_digest=np.array(mask_digest),
+                        **arrays)
+    return tables, True
+
+
+def build_tables(store_dir):
+    """Merges the per-part count tables into compiled lookup tables.
+
+    For each measure and stratum the table keeps the sorted distinct values and
+    their cumulative counts, so a percentile is two binary searches. Only parts
+    whose file or current-row selection changed are recounted.
+    Returns (tables, parts recounted).
+    """
+    manifest = load_manifest(store_dir)
+    per_part = []
+    recounted = 0
+    for part_name in manifest['parts']:
+        with np.load(os.path.join(store_dir, part_name)) as part:
+            # Same row selection as load_store: drop rows superseded by a later part
+            current = np.array([manifest['files'].get(f, {}).get('part') == part_name for f in part['path']],
+                               dtype=bool)
+        tables, computed = part_counts(store_dir, part_name, current)
+        per_part.append(tables)
+        recounted += computed
+
+    compiled = {}
+    for m in MEASURES:
+        blocks = [tables[m] for tables in per_part if len(tables[m][0])]
+        if blocks:
+            strata, values, counts = _reduce(*(np.concatenate(parts) for parts in zip(*blocks)))
+        else:
+            strata, values, counts = np.empty(0, dtype=str), np.empty(0), np.empty(0, dtype=np.int64)
+        names, starts = np.unique(strata, return_index=True)
+        offsets = np.append(starts, len(values)).astype(np.int64)
+        cumulative = np.cumsum(counts)
+        # Cumulative counts restart in every stratum
+        base = np.repeat(cumulative[starts] - counts[starts], np.diff(offsets))
+        compiled[m] = {'strata': names, 'offsets': offsets, 'values': values, 'cumulative': cumulative - base}
+    return compiled, recounted
+
+
+def save_tables(tables, path):
+    arrays = {f'{m}_{name}': array for m, table in tables.items() for name, array in table.items()}
+    np.savez_compressed(path, **arrays)
+
+
+def load_tables(path):
+    with np.load(path) as data:
+        return {m: {name: data[f'{m}_{name}'] for name in ('strata', 'offsets', 'values', 'cumulative')}
+                for m in MEASURES if f'{m}_strata' in data.files}
+
+
+def resolve_stratum(table, speech_file=ANY, label=ANY, band=ANY, min_count=MIN_STRATUM):
+    """Most specific stratum with at least min_count tests. Returns (stratum index, key) or (-1, None)."""
+    fields = (speech_file, label, band)
+    for kept in FALLBACK:
+        key = stratum_key(*(fields[i] if i in kept else ANY for i in range(len(STRATA))))
+        i = np.searchsorted(table['strata'], key)
+        if i < len(table['strata']) and table['strata'][i] == key:
+            if table['cumulative'][table['offsets'][i + 1] - 1] >= min_count:
+                return int(i), key
+    return -1, None
+
+
+def percentiles(table, stratum, scores):
+    """Mid-rank percentiles (0-100) of scores within one stratum: O(log n) per score."""
+    start, stop = table['offsets'][stratum], table['offsets'][stratum + 1]
+    values = table['values'][start:stop]
+    cumulative = table['cumulative'][start:stop]
+    scores = np.asarray(scores, dtype=np.float64)
+    left = np.searchsorted(values, scores, side='left')
+    right = np.searchsorted(values, scores, side='right')
+    below = np.where(left > 0, cumulative[np.maximum(left - 1, 0)], 0)
+    through = np.where(right > 0, cumulative[np.maximum(right - 1, 0)], 0)
+    return 100 * (below + (through - below) / 2) / cumulative[-1]
+
+
+def percentile(tables, measure, score, speech_file=ANY, label=ANY, age=None, min_count=MIN_STRATUM):
+    """Percentile of one score in the most specific stratum with enough data.
+
+    Returns (percentile, stratum description, tests in the stratum); the percentile is
+    NaN when even the whole archive has fewer than min_count tests.
+    """
+    table = tables[measure]
+    band = ANY if age is None else age_band([age])[0]
+    if speech_file != ANY:
+        speech_file = str(passage_name(speech_file))
+    stratum, key = resolve_stratum(table, speech_file, label, band, min_count)
+    if stratum < 0:
+        return np.nan, None, 0
+    n = int(table['cumulative'][table['offsets'][stratum + 1] - 1])
+    description = ', '.join(f"{name}={value}" for name, value in zip(STRATA, key.split(SEPARATOR)) if value != ANY)
+    return float(percentiles(table, stratum, [score])[0]), description or 'all tests', n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stratified normative percentile tables for aANL/eANL.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--output', default='normative_tables.npz', help="Compiled lookup tables")
+    parser.add_argument('--measure', default='aANL', choices=MEASURES)
+    parser.add_argument('--score', type=float, help="Look up the percentile of this score instead of rebuilding")
+    parser.add_argument('--speech-file', default=ANY, help="Speech passage of the test (e.g. history_glass.flac)")
+    parser.add_argument('--label', default=ANY, help="Test label (e.g. 'New Hearing Aids')")
+    parser.add_argument('--age', type=float, help="Patient age in years")
+    parser.add_argument('--min-count', type=int, default=MIN_STRATUM, help="Smallest stratum used before falling back")
+    args = parser.parse_args()
+
+    if args.score is not None:
+        if not os.path.exists(args.output):
+            print(f"Tables not found: {args.output} (run normative_tables.py --store ... first)")
+            return
+        tables = load_tables(args.output)
+        known = passages(tables[args.measure])
+        if args.speech_file != ANY and str(passage_name(args.speech_file)) not in known:
+            print(f"Unknown speech passage: {args.speech_file} (tables have {', '.join(known) or 'none'})")
+            return
+        value, stratum, n = percentile(tables, args.measure, args.score, args.speech_file, args.label, args.age,
+                                       args.min_count)
+        if stratum is None:
+            print(f"Not enough data for a {args.measure} percentile (fewer than {args.min_count} tests)")
+        else:
+            print(f"{args.measure} {args.score:+.1f} dB: {value:.0f}th percentile ({stratum}, n={n})")
+        return
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    start = time.perf_counter()
+    tables, recounted = build_tables(args.store)
+    save_tables(tables, args.output)
+    print(f"Built normative tables in {time.perf_counter() - start:.2f}s ({recounted} parts recounted)")
+    for m, table in tables.items():
+        totals = table['cumulative'][table['offsets'][1:] - 1] if len(table['strata']) else []
+        print(f"  {m}: {len(table['strata'])} strata, {len(table['values'])} distinct values")
+        for key, n in sorted(zip(table['strata'], totals), key=lambda x: -x[1])[:8]:
+            fields = key.split(SEPARATOR)
+            print(f"    passage={fields[0]} label={fields[1]} age={fields[2]}: n={n}")
+    print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
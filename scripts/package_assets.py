@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "asset-manifest.json"
+ASSET_EXTENSIONS = ('.flac', '.wav', '.mp3', '.ogg', '.opus')
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hash_file(path):
+    """SHA-256 of a file, read in 1 MB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_assets(asset_dir):
+    """Returns {name: {'sha256', 'bytes'}} for every audio asset in asset_dir."""
+    assets = {}
+    for name in sorted(os.listdir(asset_dir)):
+        path = os.path.join(asset_dir, name)
+        if os.path.isfile(path) and name.lower().endswith(ASSET_EXTENSIONS):
+            assets[name] = {'sha256': hash_file(path), 'bytes': os.path.getsize(path)}
+    return assets
+
+
+def build_manifest(assets):
+    """Groups assets by content hash; the first name (sorted) of each group is canonical."""
+    canonical_by_hash = {}
+    aliases = {}
+    for name, info in assets.items():
+        canonical = canonical_by_hash.setdefault(info['sha256'], name)
+        if canonical != name:
+            aliases[name] = canonical
+    return {
+        'version': 1,
+        'assets': {name: dict(info, canonical=aliases.get(name, name)) for name, info in assets.items()},
+        'aliases': aliases
+    }
+
+
+def load_manifest(asset_dir):
+    path = os.path.join(asset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def merge_previous(manifest, previous, assets):
+    """Keeps aliases from an earlier --apply run whose files are already gone.
+
+    Without this a second run over the same output would find no duplicates and
+    drop aliases the app still needs. An alias is kept while its canonical file exists.
+    """
+    for alias, canonical in (previous or {}).get('aliases', {}).items():
+        if alias in assets or canonical not in assets:
+            continue
+        manifest['aliases'][alias] = canonical
+        info = previous.get('assets', {}).get(alias) or assets[canonical]
+        manifest['assets'][alias] = {'sha256': info['sha256'], 'bytes': info['bytes'], 'canonical': canonical}
+    manifest['aliases'] = dict(sorted(manifest['aliases'].items()))
+    manifest['assets'] = dict(sorted(manifest['assets'].items()))
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate audio assets and write an alias manifest for the app.")
+    parser.add_argument('asset_dir', nargs='?', default='public/audio', help="Audio asset directory")
+    parser.add_argument('--apply', action='store_true',
+                        help="Delete alias files (run on build output such as dist/audio, not on public/audio)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.asset_dir):
+        print(f"Directory not found: {args.asset_dir}")
+        return
+
+    assets = scan_assets(args.asset_dir)
+    manifest = merge_previous(build_manifest(assets), load_manifest(args.asset_dir), assets)
+
+    print(f"--- Asset Deduplication ({args.asset_dir}) ---")
+    saved = 0
+    for alias, canonical in manifest['aliases'].items():
+        size = manifest['assets'][alias]['bytes']
+        saved += size
+        if alias not in assets:
+            print(f"  {alias} -> {canonical} (already removed)")
+            continue
+        print(f"  {alias} -> {canonical} ({size / 1e6:.2f} MB duplicate)")
+        if args.apply:
+            os.remove(os.path.join(args.asset_dir, alias))
+
+    manifest_path = os.path.join(args.asset_dir, MANIFEST_NAME)
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+
+    total = sum(info['bytes'] for info in manifest['assets'].values())
+    print(f"{len(manifest['assets'])} assets, {len(manifest['aliases'])} duplicates, "
+          f"{saved / 1e6:.2f} MB of {total / 1e6:.2f} MB saved")
+    if any(alias in assets for alias in manifest['aliases']) and not args.apply:
+        print("Duplicates kept on disk (use --apply on the build output to remove them).")
+    print(f"Saved manifest to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
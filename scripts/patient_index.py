@@ -0,0 +1,208 @@
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from anl_scoring import find_session_files, normalize_patient
+from session_stream import iter_payloads, parse_session
+
+INDEX_VERSION = 1
+DEFAULT_INDEX = "anl_index.sqlite"
+# Directory scans pick up single exports and bundles of concatenated payloads
+FILE_PATTERNS = ('*.json', '*.jsonl', '*.ndjson')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    path TEXT NOT NULL REFERENCES files(path) ON DELETE CASCADE,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    patient_key TEXT NOT NULL,
+    patient TEXT NOT NULL,
+    test_date TEXT NOT NULL,
+    test_id TEXT NOT NULL,
+    label TEXT NOT NULL,
+    speech_file TEXT NOT NULL,
+    eANL REAL,
+    eBNL REAL,
+    aANL REAL,
+    se REAL,
+    stability_sd REAL,
+    reversal_count REAL,
+    duration_seconds REAL
+);
+CREATE INDEX IF NOT EXISTS tests_patient ON tests (patient_key, test_date);
+CREATE INDEX IF NOT EXISTS tests_path ON tests (path);
+"""
+
+TEST_COLUMNS = ['path', 'offset', 'length', 'patient_key', 'patient', 'test_date', 'test_id', 'label',
+                'speech_file', 'eANL', 'eBNL', 'aANL', 'se', 'stability_sd', 'reversal_count', 'duration_seconds']
+
+
+def name_from_file(path):
+    """Patient name from ANL_Test_<patientName>_<testDate>.json, for sessions saved without one."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if not stem.startswith('ANL_Test_'):
+        return ''
+    return stem[len('ANL_Test_'):].rsplit('_', 1)[0].replace('_', ' ')
+
+
+def _number(value):
+    return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+
+def index_file(path):
+    """Index rows for every test in a session file or bundle, with the byte range of its session.
+
+    Returns (path, size, mtime_ns, rows, error); a file that cannot be parsed gives no rows and the error text.
+    """
+    try:
+        stat = os.stat(path)
+        return path, stat.st_size, stat.st_mtime_ns, file_rows(path), None
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return path, None, None, [], f"{type(e).__name__}: {e}"
+
+
+def file_rows(path):
+    rows = []
+    with open(path, 'rb') as f:
+        for offset, data in iter_payloads(f):
+            session, histories = parse_session(data)
+            patient = session.get('patientName') or name_from_file(path)
+            for test_id in ('A', 'B'):
+                result = session.get(f'results{test_id}')
+                if not result or not len(histories.get(f'results{test_id}', ((),))[0]):
+                    continue
+                score = result.get('score') or {}
+                validity = result.get('validity') or {}
+                meta = result.get('meta') or {}
+                rows.append((path, offset, len(data), normalize_patient(patient), patient,
+                             session.get('testDate') or '', test_id, session.get(f'label{test_id}') or '',
+                             result.get('speechFile') or '', _number(score.get('eANL')), _number(score.get('eBNL')),
+                             _number(validity.get('aANL')), _number(validity.get('se')),
+                             _number(validity.get('stability_sd')), _number(meta.get('reversal_count')),
+                             _number(meta.get('duration_seconds'))))
+    return rows
+
+
+def connect(index_path):
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA foreign_keys = ON")
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version not in (0, INDEX_VERSION):
+        conn.close()
+        raise ValueError(f"Index {index_path} has version {version}; rebuild it with --full")
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+    return conn
+
+
+def update_index(conn, paths, full=False, workers=None):
+    """Indexes new or changed files and drops files that no longer exist.
+
+    A file that cannot be parsed is skipped (and tests from an earlier version of
+    it dropped) instead of aborting the update. Returns (files indexed, files
+    removed, [(path, error)]).
+    """
+    if full:
+        conn.execute("DELETE FROM files")
+    known = {path: (size, mtime) for path, size, mtime in conn.execute("SELECT path, size, mtime_ns FROM files")}
+    files = [os.path.abspath(p) for p in find_session_files(paths, FILE_PATTERNS)]
+    pending = []
+    for path in files:
+        stat = os.stat(path)
+        if known.get(path) != (stat.st_size, stat.st_mtime_ns):
+            pending.append(path)
+    missing = [path for path in known if not os.path.exists(path)]
+
+    errors = []
+    with conn:
+        conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in missing])
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for path, size, mtime, rows, error in pool.map(index_file, pending, chunksize=64):
+                # Replacing the file row cascades to its old tests
+                conn.execute("DELETE FROM files WHERE path = ?", (path,))
+                if error:
+                    errors.append((path, error))
+                    continue
+                conn.execute("INSERT INTO files (path, size, mtime_ns) VALUES (?, ?, ?)", (path, size, mtime))
+                conn.executemany(f"INSERT INTO tests ({', '.join(TEST_COLUMNS)}) "
+                                 f"VALUES ({', '.join('?' * len(TEST_COLUMNS))})", rows)
+    return len(pending) - len(errors), len(missing), errors
+
+
+def patient_history(conn, patient):
+    """Every indexed test of one patient, oldest first, as dicts."""
+    cursor = conn.execute(f"SELECT {', '.join(TEST_COLUMNS)} FROM tests WHERE patient_key = ? "
+                          f"ORDER BY test_date, path, offset, test_id", (normalize_patient(patient),))
+    return [dict(zip(TEST_COLUMNS, row)) for row in cursor]
+
+
+def load_session(row):
+    """Reads just the indexed session back from its file. Returns (session, histories)."""
+    with open(row['path'], 'rb') as f:
+        f.seek(row['offset'])
+        return parse_session(f.read(row['length']))
+
+
+def label_trends(history):
+    """First-to-last eANL change per label across visits."""
+    trends = {}
+    for row in history:
+        if row['eANL'] is None:
+            continue
+        first, _, _, count = trends.get(row['label'], (row, None, None, 0))
+        trends[row['label']] = (first, row, row['eANL'] - first['eANL'], count + 1)
+    return trends
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index exported sessions by patient for fast history lookups.")
+    parser.add_argument('paths', nargs='*', default=['.'],
+                        help="Session files, bundles or directories to index")
+    parser.add_argument('--index', default=DEFAULT_INDEX, help="SQLite index file")
+    parser.add_argument('--full', action='store_true', help="Rebuild the index instead of updating it")
+    parser.add_argument('--patient', help="Show the indexed history of this patient instead of updating")
+    parser.add_argument('--workers', type=int, default=None, help="Number of parser processes")
+    args = parser.parse_args()
+
+    if args.patient:
+        if not os.path.exists(args.index):
+            print(f"Index not found: {args.index}")
+            return
+        conn = connect(args.index)
+        start = time.perf_counter()
+        history = patient_history(conn, args.patient)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{len(history)} tests for '{args.patient}' ({elapsed:.1f} ms)")
+        for row in history:
+            eanl = "n/a" if row['eANL'] is None else f"{row['eANL']:.1f}"
+            aanl = "n/a" if row['aANL'] is None else f"{row['aANL']:.1f}"
+            print(f"  {row['test_date']}  {row['test_id']}  {row['label'] or '(no label)':<28} "
+                  f"eANL {eanl:>6}  aANL {aanl:>6}  {os.path.basename(row['path'])}")
+        for label, (first, last, change, count) in label_trends(history).items():
+            if count > 1:
+                print(f"  {label or '(no label)'}: eANL {change:+.1f} dB from {first['test_date']} "
+                      f"to {last['test_date']} over {count} tests")
+        conn.close()
+        return
+
+    start = time.perf_counter()
+    conn = connect(args.index)
+    indexed, removed, errors = update_index(conn, args.paths, args.full, args.workers)
+    files, tests, patients = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM files), COUNT(*), COUNT(DISTINCT patient_key) FROM tests").fetchone()
+    conn.close()
+    print(f"Indexed {indexed} new/changed files, removed {removed} in {time.perf_counter() - start:.2f}s")
+    for path, error in errors:
+        print(f"  [SKIPPED] {path}: {error}")
+    print(f"Index: {files} files, {tests} tests, {patients} patients")
+
+
+if __name__ == "__main__":
+    main()
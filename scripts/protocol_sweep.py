@@ -0,0 +1,281 @@
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from anl_scoring import DEFAULT_SPEECH_LEVEL, score_batch, session_ids
+from ingest_sessions import load_manifest, load_store
+from significance import pair_rows
+from simulate_listener import CHUNK_SIZE, LISTENER, PROTOCOL, draw_listeners, simulate
+
+# Values swept for each protocol parameter (current protocol values included)
+GRID = {
+    'initial_rate': [1.0, 2.0],
+    'final_rate': [0.5, 1.0],
+    'rate_switch_reversals': [4, 6, 8],
+    'debounce_seconds': [0.5, 1.0, 1.5],
+    'duration_seconds': [90, 120, 150],
+    'ignore_seconds': [20, 30, 40],
+}
+
+# These change how a session runs; the rest only change how it is scored
+DYNAMIC_PARAMS = ['initial_rate', 'final_rate', 'rate_switch_reversals', 'debounce_seconds']
+
+COLUMNS = ['source'] + list(GRID) + [
+    'n', 'aANL_bias', 'aANL_sd', 'aANL_rmse', 'eANL_bias', 'eANL_sd', 'missing',
+    'shift_vs_current', 'retest_sd', 'reversal_count', 'test_seconds', 'stabilization_seconds'
+]
+
+
+def truncate(t, noise, offsets, duration):
+    """Cuts every session of a ragged batch at `duration` seconds."""
+    keep = t <= duration
+    counts = np.bincount(session_ids(offsets)[keep], minlength=len(offsets) - 1)
+    return t[keep], noise[keep], np.concatenate(([0], np.cumsum(counts)))
+
+
+def _error_stats(estimate, truth):
+    error = estimate - truth
+    valid = ~np.isnan(error)
+    if valid.sum() < 2:
+        return np.nan, np.nan, np.nan
+    return (float(np.mean(error[valid])), float(np.std(error[valid], ddof=1)),
+            float(np.sqrt(np.mean(error[valid] ** 2))))
+
+
+def _simulate_config(job):
+    """Simulates one set of dynamic parameters once, at the longest requested duration, and
+    scores the requested (duration, ignore window) combinations from the same histories."""
+    dynamics, combinations, n_runs, seed, listener, speech_level = job
+    protocol = dict(PROTOCOL, **dynamics, duration_seconds=max(d for d, _ in combinations))
+    # Every configuration gets the same seeds, so configurations are compared on the
+    # same listeners (common random numbers). Each chunk has its own seed, so a chunk's
+    # listeners do not depend on how many ticks the chunks before it used.
+    seeds = np.random.SeedSequence(seed).spawn(int(np.ceil(n_runs / CHUNK_SIZE)))
+    true_anl, parts = [], []
+    for i, chunk_seed in enumerate(seeds):
+        rng = np.random.default_rng(chunk_seed)
+        chunk_anl, latency = draw_listeners(rng, min(CHUNK_SIZE, n_runs - i * CHUNK_SIZE), listener)
+        true_anl.append(chunk_anl)
+        parts.append(simulate(chunk_anl, latency, rng, protocol, listener, speech_level))
+    true_anl = np.concatenate(true_anl)
+    t = parts[0][0]
+    history = np.concatenate([p[1] for p in parts])
+
+    rows = []
+    for duration in dict.fromkeys(d for d, _ in combinations):
+        # The state machine is causal, so a shorter test is a prefix of the longer one
+        # (up to and including the first tick at or past the duration)
+        n_points = min(int(np.searchsorted(t, duration, side='left')) + 1, len(t))
+        offsets = np.arange(n_runs + 1, dtype=np.int64) * n_points
+        flat_t = np.tile(t[:n_points], n_runs)
+        flat_noise = np.ascontiguousarray(history[:, :n_points]).ravel()
+        for ignore in [i for d, i in combinations if d == duration]:
+            columns = score_batch(flat_t, flat_noise, offsets, speech_level, ignore_seconds=ignore)
+            a_bias, a_sd, a_rmse = _error_stats(columns['aANL'], true_anl)
+            e_bias, e_sd, _ = _error_stats(columns['eANL'], true_anl)
+            rows.append(dict(dynamics, source='simulated', duration_seconds=duration, ignore_seconds=ignore,
+                             n=n_runs, aANL_bias=a_bias, aANL_sd=a_sd, aANL_rmse=a_rmse,
+                             eANL_bias=e_bias, eANL_sd=e_sd,
+                             missing=int(np.isnan(columns['aANL']).sum()),
+                             reversal_count=float(np.mean(columns['reversal_count'])),
+                             test_seconds=float(np.mean(columns['duration_seconds'])),
+                             stabilization_seconds=float(np.nanmean(columns['stabilization_seconds']))))
+    return rows
+
+
+def _replay_duration(job):
+    """Re-scores archived histories cut at one duration with every ignore window."""
+    store_dir, duration, ignores = job
+    store = load_store(store_dir)
+    speech_levels = np.where(np.isnan(store['speech_level']), DEFAULT_SPEECH_LEVEL, store['speech_level'])
+    current = score_batch(store['t'], store['noise'], store['offsets'], speech_levels,
+                          ignore_seconds=PROTOCOL['ignore_seconds'])['aANL']
+    t, noise, offsets = truncate(store['t'], store['noise'], store['offsets'], duration)
+    rows_a, rows_b = pair_rows(store)
+
+    rows = []
+    for ignore in ignores:
+        columns = score_batch(t, noise, offsets, speech_levels, ignore_seconds=ignore)
+        shift = columns['aANL'] - current
+        retest = columns['aANL'][rows_a] - columns['aANL'][rows_b]
+        rows.append({
+            'source': 'archived', 'duration_seconds': duration, 'ignore_seconds': ignore,
+            'n': len(columns['aANL']),
+            'missing': int(np.isnan(columns['aANL']).sum()),
+            'shift_vs_current': float(np.nanmean(shift)) if np.any(~np.isnan(shift)) else np.nan,
+            'retest_sd': float(np.nanstd(retest, ddof=1)) if np.sum(~np.isnan(retest)) > 1 else np.nan,
+            'reversal_count': float(np.mean(columns['reversal_count'])),
+            'test_seconds': float(np.mean(columns['duration_seconds'])),
+            'stabilization_seconds': float(np.nanmean(columns['stabilization_seconds'])),
+        })
+    return rows
+
+
+def _as_float(value):
+    """Numbers as floats, so 90 from GRID and 90.0 from the command line give the same key."""
+    if isinstance(value, dict):
+        return {k: _as_float(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_as_float(v) for v in value]
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def store_signature(store_dir):
+    """Digest of the store's manifest and part files; changes whenever sessions are ingested or removed."""
+    manifest = load_manifest(store_dir)
+    parts = []
+    for name in manifest['parts']:
+        stat = os.stat(os.path.join(store_dir, name))
+        parts.append([name, stat.st_size, stat.st_mtime_ns])
+    text = json.dumps([manifest['files'], parts], sort_keys=True)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def job_key(kind, params):
+    return json.dumps([kind, _as_float(params)], sort_keys=True)
+
+
+def load_checkpoint(path):
+    """Completed jobs from a JSONL checkpoint: {key: rows}."""
+    done = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A sweep killed mid-write leaves a partial last line
+                    continue
+                done[entry['key']] = entry['rows']
+    return done
+
+
+def run_sweep(grid, n_runs, seed, listener, speech_level, checkpoint, store_dir=None, workers=None):
+    """Runs every grid point not already in the checkpoint and returns all result rows.
+
+    Each (dynamics, duration, ignore window) row is checkpointed on its own, so changing
+    the scoring-only values re-runs just the combinations that are new. Pending rows that
+    share dynamics (or, for archived replays, a duration) are computed by one job.
+    """
+    done = load_checkpoint(checkpoint)
+    combinations = list(itertools.product(grid['duration_seconds'], grid['ignore_seconds']))
+
+    keys = []
+    jobs = {}
+    for values in itertools.product(*(grid[p] for p in DYNAMIC_PARAMS)):
+        dynamics = dict(zip(DYNAMIC_PARAMS, values))
+        group = []
+        for duration, ignore in combinations:
+            key = job_key('simulated', dict(dynamics, duration_seconds=duration, ignore_seconds=ignore, n=n_runs,
+                                            seed=seed, listener=listener, speech_level=speech_level))
+            keys.append(key)
+            if key not in done:
+                group.append(((duration, ignore), key))
+        if group:
+            label = ", ".join(f"{p}={v:g}" for p, v in dynamics.items())
+            jobs[label] = (_simulate_config, (dynamics, [c for c, _ in group], n_runs, seed, listener, speech_level),
+                           dict(group))
+    if store_dir:
+        # Rows replayed from an older version of the store are not reused
+        signature = store_signature(store_dir)
+        for duration in grid['duration_seconds']:
+            group = []
+            for ignore in grid['ignore_seconds']:
+                key = job_key('archived', {'store': os.path.abspath(store_dir), 'signature': signature,
+                                           'duration': duration, 'ignore': ignore})
+                keys.append(key)
+                if key not in done:
+                    group.append(((duration, ignore), key))
+            if group:
+                jobs[f"archived, duration={duration:g}s"] = (_replay_duration,
+                                                             (store_dir, duration, [i for (_, i), _ in group]),
+                                                             dict(group))
+
+    pending = sum(len(job_keys) for _, _, job_keys in jobs.values())
+    print(f"{len(keys)} grid points, {len(keys) - pending} already in checkpoint, {len(jobs)} jobs to run")
+
+    with open(checkpoint, 'a', encoding='utf-8') as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn, args): label for label, (fn, args, _) in jobs.items()}
+        for i, future in enumerate(as_completed(futures), 1):
+            label = futures[future]
+            for row in future.result():
+                key = jobs[label][2][(row['duration_seconds'], row['ignore_seconds'])]
+                done[key] = [row]
+                out.write(json.dumps({'key': key, 'rows': done[key]}) + '\n')
+            out.flush()
+            print(f"  [{i}/{len(jobs)}] {label}")
+
+    return [row for key in keys for row in done[key]]
+
+
+def write_table(rows, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({c: ('' if row.get(c) is None or (isinstance(row.get(c), float) and np.isnan(row[c]))
+                                 else row[c]) for c in COLUMNS})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep tracking protocol parameters against simulated listeners.")
+    parser.add_argument('--initial-rates', type=float, nargs='+', default=GRID['initial_rate'])
+    parser.add_argument('--final-rates', type=float, nargs='+', default=GRID['final_rate'])
+    parser.add_argument('--switch-reversals', type=int, nargs='+', default=GRID['rate_switch_reversals'])
+    parser.add_argument('--debounce', type=float, nargs='+', default=GRID['debounce_seconds'])
+    parser.add_argument('--durations', type=float, nargs='+', default=GRID['duration_seconds'])
+    parser.add_argument('--ignore', type=float, nargs='+', default=GRID['ignore_seconds'])
+    parser.add_argument('--runs', type=int, default=2000, help="Simulated listeners per configuration")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speech-level', type=float, default=DEFAULT_SPEECH_LEVEL)
+    parser.add_argument('--store', help="Session store to replay archived histories (ignore window and duration)")
+    parser.add_argument('--checkpoint', default='protocol_sweep.jsonl', help="JSONL checkpoint, resumed if present")
+    parser.add_argument('--output', default='protocol_sweep.csv')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    grid = {
+        'initial_rate': args.initial_rates,
+        'final_rate': args.final_rates,
+        'rate_switch_reversals': args.switch_reversals,
+        'debounce_seconds': args.debounce,
+        'duration_seconds': args.durations,
+        'ignore_seconds': args.ignore,
+    }
+    if args.store and not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    start = time.perf_counter()
+    rows = run_sweep(grid, args.runs, args.seed, LISTENER, args.speech_level, args.checkpoint,
+                     args.store, args.workers)
+    print(f"Sweep finished in {time.perf_counter() - start:.1f}s")
+    write_table(rows, args.output)
+    print(f"Saved {len(rows)} rows to {args.output}")
+
+    simulated = [r for r in rows if r['source'] == 'simulated' and not np.isnan(r['aANL_rmse'])]
+    if simulated:
+        print("Lowest aHANT RMSE per test duration:")
+        for duration in grid['duration_seconds']:
+            candidates = [r for r in simulated if r['duration_seconds'] == duration]
+            if not candidates:
+                continue
+            best = min(candidates, key=lambda r: r['aANL_rmse'])
+            print(f"  {duration:g}s: RMSE {best['aANL_rmse']:.2f} dB (bias {best['aANL_bias']:+.2f}) with "
+                  + ", ".join(f"{p}={best[p]:g}" for p in DYNAMIC_PARAMS) + f", ignore={best['ignore_seconds']:g}s")
+
+
+if __name__ == "__main__":
+    main()
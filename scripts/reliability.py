@@ -0,0 +1,189 @@
+import argparse
+import csv
+import hashlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from anl_scoring import normalize_patient
+from ingest_sessions import load_store
+from significance import Z_95, pair_rows
+
+CACHE_DIR = "reliability"
+DESIGNS = ('ab', 'visit')
+MEASURES = ('eANL', 'aANL')
+# Per-pair sufficient statistics; every ICC variant for two measurements follows from their sums
+STATS = ['n', 's1', 's2', 's11', 's22', 's12']
+ESTIMATES = ['icc_1_1', 'icc_2_1', 'icc_3_1', 'sem', 'mdc95']
+BOOTSTRAP_CHUNK = 64
+
+
+def ab_pairs(store, same_label=False):
+    """Test A / Test B of the same session. Optionally only pairs run with the same label."""
+    rows_a, rows_b = pair_rows(store)
+    if same_label:
+        keep = store['label'][rows_a] == store['label'][rows_b]
+        rows_a, rows_b = rows_a[keep], rows_b[keep]
+    return rows_a, rows_b
+
+
+def visit_pairs(store):
+    """Consecutive visits of the same patient for the same test slot and label."""
+    patient = np.array([normalize_patient(p) for p in store['patient']], dtype=str)
+    group = np.char.add(np.char.add(np.char.add(patient, '\x1f'), store['test_id']),
+                        np.char.add('\x1f', store['label']))
+    order = np.lexsort((store['path'], store['test_date'], group))
+    group, dates = group[order], store['test_date'][order]
+    # Pair each visit with the next one on a later date (several exports on one day are not a retest)
+    following = (group[1:] == group[:-1]) & (dates[1:] > dates[:-1]) & (patient[order][1:] != '')
+    return order[:-1][following], order[1:][following]
+
+
+def pair_statistics(x1, x2):
+    return np.column_stack([np.ones_like(x1), x1, x2, x1 * x1, x2 * x2, x1 * x2])
+
+
+def icc_from_sums(sums):
+    """ICC(1,1), ICC(2,1), ICC(3,1), SEM and MDC95 from summed pair statistics (..., STATS).
+
+    Two-way ANOVA for n subjects x 2 occasions (Shrout & Fleiss). SEM is
+    SD * sqrt(1 - ICC(2,1)) and MDC95 = 1.96 * sqrt(2) * SEM.
+    """
+    n, s1, s2, s11, s22, s12 = np.moveaxis(np.asarray(sums, dtype=np.float64), -1, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        grand = (s1 + s2) / (2 * n)
+        sst = s11 + s22 - 2 * n * grand ** 2
+        ssr = (s11 + s22 + 2 * s12) / 2 - 2 * n * grand ** 2
+        ssc = n * ((s1 / n - grand) ** 2 + (s2 / n - grand) ** 2)
+        sse = sst - ssr - ssc
+        msr = ssr / (n - 1)
+        msw = (sst - ssr) / n
+        msc = ssc
+        mse = sse / (n - 1)
+
+        icc1 = (msr - msw) / (msr + msw)
+        icc2 = (msr - mse) / (msr + mse + 2 * (msc - mse) / n)
+        icc3 = (msr - mse) / (msr + mse)
+        sd = np.sqrt(sst / (2 * n - 1))
+        sem = sd * np.sqrt(np.maximum(1 - icc2, 0.0))
+    return {'icc_1_1': icc1, 'icc_2_1': icc2, 'icc_3_1': icc3, 'sem': sem, 'mdc95': Z_95 * np.sqrt(2) * sem}
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as cached:
+        return {name: cached[name] for name in cached.files}
+
+
+def _bootstrap_chunk(job):
+    """ICC estimates for a chunk of bootstrap replicates that resample pairs with replacement."""
+    seed, chunk, stats, n_reps = job
+    # Seeding by chunk number keeps results independent of the worker count
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    n = len(stats)
+    sums = np.empty((n_reps, len(STATS)))
+    for r in range(n_reps):
+        weights = np.bincount(rng.integers(0, n, size=n), minlength=n)
+        sums[r] = weights @ stats
+    estimates = icc_from_sums(sums)
+    return np.column_stack([estimates[name] for name in ESTIMATES])
+
+
+def bootstrap_intervals(stats, n_boot=2000, seed=0, alpha=0.05, workers=None):
+    """Parallel percentile CIs (low, high) for every estimate, resampling pairs."""
+    if len(stats) < 3 or n_boot <= 0:
+        return np.full(len(ESTIMATES), np.nan), np.full(len(ESTIMATES), np.nan)
+    jobs = [(seed, chunk, stats, min(BOOTSTRAP_CHUNK, n_boot - start))
+            for chunk, start in enumerate(range(0, n_boot, BOOTSTRAP_CHUNK))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        replicates = np.concatenate(list(pool.map(_bootstrap_chunk, jobs)))
+    low, high = np.nanquantile(replicates, [alpha / 2, 1 - alpha / 2], axis=0)
+    return low, high
+
+
+def reliability_table(store_dir, store, n_boot=2000, seed=0, same_label=False, workers=None):
+    """One row per design x measure with the ICCs, SEM, MDC95 and their bootstrap CIs."""
+    pairings = {'ab': ab_pairs(store, same_label), 'visit': visit_pairs(store)}
+    table = []
+    for design in DESIGNS:
+        rows_1, rows_2 = pairings[design]
+        for measure in MEASURES:
+            x1, x2 = store[measure][rows_1], store[measure][rows_2]
+            valid = ~np.isnan(x1) & ~np.isnan(x2)
+            stats = pair_statistics(x1[valid], x2[valid])
+            estimates = icc_from_sums(stats.sum(axis=0))
+
+            # The sums are cheap; the bootstrap only reruns when the pairs (or its settings) changed
+            cache_path = os.path.join(store_dir, CACHE_DIR, f"{design}-{measure}.npz")
+            cache = load_cache(cache_path)
+            digest = hashlib.sha1(np.ascontiguousarray(stats).tobytes())
+            digest.update(f"{n_boot}|{seed}".encode('utf-8'))
+            if str(cache.get('boot_digest', '')) == digest.hexdigest():
+                low, high = cache['boot_low'], cache['boot_high']
+            else:
+                low, high = bootstrap_intervals(stats, n_boot, seed, workers=workers)
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                np.savez(cache_path, boot_digest=np.array(digest.hexdigest()), boot_low=low, boot_high=high)
+
+            # statistics.js judges each pair with 1.96 * sqrt(seA^2 + seB^2)
+            se1, se2 = store['se'][rows_1[valid]], store['se'][rows_2[valid]]
+            with np.errstate(invalid='ignore'):
+                per_test_cd = Z_95 * np.sqrt(se1 ** 2 + se2 ** 2)
+            per_test_cd = per_test_cd[(se1 > 0) & (se2 > 0)]
+
+            row = {'design': design, 'measure': measure, 'pairs': len(stats)}
+            for k, name in enumerate(ESTIMATES):
+                row[name] = float(estimates[name])
+                row[f'{name}_low'] = float(low[k])
+                row[f'{name}_high'] = float(high[k])
+            row['median_js_cd95'] = float(np.median(per_test_cd)) if len(per_test_cd) else np.nan
+            diff = np.abs(x1[valid] - x2[valid])
+            row['beyond_mdc95'] = float(np.mean(diff > row['mdc95'])) if len(diff) else np.nan
+            table.append(row)
+    return table
+
+
+def write_table(table, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(table[0]))
+        writer.writeheader()
+        for row in table:
+            writer.writerow({k: '' if isinstance(v, float) and np.isnan(v) else
+                             (round(v, 4) if isinstance(v, float) else v) for k, v in row.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test-retest reliability (ICC, SEM, MDC) over paired sessions.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--output', default='reliability.csv', help="CSV table to write")
+    parser.add_argument('--same-label', action='store_true',
+                        help="Only use A/B pairs where both tests were run with the same label")
+    parser.add_argument('--bootstrap', type=int, default=2000, help="Bootstrap resamples (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0, help="Bootstrap seed")
+    parser.add_argument('--workers', type=int, default=None, help="Number of bootstrap processes")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    start = time.perf_counter()
+    store = load_store(args.store)
+    table = reliability_table(args.store, store, args.bootstrap, args.seed, args.same_label, args.workers)
+    print(f"Computed reliability in {time.perf_counter() - start:.2f}s")
+
+    for row in table:
+        print(f"  {row['design']:>5} {row['measure']}: {row['pairs']} pairs, "
+              f"ICC(2,1) {row['icc_2_1']:.3f} [{row['icc_2_1_low']:.3f}, {row['icc_2_1_high']:.3f}], "
+              f"SEM {row['sem']:.2f} dB, MDC95 {row['mdc95']:.2f} dB "
+              f"(median per-test CD95 {row['median_js_cd95']:.2f} dB)")
+
+    write_table(table, args.output)
+    print(f"Saved table to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import soundfile as sf
+
+from anl_scoring import history_arrays, result_speech_level
+from gain_automation import db_to_gain, evaluate, event_starts
+
+AUDIO_DIR = "public/audio"
+NOISE_FILE = "4-talker_babble.flac"
+DEFAULT_SPEECH_FILE = "history_glass.flac"
+
+# useAudioController.js
+DB_OFFSET = 95                 # AutoTrackingPhase passes level - 95 to set*Volume
+SPEECH_TIME_CONSTANT = 0.1
+NOISE_TIME_CONSTANT = 0.05
+BLOCK_SECONDS = 10.0
+
+
+def volume_to_gain(db, noise_offset=None):
+    """setSpeechVolume / setNoiseVolume dB -> linear gain mapping (noise_offset=None for speech)."""
+    db = np.asarray(db, dtype=np.float64)
+    if noise_offset is not None:
+        db = np.where(db <= -100, -200, db + noise_offset)
+    return db_to_gain(db)
+
+
+def load_mono(path):
+    """Loads an asset as mono: a stereo buffer feeding a ChannelMerger input is downmixed."""
+    data, sample_rate = sf.read(path, dtype='float32', always_2d=True)
+    return data.mean(axis=1), sample_rate
+
+
+def render(result, speech_path, noise_path, output_path, swap_channels=False, noise_offset=0.0):
+    """Renders the stereo signal the Web Audio graph produced for one test result."""
+    t, noise = history_arrays(result['history'])
+    speech_level = result_speech_level(result)
+    speech, sample_rate = load_mono(speech_path)
+    masker, noise_rate = load_mono(noise_path)
+    if noise_rate != sample_rate:
+        raise ValueError(f"Sample rates differ: {speech_path} ({sample_rate}) vs {noise_path} ({noise_rate})")
+
+    # The effect calls setSpeechVolume/setNoiseVolume right after play(), then
+    # every tick calls setNoiseVolume with the new level
+    speech_events = np.array([0.0])
+    speech_targets = volume_to_gain([speech_level - DB_OFFSET])
+    noise_targets = volume_to_gain(noise - DB_OFFSET, noise_offset)
+    speech_starts = event_starts(speech_events, speech_targets, SPEECH_TIME_CONSTANT)
+    noise_starts = event_starts(t, noise_targets, NOISE_TIME_CONSTANT)
+
+    # Normal: speech -> right (1), noise -> left (0). Swapped: the reverse.
+    speech_channel, noise_channel = (0, 1) if swap_channels else (1, 0)
+    total = int(round(t[-1] * sample_rate)) if len(t) else 0
+    block = int(BLOCK_SECONDS * sample_rate)
+
+    with sf.SoundFile(output_path, 'w', samplerate=sample_rate, channels=2, subtype='PCM_24', format='FLAC') as out:
+        for start in range(0, total, block):
+            n = min(block, total - start)
+            positions = np.arange(start, start + n)
+            times = positions / sample_rate
+            frame = np.zeros((n, 2), dtype=np.float32)
+            # Both sources loop from offset 0, each at its own length
+            frame[:, speech_channel] = speech[positions % len(speech)] * evaluate(
+                speech_events, speech_targets, SPEECH_TIME_CONSTANT, speech_starts, times)
+            frame[:, noise_channel] = masker[positions % len(masker)] * evaluate(
+                t, noise_targets, NOISE_TIME_CONSTANT, noise_starts, times)
+            out.write(frame)
+    return total / sample_rate if sample_rate else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the stereo audio a patient heard during a session.")
+    parser.add_argument('session', help="Exported ANL_Test_*.json file")
+    parser.add_argument('--test', default='A', choices=['A', 'B'], help="Which test to render")
+    parser.add_argument('--audio-dir', default=AUDIO_DIR)
+    parser.add_argument('--speech', help="Speech passage file name (defaults to the one recorded in the session)")
+    parser.add_argument('--swap-channels', action='store_true', help="Render with swapChannels enabled")
+    parser.add_argument('--noise-offset', type=float, default=0.0, help="useAudioController initialNoiseOffset")
+    parser.add_argument('--output', help="Output FLAC path")
+    args = parser.parse_args()
+
+    with open(args.session, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    result = data.get(f'results{args.test}')
+    if not result or not result.get('history'):
+        print(f"Test {args.test} has no history in {args.session}")
+        return
+
+    speech_name = args.speech or os.path.basename(result.get('speechFile') or DEFAULT_SPEECH_FILE)
+    speech_path = os.path.join(args.audio_dir, speech_name)
+    noise_path = os.path.join(args.audio_dir, NOISE_FILE)
+    output = args.output or os.path.splitext(args.session)[0] + f"_Test{args.test}.flac"
+
+    start = time.perf_counter()
+    duration = render(result, speech_path, noise_path, output, args.swap_channels, args.noise_offset)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {duration:.1f}s of audio in {elapsed:.2f}s ({duration / elapsed:.0f}x real time)")
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from anl_scoring import DEFAULT_SPEECH_LEVEL, START_OFFSET_DB, session_ids
+from ingest_sessions import load_store
+
+# The tracking loop in AutoTrackingPhase.jsx advances once at least 0.1 s has passed
+TICKS_PER_SECOND = 10
+TICK_SECONDS = 1 / TICKS_PER_SECOND
+
+STAT_COLUMNS = ['points', 'grid_points', 'dropped_ticks', 'skipped_ticks', 'mean_interval_ms',
+                'jitter_ms', 'max_interval_ms']
+
+
+def with_start_points(t, noise, offsets, start_levels):
+    """Prepends the (0, speech_level - 15) point every test starts from, as historyForStability does.
+
+    Exports already begin with that point (setHistory([{ t: 0, noise: startLevel }])),
+    so it is only added to sessions whose first point is later than t = 0.
+    """
+    lengths = np.diff(offsets)
+    first_t = t[np.minimum(offsets[:-1], max(len(t) - 1, 0))] if len(t) else np.zeros(len(lengths))
+    missing = (lengths == 0) | (first_t > 0)
+    at = offsets[:-1][missing]
+    t = np.insert(t, at, 0.0)
+    noise = np.insert(noise, at, np.broadcast_to(start_levels, lengths.shape)[missing])
+    new_offsets = np.zeros_like(offsets)
+    np.cumsum(lengths + missing, out=new_offsets[1:])
+    return t, noise, new_offsets
+
+
+def grid_offsets(t, offsets):
+    """Offsets of the 0.1 s grid: ticks 1 .. floor(last t / 0.1) for every session."""
+    has_points = np.diff(offsets) > 0
+    last_t = np.where(has_points, t[np.maximum(offsets[1:] - 1, 0)] if len(t) else 0.0, 0.0)
+    # ms-resolution timestamps: the small epsilon keeps t = 119.99999... style values on their tick
+    ticks = np.where(has_points, np.floor(last_t * TICKS_PER_SECOND + 1e-6), 0).astype(np.int64)
+    out = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(ticks, out=out[1:])
+    return out
+
+
+def resample(t, noise, offsets, start_levels=None):
+    """Piecewise-linear resampling of a ragged batch onto an exact 0.1 s grid.
+
+    Every grid point is keyed by (session, t) just like the samples, so one
+    searchsorted finds its bracketing samples for the whole batch. The weights are
+    computed from the raw times, so the session shift costs no precision. Grid
+    points outside a session's samples hold the nearest sample (there is none
+    before the first tick unless start_levels supplies the t = 0 level).
+    Returns (grid t, grid noise, grid offsets).
+    """
+    if start_levels is not None:
+        t, noise, offsets = with_start_points(t, noise, offsets, start_levels)
+    out_offsets = grid_offsets(t, offsets)
+    n_grid = out_offsets[-1]
+    if n_grid == 0:
+        return np.empty(0), np.empty(0), out_offsets
+
+    session = session_ids(offsets)
+    grid_session = session_ids(out_offsets)
+    tick = np.arange(n_grid) - out_offsets[:-1][grid_session] + 1
+    grid_t = tick / TICKS_PER_SECOND
+
+    span = np.max(t) + 1
+    keys = t + session * span
+    grid_keys = grid_t + grid_session * span
+    first = offsets[:-1][grid_session]
+    last = offsets[1:][grid_session] - 1
+    left = np.clip(np.searchsorted(keys, grid_keys, side='right') - 1, first, np.maximum(last - 1, first))
+    right = np.minimum(left + 1, last)
+
+    dt = t[right] - t[left]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.clip(np.where(dt > 0, (grid_t - t[left]) / dt, 0.0), 0.0, 1.0)
+    grid_noise = noise[left] + weight * (noise[right] - noise[left])
+    return grid_t, grid_noise, out_offsets
+
+
+def tick_intervals(t, offsets):
+    """Interval before every history point (NaN where there is none).
+
+    Exports start with the t = 0 start point, so the first interval of a session is
+    the one before its second point. A session that starts later than t = 0 gets an
+    interval from the start of the test for its first point.
+    """
+    previous = np.concatenate(([0.0], t[:-1])) if len(t) else np.empty(0)
+    starts = offsets[:-1][np.diff(offsets) > 0]
+    previous[starts] = 0.0
+    interval = t - previous
+    interval[starts[t[starts] <= 0]] = np.nan
+    return interval
+
+
+def timing_stats(t, offsets):
+    """Per-session tick timing: interval mean/SD (jitter), longest interval and missed ticks.
+
+    dropped_ticks is how many grid ticks the session fell short by overall;
+    skipped_ticks counts only whole ticks lost inside single long frames (an
+    interval of >= 0.2 s).
+    """
+    n = len(offsets) - 1
+    lengths = np.diff(offsets)
+    session = session_ids(offsets)
+    interval = tick_intervals(t, offsets)
+    valid = ~np.isnan(interval)
+    session, interval = session[valid], interval[valid]
+    intervals = np.bincount(session, minlength=n)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(session, weights=interval, minlength=n) / intervals
+        ss = np.bincount(session, weights=(interval - mean[session]) ** 2, minlength=n)
+        jitter = np.where(intervals >= 2, np.sqrt(ss / np.maximum(intervals - 1, 1)), np.nan)
+    longest = np.full(n, np.nan)
+    if len(interval):
+        np.fmax.at(longest, session, interval)
+    skipped = np.bincount(session, weights=np.maximum(np.floor(interval * TICKS_PER_SECOND + 1e-6) - 1, 0),
+                          minlength=n)
+    grid_points = np.diff(grid_offsets(t, offsets))
+
+    return {
+        'points': lengths,
+        'grid_points': grid_points,
+        'dropped_ticks': grid_points - intervals,
+        'skipped_ticks': skipped.astype(np.int64),
+        'mean_interval_ms': mean * 1000,
+        'jitter_ms': jitter * 1000,
+        'max_interval_ms': longest * 1000,
+    }
+
+
+def to_matrix(values, offsets, width=None):
+    """Resampled sessions as rows of a (sessions x ticks) matrix, NaN-padded."""
+    lengths = np.diff(offsets)
+    width = int(lengths.max()) if width is None and len(lengths) else (width or 0)
+    matrix = np.full((len(lengths), width), np.nan)
+    session = session_ids(offsets)
+    column = np.arange(len(values)) - offsets[:-1][session]
+    keep = column < width
+    matrix[session[keep], column[keep]] = values[keep]
+    return matrix
+
+
+def write_stats(store, stats, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['path', 'patient', 'test_date', 'test_id'] + STAT_COLUMNS)
+        for i in range(len(stats['points'])):
+            writer.writerow([store['path'][i], store['patient'][i], store['test_date'][i], store['test_id'][i]] +
+                            [_cell(stats[c][i]) for c in STAT_COLUMNS])
+
+
+def _cell(value):
+    if np.issubdtype(type(value), np.integer):
+        return int(value)
+    return '' if np.isnan(value) else round(float(value), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resample archived tracking histories onto an exact 0.1 s grid.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--no-start-point', action='store_true',
+                        help="Hold the first tick before it instead of interpolating from the t = 0 start level")
+    parser.add_argument('--output', default='resampled_histories.npz', help="Output file for the grid histories")
+    parser.add_argument('--stats', default='tick_timing.csv', help="Per-session jitter/dropped-tick table (CSV)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    store = load_store(args.store)
+    t, noise, offsets = store['t'], store['noise'], store['offsets']
+    start_levels = None
+    if not args.no_start_point:
+        speech_levels = np.where(np.isnan(store['speech_level']), DEFAULT_SPEECH_LEVEL, store['speech_level'])
+        start_levels = speech_levels - START_OFFSET_DB
+
+    start = time.perf_counter()
+    grid_t, grid_noise, grid_offs = resample(t, noise, offsets, start_levels)
+    stats = timing_stats(t, offsets)
+    print(f"Resampled {len(offsets) - 1} tests ({len(t)} points -> {len(grid_t)} grid ticks) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    has_points = stats['points'] > 0
+    if has_points.any():
+        print(f"  Mean tick interval: {np.nanmean(stats['mean_interval_ms'][has_points]):.1f} ms, "
+              f"jitter (SD) {np.nanmedian(stats['jitter_ms'][has_points]):.1f} ms median, "
+              f"longest frame {np.nanmax(stats['max_interval_ms']):.0f} ms")
+        dropped = stats['dropped_ticks'][has_points]
+        print(f"  Dropped ticks: {dropped.sum()} total, {(dropped > 0).mean():.1%} of tests short of the grid; "
+              f"{stats['skipped_ticks'].sum()} whole ticks skipped in long frames")
+
+    np.savez_compressed(args.output, noise=grid_noise, offsets=grid_offs, ticks_per_second=TICKS_PER_SECOND)
+    print(f"Saved {args.output}")
+    write_stats(store, stats, args.stats)
+    print(f"Saved {args.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from anl_scoring import GUESSING_EXCURSION_DB, STABILITY_WINDOW_SECONDS, ragged_reversals, session_ids
+from ingest_sessions import load_store
+from significance import pair_rows
+
+# The live dashboard counts the tracking loop's debounced reversals over the whole
+# test; generateFinalResults uses every reversal after 30 s
+EXCURSION_MODES = {
+    'final': {'ignore_seconds': 30, 'debounce_seconds': 0.0},
+    'live': {'ignore_seconds': None, 'debounce_seconds': 1.0},
+}
+GUESSING_THRESHOLDS = np.arange(3.0, 8.01, 0.5)
+
+
+def _session_keys(t, offsets, window_seconds):
+    """Times made globally increasing by shifting each session past the previous one."""
+    session = session_ids(offsets)
+    span = (np.max(t) if len(t) else 0.0) + window_seconds + 1
+    return t + session * span, session
+
+
+def rolling_stability_sd(t, noise, offsets, window_seconds=STABILITY_WINDOW_SECONDS):
+    """calculateStabilitySD evaluated at every tick of every session.
+
+    At tick k the live dashboard takes the sample SD of the history points with
+    t >= max(0, t_k - 30). The window start of every tick is found with one
+    searchsorted, and window sums come from cumulative sums, so the whole batch is O(n).
+    """
+    keys, session = _session_keys(t, offsets, window_seconds)
+    first = offsets[:-1][session]
+    starts = np.maximum(np.searchsorted(keys, keys - window_seconds, side='left'), first)
+    # The shifted keys can round across an exact boundary; settle ties on the raw times
+    # so the window matches `pt.t >= duration - 30` in JS
+    low = t - window_seconds
+    starts += (t[starts] < low) & (starts < np.arange(len(t)))
+    back = (starts > first) & (t[np.maximum(starts - 1, 0)] >= low)
+    starts -= back
+    count = np.arange(len(t)) - starts + 1
+
+    # Centre each session first so the running sums of squares stay well conditioned
+    lengths = np.maximum(np.diff(offsets), 1)
+    centre = np.bincount(session, weights=noise, minlength=len(offsets) - 1) / lengths
+    x = noise - centre[session]
+    s = np.concatenate(([0.0], np.cumsum(x)))
+    q = np.concatenate(([0.0], np.cumsum(x * x)))
+    idx = np.arange(len(t))
+    window_sum = s[idx + 1] - s[starts]
+    window_sq = q[idx + 1] - q[starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (window_sq - window_sum ** 2 / count) / (count - 1)
+    return np.where(count >= 2, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+
+
+def rolling_excursion_height(t, noise, offsets, mode='final'):
+    """calculateAverageExcursionHeight over the reversals known at every tick.
+
+    A reversal at history index i is only known once point i + 1 has been recorded.
+    Returns (height, known reversal count) per tick.
+    """
+    indices, _ = ragged_reversals(t, noise, offsets, **EXCURSION_MODES[mode])
+    session = session_ids(offsets)
+    rev_session = session[indices]
+    levels = noise[indices]
+    heights = np.zeros(len(indices))
+    same = rev_session[1:] == rev_session[:-1]
+    heights[1:] = np.where(same, np.abs(np.diff(levels)), 0.0)
+    cum = np.concatenate(([0.0], np.cumsum(heights)))
+
+    # Reversals before tick k (global), and before the start of the tick's session
+    known_global = np.searchsorted(indices, np.arange(len(t)), side='left')
+    first = np.searchsorted(indices, offsets[:-1], side='left')[session]
+    known = known_global - first
+    # Heights of ranks 1..known-1 (rank 0 carries no height)
+    total = cum[known_global] - cum[np.minimum(first + 1, len(cum) - 1)]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        height = np.where(known >= 2, total / (known - 1), 0.0)
+    return height, known
+
+
+def stability_labels(stability_sd, t, excursion_height, threshold=GUESSING_EXCURSION_DB):
+    """Vectorised stability_status for every tick."""
+    status = np.select([stability_sd <= 2.0, stability_sd <= 4.0], ["High", "Moderate"], "Low (Erratic/Drifting)")
+    status = np.where(excursion_height > threshold, np.char.add(status, " (Possible Guessing)"), status)
+    return np.where(t < 30, "Insufficient Data (<30s)", status)
+
+
+def threshold_table(store, stability_sd, excursion_height, thresholds=GUESSING_THRESHOLDS):
+    """How the 'Possible Guessing' flag would change across the archive for each threshold.
+
+    Uses the final values of every test, plus the share of post-30 s ticks flagged, and
+    compares the A/B retest difference of flagged and unflagged sessions.
+    """
+    offsets = store['offsets']
+    has_points = np.diff(offsets) > 0
+    last = np.maximum(offsets[1:] - 1, 0)
+    final_height = np.where(has_points, excursion_height[last], 0.0)
+    final_sd = np.where(has_points, stability_sd[last], 0.0)
+    late = store['t'] > 30
+    rows_a, rows_b = pair_rows(store)
+    retest = np.abs(store['aANL'][rows_a] - store['aANL'][rows_b])
+
+    table = []
+    for threshold in thresholds:
+        flagged = final_height > threshold
+        pair_flagged = flagged[rows_a] | flagged[rows_b]
+        table.append({
+            'threshold_db': round(float(threshold), 2),
+            'tests_flagged': int(flagged.sum()),
+            'fraction_flagged': float(flagged.mean()) if len(flagged) else np.nan,
+            'tick_fraction_flagged': float((excursion_height[late] > threshold).mean()) if late.any() else np.nan,
+            'stability_sd_flagged': float(np.mean(final_sd[flagged])) if flagged.any() else np.nan,
+            'stability_sd_unflagged': float(np.mean(final_sd[~flagged])) if (~flagged).any() else np.nan,
+            'retest_diff_flagged': float(np.nanmean(retest[pair_flagged])) if pair_flagged.any() else np.nan,
+            'retest_diff_unflagged': float(np.nanmean(retest[~pair_flagged])) if (~pair_flagged).any() else np.nan,
+        })
+    return table
+
+
+def write_table(table, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(table[0]))
+        writer.writeheader()
+        writer.writerows(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-tick stability SD and excursion height for archived sessions.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--mode', default='final', choices=list(EXCURSION_MODES),
+                        help="Reversals used for excursion height: final-result rule or live dashboard")
+    parser.add_argument('--output', default='rolling_metrics.npz', help="Output file for the per-tick metrics")
+    parser.add_argument('--thresholds', default='guessing_thresholds.csv', help="Re-threshold table (CSV)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    store = load_store(args.store)
+    t, noise, offsets = store['t'], store['noise'], store['offsets']
+    start = time.perf_counter()
+    stability_sd = rolling_stability_sd(t, noise, offsets)
+    height, known = rolling_excursion_height(t, noise, offsets, args.mode)
+    print(f"Computed per-tick metrics for {len(t)} ticks over {len(offsets) - 1} tests "
+          f"in {time.perf_counter() - start:.2f}s")
+
+    labels = stability_labels(stability_sd, t, height)
+    final = labels[np.maximum(offsets[1:] - 1, 0)][np.diff(offsets) > 0]
+    values, counts = np.unique(final, return_counts=True)
+    print("Final Tracking Stability:")
+    for value, count in sorted(zip(values, counts), key=lambda x: -x[1]):
+        print(f"  {value}: {count}")
+
+    np.savez_compressed(args.output, stability_sd=stability_sd, excursion_height=height,
+                        known_reversals=known, offsets=offsets)
+    print(f"Saved {args.output}")
+
+    table = threshold_table(store, stability_sd, height)
+    write_table(table, args.thresholds)
+    print(f"Saved {args.thresholds}")
+    for row in table:
+        print(f"  > {row['threshold_db']:.1f} dB: {row['tests_flagged']} tests flagged "
+              f"({row['fraction_flagged']:.1%}), retest |A-B| {row['retest_diff_flagged']:.2f} flagged vs "
+              f"{row['retest_diff_unflagged']:.2f} unflagged")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import glob
+import json
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+import numpy as np
+import zstandard
+
+MAGIC = b'ANLS'
+FORMAT_VERSION = 1
+EXTENSION = '.anls'
+# Decoded JSON written next to its .anls file must not replace the original export
+DECODED_SUFFIX = '.decoded.json'
+HISTORY_KEYS = ('resultsA', 'resultsB')
+PLACEHOLDER = '$history'
+TICK_MS = 100
+ZSTD_LEVEL = 9
+
+# Timestamp encodings
+T_GRID_MS = 0      # integer ms, stored as the deviation of each step from the 100 ms tick
+T_FLOAT64 = 1      # raw float64 (timestamps that are not whole milliseconds)
+# Noise level encodings
+NOISE_XOR = 0      # float64 XOR-delta with byte shuffling (lossless)
+NOISE_FLOAT16 = 1  # float16 (lossy, ~0.03 dB at typical levels)
+
+_HISTORY_HEADER = struct.Struct('<IBB')
+
+
+def _plain_history(history):
+    """True when the history is a list of {t, noise} numbers that the arrays can represent exactly."""
+    if not isinstance(history, list) or not history:
+        return False
+    for point in history:
+        if not isinstance(point, dict) or list(point) != ['t', 'noise']:
+            return False
+        for value in (point['t'], point['noise']):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return False
+    return True
+
+
+def encode_times(t):
+    ms = np.round(t * 1000)
+    if np.all(np.abs(ms) < 2 ** 31) and np.array_equal(ms / 1000, t):
+        steps = np.diff(ms.astype(np.int64), prepend=0) - TICK_MS
+        return T_GRID_MS, steps.astype('<i4').tobytes()
+    return T_FLOAT64, t.astype('<f8').tobytes()
+
+
+def decode_times(mode, data, n):
+    if mode == T_GRID_MS:
+        steps = np.frombuffer(data, dtype='<i4', count=n).astype(np.int64) + TICK_MS
+        return np.cumsum(steps) / 1000
+    return np.frombuffer(data, dtype='<f8', count=n).copy()
+
+
+def encode_noise(noise, lossy=False):
+    if lossy:
+        return NOISE_FLOAT16, noise.astype('<f2').tobytes()
+    bits = noise.astype('<f8').view('<u8')
+    # Neighbouring levels share sign, exponent and leading mantissa bits, so the XOR
+    # is mostly zero bytes; grouping byte planes lets zstd see long runs
+    previous = np.zeros_like(bits)
+    previous[1:] = bits[:-1]
+    xored = bits ^ previous
+    return NOISE_XOR, xored.view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def decode_noise(mode, data, n):
+    if mode == NOISE_FLOAT16:
+        return np.frombuffer(data, dtype='<f2', count=n).astype(np.float64)
+    planes = np.frombuffer(data, dtype=np.uint8, count=8 * n).reshape(8, n)
+    xored = np.ascontiguousarray(planes.T).view('<u8').ravel()
+    return np.bitwise_xor.accumulate(xored).view('<f8').copy()
+
+
+def _payload_size(mode, n, kind):
+    if kind == 't':
+        return n * (4 if mode == T_GRID_MS else 8)
+    return n * (2 if mode == NOISE_FLOAT16 else 8)
+
+
+def encode_session(session, lossy=False, level=ZSTD_LEVEL):
+    """Encodes a savePatientData payload. Histories become arrays; everything else is kept as JSON."""
+    header = dict(session)
+    blocks = []
+    for key in HISTORY_KEYS:
+        result = session.get(key)
+        if isinstance(result, dict) and _plain_history(result.get('history')):
+            history = result['history']
+            t = np.array([p['t'] for p in history], dtype=np.float64)
+            noise = np.array([p['noise'] for p in history], dtype=np.float64)
+            t_mode, t_bytes = encode_times(t)
+            noise_mode, noise_bytes = encode_noise(noise, lossy)
+            blocks.append(_HISTORY_HEADER.pack(len(history), t_mode, noise_mode) + t_bytes + noise_bytes)
+            header[key] = dict(result, history=PLACEHOLDER)
+
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    payload = struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(blocks)
+    compressed = zstandard.ZstdCompressor(level=level).compress(payload)
+    return MAGIC + struct.pack('<B', FORMAT_VERSION) + compressed
+
+
+def _js_number(value):
+    # JSON.stringify writes integral numbers without a fraction (0, 60), so
+    # restore them as ints to reproduce the export byte for byte
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def decode_histories(data):
+    """Decodes the header and the histories as {key: (t, noise)} arrays, without per-point dicts."""
+    if data[:4] != MAGIC:
+        raise ValueError("Not an ANL session file")
+    version = data[4]
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported session format version {version}")
+    payload = zstandard.ZstdDecompressor().decompress(data[5:])
+
+    header_len, = struct.unpack_from('<I', payload, 0)
+    session = json.loads(payload[4:4 + header_len].decode('utf-8'))
+    pos = 4 + header_len
+    histories = {}
+    for key in HISTORY_KEYS:
+        result = session.get(key)
+        if not isinstance(result, dict) or result.get('history') != PLACEHOLDER:
+            continue
+        n, t_mode, noise_mode = _HISTORY_HEADER.unpack_from(payload, pos)
+        pos += _HISTORY_HEADER.size
+        t_size = _payload_size(t_mode, n, 't')
+        noise_size = _payload_size(noise_mode, n, 'noise')
+        histories[key] = (decode_times(t_mode, payload[pos:pos + t_size], n),
+                          decode_noise(noise_mode, payload[pos + t_size:pos + t_size + noise_size], n))
+        pos += t_size + noise_size
+    return session, histories
+
+
+def decode_session(data):
+    """Decodes an encoded session back to the dict App.jsx loadPatientData reads."""
+    session, histories = decode_histories(data)
+    for key, (t, noise) in histories.items():
+        session[key]['history'] = [{'t': _js_number(a), 'noise': _js_number(b)}
+                                   for a, b in zip(t.tolist(), noise.tolist())]
+    return session
+
+
+def sessions_match(decoded, session, lossy=False):
+    """Lossless: identical values. Lossy: identical apart from float16-rounded noise levels."""
+    if not lossy:
+        return decoded == session
+    for key in HISTORY_KEYS:
+        a, b = decoded.get(key), session.get(key)
+        if isinstance(a, dict) and isinstance(b, dict) and _plain_history(b.get('history')):
+            noise_a = np.array([p['noise'] for p in a['history']])
+            noise_b = np.array([p['noise'] for p in b['history']])
+            t_a = [p['t'] for p in a['history']]
+            t_b = [p['t'] for p in b['history']]
+            if t_a != t_b or not np.allclose(noise_a, noise_b, rtol=2 ** -10, atol=0):
+                return False
+            a, b = dict(a, history=None), dict(b, history=None)
+        if a != b:
+            return False
+    return all(decoded.get(k) == session.get(k) for k in session if k not in HISTORY_KEYS)
+
+
+def js_number_text(value):
+    """Number formatting of JSON.stringify (ECMAScript Number::toString).
+
+    Python's repr gives the same shortest round-trip digits, but places the exponent
+    differently (1e-07 vs 1e-7, 1e+16 vs 10000000000000000).
+    """
+    if isinstance(value, int):
+        return str(value)
+    if value != value or value in (float('inf'), float('-inf')):
+        return 'null'
+    if value == 0:
+        return '0'
+    sign = '-' if value < 0 else ''
+    _, digit_tuple, exponent = Decimal(repr(abs(value))).normalize().as_tuple()
+    digits = ''.join(map(str, digit_tuple))
+    k = len(digits)
+    n = exponent + k
+    if k <= n <= 21:
+        return sign + digits + '0' * (n - k)
+    if 0 < n <= 21:
+        return sign + digits[:n] + '.' + digits[n:]
+    if -6 < n <= 0:
+        return sign + '0.' + '0' * -n + digits
+    mantissa = digits if k == 1 else digits[0] + '.' + digits[1:]
+    return f"{sign}{mantissa}e{'+' if n - 1 >= 0 else '-'}{abs(n - 1)}"
+
+
+def _js_stringify(value, indent):
+    if value is None:
+        return 'null'
+    if value is True or value is False:
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return js_number_text(value)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    inner = indent + '  '
+    if isinstance(value, dict):
+        if not value:
+            return '{}'
+        items = [f"{inner}{json.dumps(str(k), ensure_ascii=False)}: {_js_stringify(v, inner)}"
+                 for k, v in value.items()]
+        return '{\n' + ',\n'.join(items) + '\n' + indent + '}'
+    if not value:
+        return '[]'
+    return '[\n' + ',\n'.join(inner + _js_stringify(v, inner) for v in value) + '\n' + indent + ']'
+
+
+def to_json_text(session):
+    """Same text as JSON.stringify(data, null, 2) in savePatientData."""
+    return _js_stringify(session, '')
+
+
+def output_path_for(path, output_dir, extension):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    if extension == '.json' and not output_dir:
+        extension = DECODED_SUFFIX
+    return os.path.join(output_dir or os.path.dirname(path), stem + extension)
+
+
+def convert_file(job):
+    """Converts one file in either direction.
+
+    Returns (path, bytes in, bytes out, status). status is None without verification;
+    otherwise 'exact' (the decode is byte-identical to the source file), 'values'
+    (equal values, e.g. a lossy encode or a file not written by JSON.stringify), or
+    'failed'. Existing JSON files are never overwritten: the status is then 'exists'.
+    """
+    path, output_dir, lossy, verify = job
+    with open(path, 'rb') as f:
+        raw = f.read()
+
+    if path.endswith(EXTENSION):
+        out_path = output_path_for(path, output_dir, '.json')
+        if os.path.exists(out_path):
+            return path, len(raw), 0, 'exists'
+        text = to_json_text(decode_session(raw)).encode('utf-8')
+        with open(out_path, 'wb') as f:
+            f.write(text)
+        return path, len(raw), len(text), None
+
+    session = json.loads(raw.decode('utf-8'))
+    encoded = encode_session(session, lossy)
+    out_path = output_path_for(path, output_dir, EXTENSION)
+    with open(out_path, 'wb') as f:
+        f.write(encoded)
+    status = None
+    if verify:
+        decoded = decode_session(encoded)
+        if not sessions_match(decoded, session, lossy):
+            status = 'failed'
+        elif not lossy and to_json_text(decoded).encode('utf-8') == raw:
+            status = 'exact'
+        else:
+            status = 'values'
+    return path, len(raw), len(encoded), status
+
+
+def find_files(paths, extension):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            pattern = '*' + EXTENSION if extension == EXTENSION else 'ANL_Test_*.json'
+            files.extend(f for f in glob.glob(os.path.join(p, '**', pattern), recursive=True)
+                         if not f.endswith(DECODED_SUFFIX))
+        elif os.path.isfile(p):
+            files.append(p)
+    return sorted(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert ANL session JSON to/from the compact binary format.")
+    parser.add_argument('paths', nargs='*', default=['.'], help="Session files or directories")
+    parser.add_argument('--to-json', action='store_true',
+                        help=f"Decode .anls files back to JSON (<name>{DECODED_SUFFIX} unless --output is given)")
+    parser.add_argument('--output', help="Output directory (defaults to next to each input)")
+    parser.add_argument('--lossy', action='store_true', help="Store noise levels as float16 (not lossless)")
+    parser.add_argument('--verify', action='store_true', help="Decode each file again and compare with the source")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    files = find_files(args.paths, EXTENSION if args.to_json else '.json')
+    if not files:
+        print("No session files found.")
+        return
+    if args.output:
+        os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    total_in = total_out = 0
+    statuses = {}
+    jobs = [(f, args.output, args.lossy, args.verify and not args.to_json) for f in files]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for path, size_in, size_out, status in pool.map(convert_file, jobs, chunksize=32):
+            total_in += size_in
+            total_out += size_out
+            statuses.setdefault(status, []).append(path)
+    elapsed = time.perf_counter() - start
+
+    print(f"Converted {len(files)} files in {elapsed:.2f}s ({total_in / 1e6 / elapsed:.1f} MB/s read)")
+    print(f"  {total_in / 1e6:.2f} MB -> {total_out / 1e6:.2f} MB ({total_in / max(total_out, 1):.1f}x)")
+    if statuses.get('exists'):
+        print(f"  [SKIPPED] {len(statuses['exists'])} files already exist and were not overwritten:")
+        for path in statuses['exists']:
+            print(f"    {output_path_for(path, args.output, '.json')}")
+    if args.verify and not args.to_json:
+        if statuses.get('failed'):
+            print(f"  [FAIL] {len(statuses['failed'])} files do not round-trip:")
+            for path in statuses['failed']:
+                print(f"    {path}")
+            sys.exit(1)
+        if args.lossy:
+            print("  [OK] All files round-trip within float16 precision")
+        else:
+            print(f"  [OK] All files round-trip losslessly: {len(statuses.get('exact', []))} byte for byte, "
+                  f"{len(statuses.get('values', []))} by value only (not in JSON.stringify layout)")
+
+if __name__ == "__main__":
+    main()
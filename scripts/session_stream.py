@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+from session_codec import to_json_text
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+CHUNK_BYTES = 1 << 20
+HISTORY_KEYS = ('resultsA', 'resultsB')
+
+QUOTE, BACKSLASH, OPEN, CLOSE = ord('"'), ord('\\'), ord('{'), ord('}')
+HISTORY_ARRAY = re.compile(rb'"history"\s*:\s*\[([^\[\]]*)\]')
+POINT_VALUE = re.compile(rb'"(t|noise)"\s*:\s*(-?[0-9][0-9.eE+\-]*)')
+
+
+class ScanState:
+    """Lexer state carried from one chunk to the next."""
+
+    def __init__(self):
+        self.depth = 0            # brace depth outside strings
+        self.in_string = False
+        self.backslashes = 0      # backslashes at the end of the previous chunk (inside a string)
+
+
+def scan_chunk(chunk, state):
+    """Finds where top-level objects start and end in one chunk.
+
+    Works on the whole chunk with NumPy: a quote is escaped when an odd run of
+    backslashes precedes it, string state is the parity of unescaped quotes, and
+    object depth is a cumulative sum over the braces outside strings. Returns
+    (start offsets, end offsets) within the chunk and updates `state`.
+    """
+    b = np.frombuffer(chunk, dtype=np.uint8)
+    positions = np.arange(len(b))
+    not_backslash = np.flatnonzero(b != BACKSLASH)
+
+    quotes = np.flatnonzero(b == QUOTE)
+    previous = np.searchsorted(not_backslash, quotes) - 1
+    # Length of the backslash run right before each quote (continuing from the last chunk)
+    run = np.where(previous >= 0, quotes - 1 - not_backslash[np.maximum(previous, 0)], quotes + state.backslashes)
+    real_quotes = quotes[run % 2 == 0]
+
+    braces = np.flatnonzero((b == OPEN) | (b == CLOSE))
+    outside = (state.in_string + np.searchsorted(real_quotes, braces)) % 2 == 0
+    braces = braces[outside]
+    step = np.where(b[braces] == OPEN, 1, -1)
+    depth = state.depth + np.cumsum(step)
+    starts = braces[(step == 1) & (depth == 1)]
+    ends = braces[(step == -1) & (depth == 0)] + 1
+
+    if len(depth):
+        state.depth = int(depth[-1])
+    state.in_string = bool((state.in_string + len(real_quotes)) % 2)
+    if len(not_backslash):
+        state.backslashes = int(positions[-1] - not_backslash[-1])
+    else:
+        state.backslashes += len(b)
+    return starts, ends
+
+
+def _history_arrays(body):
+    """(t, noise) arrays from the text inside a history [...], or None if it is not plain {t, noise} points."""
+    values = POINT_VALUE.findall(body)
+    n = body.count(b'{')
+    if len(values) != 2 * n or body.count(b'}') != n or body.count(b'"') != 4 * n:
+        return None
+    keys = [k for k, _ in values]
+    if keys[0::2] != [b't'] * n or keys[1::2] != [b'noise'] * n:
+        return None
+    numbers = np.array([v for _, v in values]).astype(np.float64) if n else np.empty(0)
+    return numbers[0::2], numbers[1::2]
+
+
+def parse_session(data):
+    """Parses one savePatientData payload. Histories come back as NumPy arrays.
+
+    Returns (session, histories) where histories maps 'resultsA'/'resultsB' to
+    (t, noise) and the session's own 'history' entries are set to None.
+    """
+    arrays = []
+    parts = []
+    last = 0
+    for match in HISTORY_ARRAY.finditer(data):
+        history = _history_arrays(match.group(1))
+        if history is None:
+            continue
+        parts.append(data[last:match.start()])
+        parts.append(b'"history":"$history:%d"' % len(arrays))
+        arrays.append(history)
+        last = match.end()
+    parts.append(data[last:])
+    session = json.loads(b''.join(parts))
+
+    histories = {}
+    for key in HISTORY_KEYS:
+        result = session.get(key)
+        if not isinstance(result, dict):
+            continue
+        marker = result.get('history')
+        if isinstance(marker, str) and marker.startswith('$history:'):
+            histories[key] = arrays[int(marker.split(':')[1])]
+            result['history'] = None
+        elif isinstance(result.get('history'), list):
+            # Points with extra keys or unusual values: fall back to the parsed list
+            points = result['history']
+            histories[key] = (np.array([p['t'] for p in points], dtype=np.float64),
+                              np.array([p['noise'] for p in points], dtype=np.float64))
+            result['history'] = None
+    return session, histories
+
+
+def iter_payloads(stream, chunk_bytes=CHUNK_BYTES):
+    """Yields (byte offset, raw bytes) for every top-level object in a binary stream.
+
+    Payloads may be concatenated directly, separated by whitespace/newlines or
+    wrapped in a JSON array. Only the payload being read is held in memory.
+    """
+    state = ScanState()
+    pending = []
+    base = 0
+    start = 0
+    while True:
+        chunk = stream.read(chunk_bytes)
+        if not chunk:
+            break
+        starts, ends = scan_chunk(chunk, state)
+        # An end and the next start can share an offset ("}{"); handle the end first
+        events = sorted([(int(e), 0) for e in ends] + [(int(s), 1) for s in starts])
+        cursor = 0
+        for pos, is_start in events:
+            if is_start:
+                cursor = pos
+                start = base + pos
+                pending = []
+            else:
+                pending.append(chunk[cursor:pos])
+                yield start, b''.join(pending)
+                pending = []
+                cursor = pos
+        if state.depth > 0:
+            pending.append(chunk[cursor:])
+        base += len(chunk)
+    if state.depth > 0:
+        raise ValueError("Stream ended inside a session payload")
+
+
+def iter_sessions(stream, chunk_bytes=CHUNK_BYTES):
+    """Yields (session, histories) for every payload in a binary stream (see iter_payloads)."""
+    for _, data in iter_payloads(stream, chunk_bytes):
+        yield parse_session(data)
+
+
+def iter_file(path, chunk_bytes=CHUNK_BYTES):
+    with open(path, 'rb') as f:
+        yield from iter_sessions(f, chunk_bytes)
+
+
+def to_export(session, histories):
+    """Rebuilds the exported dict (history as {t, noise} points) for writing back to JSON."""
+    for key, (t, noise) in histories.items():
+        session[key]['history'] = [{'t': int(a) if a.is_integer() else a, 'noise': int(b) if b.is_integer() else b}
+                                   for a, b in zip(t.tolist(), noise.tolist())]
+    return session
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where it is not available."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes on Linux
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream sessions out of large concatenated export bundles.")
+    parser.add_argument('bundles', nargs='+', help="Bundle files of concatenated savePatientData payloads")
+    parser.add_argument('--split', help="Write every session as its own ANL_Test_*.json into this directory")
+    parser.add_argument('--chunk-mb', type=float, default=CHUNK_BYTES / (1 << 20), help="Read size in MB")
+    args = parser.parse_args()
+
+    if args.split:
+        os.makedirs(args.split, exist_ok=True)
+    chunk_bytes = int(args.chunk_mb * (1 << 20))
+
+    start = time.perf_counter()
+    sessions = tests = points = size = 0
+    for bundle in args.bundles:
+        size += os.path.getsize(bundle)
+        for session, histories in iter_file(bundle, chunk_bytes):
+            sessions += 1
+            tests += len(histories)
+            points += sum(len(t) for t, _ in histories.values())
+            if args.split:
+                name = f"ANL_Test_{(session.get('patientName') or 'Patient').replace(' ', '_')}_" \
+                       f"{session.get('testDate') or ''}_{sessions:06d}.json"
+                # Same layout as the app's own export, so split files match real ANL_Test_*.json files
+                with open(os.path.join(args.split, name), 'w', encoding='utf-8') as f:
+                    f.write(to_json_text(to_export(session, histories)))
+    elapsed = time.perf_counter() - start
+
+    peak_mb = peak_rss_mb()
+    print(f"Read {sessions} sessions ({tests} tests, {points} tracking points) from {size / 1e6:.1f} MB "
+          f"in {elapsed:.2f}s ({size / 1e6 / elapsed:.1f} MB/s)"
+          + (f", peak RSS {peak_mb:.0f} MB" if peak_mb is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
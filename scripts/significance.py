@@ -0,0 +1,210 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import stdtr
+
+from anl_scoring import ragged_reversals, to_fixed_array
+from ingest_sessions import load_store
+
+# Same critical-difference rule as calculateSignificance in src/utils/statistics.js
+Z_95 = 1.96
+Z_80 = 1.28
+# generateFinalResults drops the first 3 legacy reversals before computing SE
+SKIPPED_REVERSALS = 3
+BOOTSTRAP_CHUNK = 256
+
+MESSAGES = {
+    ('Strong', True): "Definite Improvement (95% CI)",
+    ('Strong', False): "Definite Decline (95% CI)",
+    ('Moderate', True): "Likely Improvement (80% CI)",
+    ('Moderate', False): "Likely Decline (80% CI)",
+}
+
+
+def calculate_significance(score_a, score_b, se_a, se_b):
+    """Vectorised port of calculateSignificance over arrays of Test A/B results.
+
+    Returns columns with the same fields as the JS result. Pairs without a positive
+    SE on both sides get an empty status, as the JS fallback sets none.
+    """
+    score_a = np.asarray(score_a, dtype=np.float64)
+    score_b = np.asarray(score_b, dtype=np.float64)
+    # `validity.se || 0` in JS turns missing values into 0
+    se_a = np.nan_to_num(np.asarray(se_a, dtype=np.float64), nan=0.0)
+    se_b = np.nan_to_num(np.asarray(se_b, dtype=np.float64), nan=0.0)
+
+    diff = np.abs(score_a - score_b)
+    combined_error = np.sqrt(se_a ** 2 + se_b ** 2)
+    cd95 = Z_95 * combined_error
+    cd80 = Z_80 * combined_error
+    valid = (se_a > 0) & (se_b > 0)
+    sig95 = valid & (diff > cd95)
+    sig80 = valid & (diff > cd80)
+    improvement = score_b - score_a > 0
+
+    status = np.where(sig95, "Strong", np.where(sig80, "Moderate", np.where(valid, "None", "")))
+    message = [
+        MESSAGES.get((s, bool(up)), "No Significant Difference") if ok
+        else "Cannot calculate significance (Missing Statistical Data)."
+        for s, up, ok in zip(status, improvement, valid)
+    ]
+    return {
+        'status': status,
+        'is_significant': sig95 | sig80,
+        'confidence_level': np.where(sig95, 95, np.where(sig80, 80, 0)),
+        'critical_difference_95': np.where(valid, to_fixed_array(cd95, 2), np.nan),
+        'critical_difference_80': np.where(valid, to_fixed_array(cd80, 2), np.nan),
+        'diff': np.where(valid, to_fixed_array(diff, 1), np.nan),
+        'message': np.array(message)
+    }
+
+
+def welch_t_test(mean_a, var_a, n_a, mean_b, var_b, n_b):
+    """Two-sided Welch t-test (B - A) on summary statistics. Returns (t, df, p)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        err_a = var_a / n_a
+        err_b = var_b / n_b
+        t = (mean_b - mean_a) / np.sqrt(err_a + err_b)
+        df = (err_a + err_b) ** 2 / (err_a ** 2 / (n_a - 1) + err_b ** 2 / (n_b - 1))
+        p = 2 * stdtr(df, -np.abs(t))
+    return t, df, p
+
+
+def reversal_samples(store):
+    """Legacy reversal levels per test (first 3 dropped), as flat levels plus offsets."""
+    indices, counts = ragged_reversals(store['t'], store['noise'], store['offsets'], ignore_seconds=None)
+    session = np.repeat(np.arange(len(counts)), counts)
+    rank = np.arange(len(indices)) - (np.cumsum(counts) - counts)[session]
+    keep = rank >= SKIPPED_REVERSALS
+    levels = store['noise'][indices[keep]]
+    sample_counts = np.maximum(counts - SKIPPED_REVERSALS, 0)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(sample_counts, out=offsets[1:])
+    return levels, offsets
+
+
+def segment_moments(levels, offsets):
+    n = np.diff(offsets)
+    session = np.repeat(np.arange(len(n)), n)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(session, weights=levels, minlength=len(n)) / n
+        ss = np.bincount(session, weights=(levels - mean[session]) ** 2, minlength=len(n))
+        var = ss / (n - 1)
+    return mean, var, n
+
+
+def _bootstrap_chunk(job):
+    """Percentile CIs of mean(B) - mean(A) for a chunk of pairs, seeded per pair."""
+    seed, pair_ids, samples_a, samples_b, n_boot, alpha = job
+    low = np.full(len(pair_ids), np.nan)
+    high = np.full(len(pair_ids), np.nan)
+    for k, (pair_id, a, b) in enumerate(zip(pair_ids, samples_a, samples_b)):
+        if len(a) < 2 or len(b) < 2:
+            continue
+        # Seeding by pair index keeps results independent of chunking and worker count
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(int(pair_id),)))
+        mean_a = a[rng.integers(0, len(a), size=(n_boot, len(a)))].mean(axis=1)
+        mean_b = b[rng.integers(0, len(b), size=(n_boot, len(b)))].mean(axis=1)
+        low[k], high[k] = np.quantile(mean_b - mean_a, [alpha / 2, 1 - alpha / 2])
+    return low, high
+
+
+def bootstrap_mean_difference(levels, offsets, rows_a, rows_b, n_boot=2000, seed=0, alpha=0.05, workers=None):
+    """Parallel, seeded bootstrap CI of the difference in mean reversal level for each pair."""
+    jobs = []
+    for start in range(0, len(rows_a), BOOTSTRAP_CHUNK):
+        stop = min(start + BOOTSTRAP_CHUNK, len(rows_a))
+        samples_a = [levels[offsets[r]:offsets[r + 1]] for r in rows_a[start:stop]]
+        samples_b = [levels[offsets[r]:offsets[r + 1]] for r in rows_b[start:stop]]
+        jobs.append((seed, np.arange(start, stop), samples_a, samples_b, n_boot, alpha))
+
+    if not jobs:
+        return np.empty(0), np.empty(0)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_bootstrap_chunk, jobs))
+    return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+
+def pair_rows(store):
+    """Row numbers of Test A and Test B for every session file that has both."""
+    paths, inverse = np.unique(store['path'], return_inverse=True)
+    rows_a = np.full(len(paths), -1)
+    rows_b = np.full(len(paths), -1)
+    is_a = store['test_id'] == 'A'
+    is_b = store['test_id'] == 'B'
+    rows_a[inverse[is_a]] = np.flatnonzero(is_a)
+    rows_b[inverse[is_b]] = np.flatnonzero(is_b)
+    complete = (rows_a >= 0) & (rows_b >= 0)
+    return rows_a[complete], rows_b[complete]
+
+
+def significance_table(store, n_boot=2000, seed=0, workers=None):
+    """Runs the JS rule, Welch t-tests and bootstrap CIs over every A/B pair in the store."""
+    rows_a, rows_b = pair_rows(store)
+    table = {
+        'path': store['path'][rows_a],
+        'patient': store['patient'][rows_a],
+        'test_date': store['test_date'][rows_a],
+        'label_a': store['label'][rows_a],
+        'label_b': store['label'][rows_b],
+        'eANL_a': store['eANL'][rows_a],
+        'eANL_b': store['eANL'][rows_b],
+        'se_a': store['se'][rows_a],
+        'se_b': store['se'][rows_b],
+    }
+    table.update(calculate_significance(table['eANL_a'], table['eANL_b'], table['se_a'], table['se_b']))
+
+    levels, offsets = reversal_samples(store)
+    mean, var, n = segment_moments(levels, offsets)
+    t, df, p = welch_t_test(mean[rows_a], var[rows_a], n[rows_a], mean[rows_b], var[rows_b], n[rows_b])
+    table.update({'reversal_mean_a': mean[rows_a], 'reversal_mean_b': mean[rows_b],
+                  'welch_t': t, 'welch_df': df, 'welch_p': p})
+
+    if n_boot > 0:
+        low, high = bootstrap_mean_difference(levels, offsets, rows_a, rows_b, n_boot, seed, workers=workers)
+        table.update({'bootstrap_low': low, 'bootstrap_high': high})
+    return table
+
+
+def write_table(table, path):
+    columns = list(table.keys())
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in zip(*(table[c] for c in columns)):
+            writer.writerow(['' if isinstance(v, float) and np.isnan(v) else v for v in row])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Test A/B significance for every session pair in a session store.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--output', default='significance.csv', help="CSV table to write")
+    parser.add_argument('--bootstrap', type=int, default=2000, help="Bootstrap resamples per pair (0 to skip)")
+    parser.add_argument('--seed', type=int, default=0, help="Bootstrap seed")
+    parser.add_argument('--workers', type=int, default=None, help="Number of bootstrap processes")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    start = time.perf_counter()
+    store = load_store(args.store)
+    table = significance_table(store, args.bootstrap, args.seed, args.workers)
+    print(f"Compared {len(table['path'])} A/B pairs in {time.perf_counter() - start:.2f}s")
+
+    for status in ("Strong", "Moderate", "None", ""):
+        print(f"  {status or 'No SE'}: {np.sum(table['status'] == status)}")
+    if len(table['path']):
+        print(f"  Welch p < 0.05: {np.sum(table['welch_p'] < 0.05)}")
+
+    write_table(table, args.output)
+    print(f"Saved table to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
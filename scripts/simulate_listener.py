@@ -0,0 +1,207 @@
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from anl_scoring import DEFAULT_SPEECH_LEVEL, score_batch
+
+# Tracking protocol as implemented in AutoTrackingPhase.jsx (v1.0.33)
+PROTOCOL = {
+    'initial_rate': 1.0,          # dB/s before the rate switch
+    'final_rate': 0.5,            # dB/s after the rate switch
+    'rate_switch_reversals': 6,   # reversals counted before switching rate
+    'debounce_seconds': 1.0,      # reversal guardrail (1000 ms)
+    'ignore_seconds': 30,         # aHANT ignores reversals before this time
+    'duration_seconds': 120,      # fixed test duration
+    'start_offset_db': 15,        # noise starts this far below speech
+    'min_level': 0,
+    'max_level': 100,
+    'tick_seconds': 0.1,          # loop only updates once dt >= 0.1 s
+    'frame_seconds': 1 / 60,      # requestAnimationFrame interval
+}
+
+# Synthetic listener population
+LISTENER = {
+    'anl_mean': -8.0,             # true ANL (dB) population mean
+    'anl_sd': 5.0,                # true ANL population SD
+    'latency_seconds': 0.4,       # mean reaction time to the noise level
+    'latency_sd': 0.1,
+    'decision_sd': 1.5,           # SD of the slow drift in the listener's criterion (dB)
+    'decision_drift_seconds': 3.0,  # correlation time of that drift
+    'hysteresis_db': 2.0,         # gap between the press and release levels
+}
+
+CHUNK_SIZE = 10000
+
+
+def tick_schedule(protocol):
+    """Timestamps (ms) and dt (s) of every loop update, as produced by the rAF loop.
+
+    The loop runs once per frame against Date.now() (whole milliseconds) and only
+    updates when at least tick_seconds have elapsed. With steady 60 Hz frames that
+    is every 6th frame, i.e. exactly 100 ms; a tick only slips to the 7th frame
+    (~117 ms) when a frame arrives late, which this schedule does not model.
+    """
+    frame_ms = protocol['frame_seconds'] * 1000
+    tick_ms = protocol['tick_seconds'] * 1000
+    duration_ms = protocol['duration_seconds'] * 1000
+
+    times = []
+    last = 0.0
+    frame = 0
+    while not times or times[-1] < duration_ms:
+        frame += 1
+        now = np.floor(frame * frame_ms)
+        if now - last >= tick_ms:
+            times.append(now)
+            last = now
+    times = np.array(times)
+    dt = np.diff(times, prepend=0.0) / 1000
+    return times, dt
+
+
+def draw_listeners(rng, n, listener):
+    true_anl = rng.normal(listener['anl_mean'], listener['anl_sd'], n)
+    latency = np.maximum(rng.normal(listener['latency_seconds'], listener['latency_sd'], n), 0)
+    return true_anl, latency
+
+
+def simulate(true_anl, latency, rng, protocol=PROTOCOL, listener=LISTENER, speech_level=DEFAULT_SPEECH_LEVEL):
+    """Runs a batch of listeners through the tracking state machine.
+
+    Returns (t, noise) where t is the shared tick time axis (starting with t=0) and
+    noise is an (n_listeners, n_points) matrix of the recorded history.
+    """
+    times, dt = tick_schedule(protocol)
+    n = len(true_anl)
+    n_ticks = len(times)
+    delay = np.round(latency / np.mean(dt)).astype(np.int64)
+    rows = np.arange(n)
+
+    # Stored tick-major so every update writes one contiguous row
+    history = np.empty((n_ticks + 1, n))
+    history[0] = speech_level - protocol['start_offset_db']
+    level = history[0].copy()
+    is_increasing = np.ones(n, dtype=bool)
+    reversal_count = np.zeros(n, dtype=np.int64)
+    last_reversal = np.full(n, -np.inf)
+    debounce_ms = protocol['debounce_seconds'] * 1000
+    key_up = np.ones(n, dtype=bool)
+    half_gap = listener['hysteresis_db'] / 2
+
+    # AR(1) drift of the criterion, so decisions wander rather than flicker every tick
+    rho = np.exp(-np.mean(dt) / listener['decision_drift_seconds'])
+    drift = rng.normal(0, listener['decision_sd'], n)
+    innovation_sd = listener['decision_sd'] * np.sqrt(1 - rho ** 2)
+
+    for k in range(n_ticks):
+        # The listener reacts to the level they heard `latency` seconds ago
+        heard = history[np.maximum(k - delay, 0), rows]
+        drift = rho * drift + rng.normal(0, innovation_sd, n)
+        criterion = speech_level + true_anl + drift
+        # Press once the noise is clearly too loud, release once it is clearly acceptable
+        wants_increase = np.where(key_up, heard <= criterion + half_gap, heard < criterion - half_gap)
+        key_up = wants_increase
+
+        # Debounce only gates reversal counting; the level follows the key directly
+        accepted = (wants_increase != is_increasing) & (times[k] - last_reversal > debounce_ms)
+        reversal_count += accepted
+        last_reversal = np.where(accepted, times[k], last_reversal)
+        is_increasing = np.where(accepted, wants_increase, is_increasing)
+
+        rate = np.where(reversal_count < protocol['rate_switch_reversals'],
+                        protocol['initial_rate'], protocol['final_rate'])
+        level = level + np.where(wants_increase, 1.0, -1.0) * rate * dt[k]
+        np.clip(level, protocol['min_level'], protocol['max_level'], out=level)
+        history[k + 1] = level
+
+    return np.concatenate(([0.0], times / 1000)), history.T
+
+
+def score_simulation(t, history, speech_level=DEFAULT_SPEECH_LEVEL, protocol=PROTOCOL):
+    n, n_points = history.shape
+    offsets = np.arange(n + 1, dtype=np.int64) * n_points
+    return score_batch(np.tile(t, n), np.ascontiguousarray(history).ravel(), offsets, speech_level,
+                       ignore_seconds=protocol['ignore_seconds'])
+
+
+def _run_chunk(job):
+    seed, n, protocol, listener, speech_level = job
+    rng = np.random.default_rng(seed)
+    true_anl, latency = draw_listeners(rng, n, listener)
+    t, history = simulate(true_anl, latency, rng, protocol, listener, speech_level)
+    columns = score_simulation(t, history, speech_level, protocol)
+    return {
+        'true_anl': true_anl,
+        'latency': latency,
+        'aANL': columns['aANL'],
+        'eANL': columns['eANL'],
+        'se': columns['se'],
+        'reversal_count': columns['reversal_count'],
+        'duration_seconds': columns['duration_seconds'],
+    }
+
+
+def run_monte_carlo(n_runs, seed=0, protocol=PROTOCOL, listener=LISTENER,
+                    speech_level=DEFAULT_SPEECH_LEVEL, workers=None):
+    """Simulates n_runs listeners in seeded chunks across a process pool."""
+    seeds = np.random.SeedSequence(seed).spawn(int(np.ceil(n_runs / CHUNK_SIZE)))
+    sizes = [min(CHUNK_SIZE, n_runs - i * CHUNK_SIZE) for i in range(len(seeds))]
+    jobs = [(s, size, protocol, listener, speech_level) for s, size in zip(seeds, sizes)]
+    if workers == 1:
+        results = [_run_chunk(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_chunk, jobs))
+    return {key: np.concatenate([r[key] for r in results]) for key in results[0]}
+
+
+def summarize(runs):
+    """Bias, SE and RMSE of aHANT/eANL against the simulated listeners' true ANL."""
+    summary = {}
+    for metric in ('aANL', 'eANL'):
+        error = runs[metric] - runs['true_anl']
+        valid = ~np.isnan(error)
+        summary[metric] = {
+            'bias': float(np.mean(error[valid])),
+            'se': float(np.std(error[valid], ddof=1)),
+            'rmse': float(np.sqrt(np.mean(error[valid] ** 2))),
+            'missing': int(np.sum(~valid)),
+        }
+    summary['duration_seconds'] = float(np.mean(runs['duration_seconds']))
+    summary['reversal_count'] = float(np.mean(runs['reversal_count']))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of listeners running the ANL tracking test.")
+    parser.add_argument('--runs', type=int, default=100000, help="Number of simulated listeners")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="Number of simulation processes")
+    parser.add_argument('--speech-level', type=float, default=DEFAULT_SPEECH_LEVEL)
+    parser.add_argument('--anl-mean', type=float, default=LISTENER['anl_mean'])
+    parser.add_argument('--anl-sd', type=float, default=LISTENER['anl_sd'])
+    parser.add_argument('--latency', type=float, default=LISTENER['latency_seconds'], help="Mean reaction time (s)")
+    parser.add_argument('--decision-sd', type=float, default=LISTENER['decision_sd'], help="Criterion drift SD (dB)")
+    args = parser.parse_args()
+
+    listener = dict(LISTENER, anl_mean=args.anl_mean, anl_sd=args.anl_sd,
+                    latency_seconds=args.latency, decision_sd=args.decision_sd)
+
+    print(f"Simulating {args.runs} listeners...")
+    start = time.perf_counter()
+    runs = run_monte_carlo(args.runs, args.seed, PROTOCOL, listener, args.speech_level, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Finished in {elapsed:.2f}s ({args.runs / elapsed:.0f} runs/s)")
+
+    summary = summarize(runs)
+    for metric in ('aANL', 'eANL'):
+        s = summary[metric]
+        print(f"  {metric}: bias={s['bias']:+.2f} dB, SE={s['se']:.2f} dB, RMSE={s['rmse']:.2f} dB"
+              f" (missing: {s['missing']})")
+    print(f"  Mean reversals: {summary['reversal_count']:.1f}, mean duration: {summary['duration_seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
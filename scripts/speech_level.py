@@ -0,0 +1,224 @@
+import argparse
+import csv
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import soundfile as sf
+from scipy.ndimage import maximum_filter1d
+from scipy.signal import lfilter
+
+DEFAULT_FILES = [
+    "public/audio/anl_speech.flac",
+    "public/audio/4-talker_babble.flac",
+    "public/audio/history_glass.flac",
+    "public/audio/history_bicycle.flac",
+    "public/audio/history_pencil.flac",
+    "public/audio/history_umbrella.flac"
+]
+
+BLOCK_SECONDS = 10
+FLOOR_DB = -120.0
+METHODS = ['rms', 'active', 'vad']
+
+# ITU-T P.56 method B: 30 ms envelope, 200 ms hangover, 15.9 dB margin. The
+# thresholds are spaced 0.5 dB apart rather than the standard's 6 dB powers of two.
+P56_TIME_CONSTANT = 0.03
+P56_HANGOVER_SECONDS = 0.2
+P56_MARGIN_DB = 15.9
+THRESHOLD_STEP_DB = 0.5
+
+# Energy/zero-crossing VAD on 20 ms frames
+VAD_FRAME_SECONDS = 0.02
+VAD_RANGE_DB = 30.0            # voiced frames: within 30 dB of the loud end (95th percentile) of the file
+VAD_UNVOICED_RANGE_DB = 45.0   # weaker frames still count when their zero-crossing rate is fricative-like
+VAD_ZCR = 0.25                 # crossings per sample
+VAD_HANGOVER_SECONDS = 0.2
+
+
+def _db(mean_square):
+    with np.errstate(divide='ignore'):
+        return np.maximum(10 * np.log10(mean_square), FLOOR_DB)
+
+
+def _causal_max(values, size):
+    """max(values[n - size + 1 .. n]) for every n; size must be odd."""
+    return maximum_filter1d(values, size=size, origin=(size - 1) // 2, mode='nearest')
+
+
+def p56_level(sum_squares, frames, activity_counts, thresholds_db):
+    """Active speech level and activity factor from the per-threshold activity counts (P.56 method B)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        active_db = 10 * np.log10(sum_squares / activity_counts)
+    difference = active_db - thresholds_db
+    valid = activity_counts > 0
+    if sum_squares <= 0 or not valid.any():
+        return FLOOR_DB, 0.0
+    below = np.flatnonzero(valid & (difference <= P56_MARGIN_DB))
+    if not len(below):
+        j = np.flatnonzero(valid)[-1]
+        return float(active_db[j]), float(activity_counts[j] / frames)
+    j = below[0]
+    if j == 0 or not valid[j - 1]:
+        return float(active_db[j]), float(activity_counts[j] / frames)
+    # Interpolate between the thresholds either side of the margin crossing
+    w = (difference[j - 1] - P56_MARGIN_DB) / (difference[j - 1] - difference[j])
+    level = active_db[j - 1] + w * (active_db[j] - active_db[j - 1])
+    activity = activity_counts[j - 1] + w * (activity_counts[j] - activity_counts[j - 1])
+    return float(level), float(activity / frames)
+
+
+def vad_mask(energy_db, zcr, frame_seconds=VAD_FRAME_SECONDS):
+    """Speech-active frames from frame energy and zero-crossing rate, with hangover."""
+    if not len(energy_db):
+        return np.zeros(0, dtype=bool)
+    loud = np.percentile(energy_db, 95)
+    voiced = energy_db > loud - VAD_RANGE_DB
+    unvoiced = (energy_db > loud - VAD_UNVOICED_RANGE_DB) & (zcr > VAD_ZCR)
+    active = (voiced | unvoiced) & (energy_db > FLOOR_DB)
+    hangover = 2 * int(round(VAD_HANGOVER_SECONDS / frame_seconds / 2)) + 1
+    return _causal_max(active.astype(np.uint8), hangover).astype(bool)
+
+
+def _block_frames(fs, block_seconds):
+    """Samples per VAD frame and per block; blocks hold whole frames so frames never straddle two blocks."""
+    frame_len = max(int(round(VAD_FRAME_SECONDS * fs)), 1)
+    return frame_len, frame_len * max(int(block_seconds / VAD_FRAME_SECONDS), 1)
+
+
+def measure_file(file_path, block_seconds=BLOCK_SECONDS):
+    """Whole-file RMS, P.56 active speech level and VAD-gated RMS (dBFS), streamed block by block.
+
+    Channels are averaged to mono first, as analyze_audio.py does.
+    """
+    fs = sf.info(file_path).samplerate
+    _, block_frames = _block_frames(fs, block_seconds)
+    blocks = sf.blocks(file_path, blocksize=block_frames, dtype='float64', always_2d=True)
+    return {'file': file_path, **measure_blocks(blocks, fs, block_seconds)}
+
+
+def measure_samples(data, fs, block_seconds=BLOCK_SECONDS):
+    """Same measurements as measure_file for samples already in memory (frames x channels, or mono)."""
+    data = np.asarray(data, dtype=np.float64).reshape(len(data), -1)
+    _, block_frames = _block_frames(fs, block_seconds)
+    return measure_blocks((data[i:i + block_frames] for i in range(0, len(data), block_frames)), fs, block_seconds)
+
+
+def measure_blocks(blocks, fs, block_seconds=BLOCK_SECONDS):
+    """Measurements over consecutive (frames x channels) blocks of block_seconds each (the last may be shorter)."""
+    frame_len, _ = _block_frames(fs, block_seconds)
+
+    g = math.exp(-1 / (fs * P56_TIME_CONSTANT))
+    envelope_b, envelope_a = [1 - g], [1, -g]
+    states = [np.zeros(1), np.zeros(1)]
+    hang = 2 * int(round(P56_HANGOVER_SECONDS * fs / 2))
+    tail = np.zeros(hang)
+    thresholds_db = np.arange(FLOOR_DB, 0.0 + THRESHOLD_STEP_DB / 2, THRESHOLD_STEP_DB)
+    level_counts = np.zeros(len(thresholds_db), dtype=np.int64)
+
+    sum_squares = 0.0
+    frames = 0
+    frame_power, frame_zcr = [], []
+    previous_sample = 0.0
+    for block in blocks:
+        x = block.mean(axis=1)
+        sum_squares += float(np.dot(x, x))
+        frames += len(x)
+
+        # Two cascaded one-pole smoothers of |x|, state carried between blocks
+        q, states[0] = lfilter(envelope_b, envelope_a, np.abs(x), zi=states[0])
+        q, states[1] = lfilter(envelope_b, envelope_a, q, zi=states[1])
+        # A sample is active for a threshold while the envelope exceeded it within the hangover,
+        # so one histogram of the held envelope gives the counts for every threshold at once
+        extended = np.concatenate((tail, q))
+        held = _causal_max(extended, hang + 1)[len(tail):]
+        tail = extended[-hang:] if hang else tail
+        with np.errstate(divide='ignore'):
+            held_db = 20 * np.log10(held)
+        bins = np.floor((held_db - FLOOR_DB) / THRESHOLD_STEP_DB)
+        bins = np.clip(np.nan_to_num(bins, neginf=-1), -1, len(thresholds_db) - 1).astype(np.int64)
+        level_counts += np.bincount(bins[bins >= 0], minlength=len(thresholds_db))
+
+        n_frames = int(math.ceil(len(x) / frame_len))
+        frame_ids = np.arange(len(x)) // frame_len
+        counts = np.bincount(frame_ids, minlength=n_frames)
+        frame_power.append(np.bincount(frame_ids, weights=x * x, minlength=n_frames) / counts)
+        signs = np.signbit(np.concatenate(([previous_sample], x)))
+        crossings = signs[1:] != signs[:-1]
+        frame_zcr.append(np.bincount(frame_ids, weights=crossings, minlength=n_frames) / counts)
+        previous_sample = x[-1]
+
+    # Samples held at or above threshold j: everything in bins j and higher
+    activity_counts = np.cumsum(level_counts[::-1])[::-1].astype(np.float64)
+    active_db, activity = p56_level(sum_squares, frames, activity_counts, thresholds_db)
+
+    power = np.concatenate(frame_power) if frame_power else np.empty(0)
+    zcr = np.concatenate(frame_zcr) if frame_zcr else np.empty(0)
+    mask = vad_mask(_db(power), zcr)
+    frame_sizes = np.full(len(power), frame_len)
+    if len(frame_sizes):
+        frame_sizes[-1] = frames - frame_len * (len(power) - 1)
+    active_frames = frame_sizes[mask].sum()
+    vad_db = _db(np.sum(power[mask] * frame_sizes[mask]) / active_frames) if active_frames else FLOOR_DB
+
+    return {
+        'duration': frames / fs,
+        'rms_db': float(_db(sum_squares / frames)) if frames else FLOOR_DB,
+        'active_db': active_db,
+        'activity': activity,
+        'vad_db': float(vad_db),
+        'vad_activity': float(active_frames / frames) if frames else 0.0,
+    }
+
+
+def level_db(measurement, method='rms'):
+    """The level a normalization target refers to: whole-file RMS, P.56 active level or VAD-gated RMS."""
+    return measurement[{'rms': 'rms_db', 'active': 'active_db', 'vad': 'vad_db'}[method]]
+
+
+def find_audio_files(paths):
+    files = []
+    for p in paths:
+        if os.path.isdir(p):
+            files.extend(sorted(os.path.join(p, f) for f in os.listdir(p) if f.endswith('.flac')))
+        elif os.path.exists(p):
+            files.append(p)
+        else:
+            print(f"File not found: {p}")
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Active speech level (P.56) and VAD-gated RMS of audio assets.")
+    parser.add_argument('files', nargs='*', default=DEFAULT_FILES, help="Audio files or directories")
+    parser.add_argument('--output', help="Write the catalogue as CSV")
+    parser.add_argument('--workers', type=int, default=None, help="Number of analysis processes")
+    args = parser.parse_args()
+
+    files = find_audio_files(args.files)
+    if not files:
+        print("No audio files found.")
+        return
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(measure_file, files))
+
+    print(f"{'File':<45} {'RMS':>8} {'Active':>8} {'Act %':>6} {'VAD':>8} {'VAD %':>6}")
+    for r in results:
+        print(f"{os.path.basename(r['file']):<45} {r['rms_db']:>8.2f} {r['active_db']:>8.2f} "
+              f"{r['activity'] * 100:>5.1f}% {r['vad_db']:>8.2f} {r['vad_activity'] * 100:>5.1f}%")
+    spread_rms = max(r['rms_db'] for r in results) - min(r['rms_db'] for r in results)
+    spread_active = max(r['active_db'] for r in results) - min(r['active_db'] for r in results)
+    print(f"Level spread: {spread_rms:.2f} dB (RMS) vs {spread_active:.2f} dB (active speech level)")
+
+    if args.output:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"Saved {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+import argparse
+import csv
+import os
+import time
+
+import numpy as np
+
+from anl_scoring import ragged_reversals, session_ids
+from ingest_sessions import load_store
+from resample_histories import TICK_SECONDS, tick_intervals, timing_stats
+
+# A frame that holds the loop for 2.5 ticks or more
+LONG_FRAME_SECONDS = 0.25
+# Thresholds above which timing is considered to have degraded the measurement
+MAX_LONG_FRAME_FRACTION = 0.02     # share of ticks that were long frames
+MAX_STEP_RATE_ERROR = 0.25         # level steps 25% larger than the 0.1 s design step on average
+MAX_REVERSAL_OVERSHOOT_DB = 0.1    # extra level movement at reversals caused by late ticks
+MAX_INTERVAL_SECONDS = 1.0         # any single stall of a second or more
+SITE_FLAG_FRACTION = 0.25          # site flagged when this share of its tests are
+
+COLUMNS = ['points', 'mean_interval_ms', 'jitter_ms', 'max_interval_ms', 'dropped_ticks', 'long_frames',
+           'long_frame_fraction', 'long_frame_seconds', 'step_rate_error', 'max_step_db',
+           'reversal_overshoot_db']
+
+
+def site_of(path):
+    """Sessions are exported per machine/clinic folder, so the parent directory names the site."""
+    return os.path.basename(os.path.dirname(path)) or '(root)'
+
+
+def diagnose(t, noise, offsets):
+    """Per-test frame-timing diagnostics for a ragged batch of histories.
+
+    The loop moves the level by rate * dt with a wall-clock dt, so a late tick
+    both enlarges the level step and delays when a button change takes effect.
+    step_rate_error is how much larger the average per-tick step is than the 0.1 s
+    design step; reversal_overshoot_db is the part of the step taken at each
+    direction change that is due to the tick running late (|step| * (1 - 0.1 / dt)).
+    """
+    n = len(offsets) - 1
+    session = session_ids(offsets)
+    stats = timing_stats(t, offsets)
+    lengths = stats['points']
+    interval = tick_intervals(t, offsets)
+    intervals = np.bincount(session, weights=~np.isnan(interval), minlength=n)
+
+    long_frame = interval >= LONG_FRAME_SECONDS
+    long_frames = np.bincount(session, weights=long_frame, minlength=n).astype(np.int64)
+    lost = np.bincount(session, weights=np.where(long_frame, interval - TICK_SECONDS, 0.0), minlength=n)
+
+    step = np.abs(np.diff(noise, prepend=noise[:1])) if len(noise) else np.empty(0)
+    first = np.diff(offsets) > 0
+    step[offsets[:-1][first]] = 0.0
+    max_step = np.zeros(n)
+    if len(step):
+        np.maximum.at(max_step, session, step)
+
+    # The step leaving each reversal is the first one taken in the new direction
+    indices, count = ragged_reversals(t, noise, offsets, ignore_seconds=None)
+    after = indices + 1
+    with np.errstate(invalid='ignore', divide='ignore'):
+        excess = step[after] * np.maximum(1 - TICK_SECONDS / interval[after], 0.0)
+        overshoot = np.bincount(session[indices], weights=excess, minlength=n) / count
+        long_fraction = long_frames / intervals
+        step_rate_error = stats['mean_interval_ms'] / (TICK_SECONDS * 1000) - 1
+
+    return {
+        'points': lengths,
+        'mean_interval_ms': stats['mean_interval_ms'],
+        'jitter_ms': stats['jitter_ms'],
+        'max_interval_ms': stats['max_interval_ms'],
+        'dropped_ticks': stats['dropped_ticks'],
+        'long_frames': long_frames,
+        'long_frame_fraction': long_fraction,
+        'long_frame_seconds': lost,
+        'step_rate_error': step_rate_error,
+        'max_step_db': max_step,
+        'reversal_overshoot_db': np.where(count > 0, overshoot, np.nan),
+    }
+
+
+def timing_flags(diagnostics):
+    """Reasons a test's timing degraded the measurement ('' when it did not)."""
+    rules = [
+        ('long frames', diagnostics['long_frame_fraction'] > MAX_LONG_FRAME_FRACTION),
+        ('step rate', diagnostics['step_rate_error'] > MAX_STEP_RATE_ERROR),
+        ('reversal overshoot', diagnostics['reversal_overshoot_db'] > MAX_REVERSAL_OVERSHOOT_DB),
+        ('stall', diagnostics['max_interval_ms'] >= MAX_INTERVAL_SECONDS * 1000),
+    ]
+    reasons = np.full(len(diagnostics['points']), '', dtype=object)
+    for name, hit in rules:
+        reasons[hit] = np.where(reasons[hit] == '', name, reasons[hit] + '; ' + name)
+    return reasons.astype(str)
+
+
+def site_summary(sites, diagnostics, reasons):
+    """Aggregates the per-test diagnostics for every site."""
+    names, site_index = np.unique(sites, return_inverse=True)
+    tests = np.bincount(site_index, minlength=len(names))
+    flagged = np.bincount(site_index, weights=reasons != '', minlength=len(names)).astype(np.int64)
+
+    def site_mean(column):
+        values = diagnostics[column]
+        valid = ~np.isnan(values)
+        total = np.bincount(site_index[valid], weights=values[valid], minlength=len(names))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return total / np.bincount(site_index[valid], minlength=len(names))
+
+    summary = []
+    means = {column: site_mean(column) for column in
+             ('mean_interval_ms', 'jitter_ms', 'long_frame_fraction', 'step_rate_error', 'reversal_overshoot_db')}
+    for i, name in enumerate(names):
+        summary.append({
+            'site': name,
+            'tests': int(tests[i]),
+            'flagged_tests': int(flagged[i]),
+            'flagged_fraction': round(float(flagged[i] / tests[i]), 4),
+            'site_flagged': bool(flagged[i] / tests[i] > SITE_FLAG_FRACTION),
+            **{column: round(float(values[i]), 4) for column, values in means.items()},
+        })
+    return summary
+
+
+def write_tests(store, diagnostics, reasons, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['site', 'path', 'patient', 'test_date', 'test_id'] + COLUMNS + ['flags'])
+        for i in range(len(reasons)):
+            writer.writerow([site_of(store['path'][i]), store['path'][i], store['patient'][i],
+                             store['test_date'][i], store['test_id'][i]] +
+                            [_cell(diagnostics[c][i]) for c in COLUMNS] + [reasons[i]])
+
+
+def _cell(value):
+    if np.issubdtype(type(value), np.integer):
+        return int(value)
+    return '' if np.isnan(value) else round(float(value), 4)
+
+
+def write_sites(summary, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=list(summary[0]))
+        writer.writeheader()
+        writer.writerows(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame-timing and tick-jitter diagnostics for archived sessions.")
+    parser.add_argument('--store', default='session_store', help="Store directory built by ingest_sessions.py")
+    parser.add_argument('--output', default='timing_diagnostics.csv', help="Per-test diagnostics (CSV)")
+    parser.add_argument('--sites', default='timing_sites.csv', help="Per-site summary (CSV)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.store):
+        print(f"Store not found: {args.store} (run ingest_sessions.py first)")
+        return
+
+    store = load_store(args.store)
+    start = time.perf_counter()
+    diagnostics = diagnose(store['t'], store['noise'], store['offsets'])
+    reasons = timing_flags(diagnostics)
+    sites = np.array([site_of(p) for p in store['path']], dtype=str)
+    print(f"Profiled {len(reasons)} tests ({len(store['t'])} ticks) in {time.perf_counter() - start:.2f}s")
+
+    flagged = reasons != ''
+    print(f"  Timing degraded the measurement in {flagged.sum()} tests ({flagged.mean():.1%})" if len(reasons)
+          else "  No tests")
+    for name in ('long frames', 'step rate', 'reversal overshoot', 'stall'):
+        print(f"    {name}: {sum(name in r for r in reasons)}")
+
+    write_tests(store, diagnostics, reasons, args.output)
+    print(f"Saved {args.output}")
+    if len(reasons):
+        summary = site_summary(sites, diagnostics, reasons)
+        write_sites(summary, args.sites)
+        print(f"Saved {args.sites}")
+        for row in sorted(summary, key=lambda r: -r['flagged_fraction']):
+            marker = "[FLAG]" if row['site_flagged'] else "      "
+            print(f"  {marker} {row['site']}: {row['flagged_tests']}/{row['tests']} tests flagged, "
+                  f"mean tick {row['mean_interval_ms']:.0f} ms, jitter {row['jitter_ms']:.0f} ms, "
+                  f"overshoot {row['reversal_overshoot_db']:.3f} dB")
+
+
+if __name__ == "__main__":
+    main()
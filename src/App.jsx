@@ -362,10 +362,12 @@ function App() {
             speechLevel={autoSpeechLevel}
             onComplete={(data) => {
               // Data: { mcl, bnl, reason }
+              // Record the passage so offline tools can line the history up with the audio
+              const result = { ...data, speechFile };
               if (activeTestId === 'A') {
-                setResultsA(data);
+                setResultsA(result);
               } else {
-                setResultsB(data);
+                setResultsB(result);
               }
               setPhase('results');
             }}
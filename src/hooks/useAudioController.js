@@ -1,5 +1,26 @@
 import { useState, useRef, useEffect, useCallback } from 'react';
 
+// Alias manifest written by scripts/package_assets.py: byte-identical assets
+// share one canonical file. Missing manifest means no aliases.
+let assetAliasesPromise = null;
+
+const loadAssetAliases = () => {
+  if (!assetAliasesPromise) {
+    assetAliasesPromise = fetch('audio/asset-manifest.json')
+      .then(response => (response.ok ? response.json() : {}))
+      .then(manifest => manifest.aliases || {})
+      .catch(() => ({}));
+  }
+  return assetAliasesPromise;
+};
+
+const resolveAssetUrl = async (url) => {
+  const aliases = await loadAssetAliases();
+  const slash = url.lastIndexOf('/');
+  const name = url.slice(slash + 1);
+  return aliases[name] ? url.slice(0, slash + 1) + aliases[name] : url;
+};
+
 export const useAudioController = (speechUrl, noiseUrl, initialNoiseOffset = 0) => {
   const [isReady, setIsReady] = useState(false);
   const [isPlaying, setIsPlaying] = useState(false);
@@ -28,11 +49,19 @@ export const useAudioController = (speechUrl, noiseUrl, initialNoiseOffset = 0)
       setIsReady(false); // Reset ready state while loading
       console.log(`[Audio] Loading: ${speechUrl} and ${noiseUrl}`);
 
+      // Decode each canonical file once, even if both URLs alias to it
+      const pending = new Map();
       const loadBuffer = async (url) => {
         if (!url) return null; // Handle single file cases (calibration)
-        const response = await fetch(url);
-        const arrayBuffer = await response.arrayBuffer();
-        return await audioContextRef.current.decodeAudioData(arrayBuffer);
+        const resolvedUrl = await resolveAssetUrl(url);
+        if (!pending.has(resolvedUrl)) {
+          pending.set(resolvedUrl, (async () => {
+            const response = await fetch(resolvedUrl);
+            const arrayBuffer = await response.arrayBuffer();
+            return await audioContextRef.current.decodeAudioData(arrayBuffer);
+          })());
+        }
+        return pending.get(resolvedUrl);
       };
 
       const [sBuffer, nBuffer] = await Promise.all([
@@ -0,0 +1,73 @@
+// Regenerates debounce_golden.json by running the tracking loop of AutoTrackingPhase.jsx on a fake clock:
+//   node tests/fixtures/make_debounce_golden.mjs > tests/fixtures/debounce_golden.json
+import fs from 'fs';
+
+const src = fs.readFileSync(new URL('../../src/components/AutoTrackingPhase.jsx', import.meta.url), 'utf8');
+const helpers = src.slice(src.indexOf('    // Calculate Average Excursion Width'), src.indexOf('    // Helper to safely finish'));
+const loopSource = src.slice(src.indexOf('            const getCurrentTrackingRate'),
+                             src.indexOf('            stateRef.current.lastUpdate = Date.now();\n            loop();'));
+const log = console.log;
+console.log = () => {};
+const { calculateLiveMetrics, calculateAverageExcursionHeight, calculateStabilitySD } = new Function(
+    'useState', helpers + '\nreturn { calculateLiveMetrics, calculateAverageExcursionHeight, calculateStabilitySD };'
+)(() => [null, () => {}]);
+
+// Runs the loop at 60 Hz until the 120 s stop; `held` lists [press, release] times in seconds.
+// guardrail=false replaces the 1000 ms check with 0 ms, giving the path the presses alone would trace.
+const run = (held, speechLevel, guardrail) => {
+    const body = guardrail ? loopSource
+                           : loopSource.replace('TIME_SINCE_LAST_REVERSAL > 1000', 'TIME_SINCE_LAST_REVERSAL > 0');
+    if (body === loopSource && !guardrail) {
+        throw new Error('Guardrail check not found in AutoTrackingPhase.jsx');
+    }
+    let clock = 0;
+    let frames = [];
+    let history = [{ t: 0, noise: speechLevel - 15 }];
+    const stateRef = {
+        current: {
+            noiseLevel: speechLevel - 15, isSpaceHeld: false, isNoiseIncreasing: true, reversalCount: 0,
+            dbPerSecond: 1.0, reversalLevels: [], lastReversalTime: 0, lastUpdate: 0,
+            stats: { slope: 0, stdDev: 0, mean: 0 }, isFinishing: false,
+            historyForStability: [{ t: 0, noise: speechLevel - 15 }]
+        }
+    };
+    const FakeDate = { now: () => Math.floor(clock) };
+    const noop = () => {};
+    const loop = new Function(
+        'stateRef', 'speechLevel', 'startTime', 'Date', 'requestAnimationFrame', 'setNoiseVolume', 'setReversalCount',
+        'setCurrentEANL', 'setCurrentAANL', 'setCurrentSD', 'setCurrentStabilitySD', 'setHistory', 'finishTest',
+        'calculateLiveMetrics', 'calculateAverageExcursionHeight', 'calculateStabilitySD', 'REVERSAL_THRESHOLD',
+        'let animationFrame;\n' + body + '\nreturn loop;'
+    )(stateRef, speechLevel, 0, FakeDate, (fn) => frames.push(fn), noop, noop, noop, noop, noop, noop,
+      (update) => { history = update(history); }, () => { stateRef.current.isFinishing = true; },
+      calculateLiveMetrics, calculateAverageExcursionHeight, calculateStabilitySD, 6);
+
+    let frame = 0;
+    let next = loop;
+    while (next) {
+        frame += 1;
+        clock = frame * 1000 / 60;
+        const t = clock / 1000;
+        stateRef.current.isSpaceHeld = held.some(([press, release]) => t >= press && t < release);
+        frames = [];
+        next();
+        next = frames[0];
+    }
+    return { history, reversalCount: stateRef.current.reversalCount };
+};
+
+const cases = {
+    // Quick taps (press and release) less than 1000 ms after an accepted reversal are ignored by the app
+    taps_inside_guardrail: [[10, 14], [14.4, 14.7], [20, 25], [25.3, 25.6], [32, 40], [40.3, 40.5], [47, 52],
+                            [60, 66], [66.5, 66.8], [75, 80], [88, 95], [95.2, 95.9], [105, 110]],
+    // Every press comes well after the last reversal: the guardrail changes nothing
+    presses_outside_guardrail: [[10, 15], [22, 28], [35, 42], [50, 55], [63, 70], [80, 86], [95, 101], [110, 115]]
+};
+
+const golden = {};
+for (const [name, held] of Object.entries(cases)) {
+    const app = run(held, 75, true);
+    const raw = run(held, 75, false);
+    golden[name] = { held, history: raw.history, app_reversal_count: app.reversalCount };
+}
+log(JSON.stringify(golden));
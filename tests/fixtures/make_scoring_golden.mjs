@@ -0,0 +1,49 @@
+// Regenerates scoring_golden.json from generateFinalResults in AutoTrackingPhase.jsx:
+//   node tests/fixtures/make_scoring_golden.mjs > tests/fixtures/scoring_golden.json
+import fs from 'fs';
+
+const src = fs.readFileSync(new URL('../../src/components/AutoTrackingPhase.jsx', import.meta.url), 'utf8');
+const body = src.slice(src.indexOf('    // Calculate Average Excursion Width'), src.indexOf('    // Helper to safely finish'));
+const log = console.log;
+console.log = () => {};
+const { generateFinalResults } = new Function('useState', body + '\nreturn { generateFinalResults };')(() => [null, () => {}]);
+
+// Zig-zag history on a 0.1 s tick through the given (t, noise) turning points
+const zigzag = (turns) => {
+    const history = [];
+    for (let k = 1; k < turns.length; k++) {
+        const [t0, n0] = turns[k - 1];
+        const [t1, n1] = turns[k];
+        const steps = Math.round((t1 - t0) * 10);
+        for (let i = k === 1 ? 0 : 1; i <= steps; i++) {
+            history.push({ t: parseFloat((t0 + i * 0.1).toFixed(1)), noise: n0 + (n1 - n0) * i / steps });
+        }
+    }
+    return history;
+};
+
+const cases = {
+    // Peak exactly at t = 30 (excluded: only t > 30 counts) and one just after
+    reversal_at_30s_boundary: zigzag([[0, 60], [10, 70], [20, 62], [30, 71], [30.1, 70.9], [40, 63],
+                                      [50, 70], [60, 64], [70, 69], [80, 63], [90, 70], [100, 62], [120, 68]]),
+    // Six reversals in all: three are dropped, leaving fewer than 4 for the SE
+    few_reversals_for_se: zigzag([[0, 60], [15, 66], [30, 58], [45, 67], [60, 59], [75, 68], [90, 60], [120, 66]]),
+    // Stopped at 24 s with wide excursions: no stability rating or guessing flag yet
+    short_test_wide_excursions: zigzag([[0, 60], [4, 72], [8, 58], [12, 73], [16, 57], [20, 74], [24, 60]]),
+    // Wide excursions over a full test: "Possible Guessing"
+    full_test_wide_excursions: zigzag([[0, 60], [10, 75], [20, 55], [35, 76], [50, 54], [65, 77], [80, 53],
+                                       [95, 76], [110, 55], [120, 62]]),
+    // Non-round timestamps and levels exercise toFixed rounding
+    irregular_frames: Array.from({ length: 900 }, (_, i) => ({
+        t: i * 0.1337,
+        noise: 60 + 4 * Math.sin(i / 17) + 0.37 * Math.cos(i / 3)
+    })),
+    empty_history: []
+};
+
+const golden = {};
+for (const [name, history] of Object.entries(cases)) {
+    const { score, validity, meta } = generateFinalResults(history, 75, 'golden');
+    golden[name] = { speech_level: 75, history, expected: { score, validity, meta } };
+}
+log(JSON.stringify(golden));
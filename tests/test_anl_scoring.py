@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from anl_scoring import (batch_result, compare_results, flatten_histories, generate_final_results,
+                         history_arrays, identify_reversal_points, local_extrema, ragged_reversals, score_batch)
+
+# Histories with the results generateFinalResults (AutoTrackingPhase.jsx) returned for them;
+# regenerate with tests/fixtures/make_scoring_golden.mjs after changing the JS scoring.
+with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'scoring_golden.json'), encoding='utf-8') as f:
+    GOLDEN = json.load(f)
+
+# Press schedules run through the tracking loop of AutoTrackingPhase.jsx: the path the presses trace
+# with the 1000 ms guardrail disabled, and the reversal count the app itself reached;
+# regenerate with tests/fixtures/make_debounce_golden.mjs.
+with open(os.path.join(os.path.dirname(__file__), 'fixtures', 'debounce_golden.json'), encoding='utf-8') as f:
+    DEBOUNCE_GOLDEN = json.load(f)
+
+
+@pytest.mark.parametrize('name', sorted(GOLDEN))
+def test_generate_final_results_matches_js(name):
+    case = GOLDEN[name]
+    t, noise = history_arrays(case['history'])
+    result = generate_final_results(t, noise, case['speech_level'])
+    assert compare_results(case['expected'], result) == []
+
+
+def test_score_batch_matches_js():
+    names = sorted(GOLDEN)
+    histories = [history_arrays(GOLDEN[name]['history']) for name in names]
+    t, noise, offsets = flatten_histories(histories)
+    columns = score_batch(t, noise, offsets, [GOLDEN[name]['speech_level'] for name in names])
+    for i, name in enumerate(names):
+        assert compare_results(GOLDEN[name]['expected'], batch_result(columns, i)) == [], name
+
+
+def test_reversal_at_30_seconds_is_ignored():
+    case = GOLDEN['reversal_at_30s_boundary']
+    t, noise = history_arrays(case['history'])
+    # The peak at exactly t = 30 counts for stabilization but not for aHANT
+    assert case['expected']['meta']['stabilization_seconds'] == 30
+    reversal_t, _ = identify_reversal_points(t, noise)
+    assert reversal_t.min() > 30
+    assert 30 in t[local_extrema(noise)]
+
+
+def test_short_test_is_not_rated():
+    expected = GOLDEN['short_test_wide_excursions']['expected']
+    assert expected['meta']['duration_seconds'] < 30
+    assert expected['validity']['stability_status'] == "Insufficient Data (<30s)"
+    assert expected['validity']['aANL'] is None
+
+
+def test_se_needs_four_reversals_after_the_first_three():
+    expected = GOLDEN['few_reversals_for_se']['expected']
+    assert expected['meta']['reversal_count'] - 3 < 4
+    assert expected['validity']['se'] == 0
+    assert np.isfinite(expected['validity']['aANL'])
+
+
+def test_debounce_matches_the_tracking_loop_guardrail():
+    names = sorted(DEBOUNCE_GOLDEN)
+    t, noise, offsets = flatten_histories([history_arrays(DEBOUNCE_GOLDEN[name]['history']) for name in names])
+    _, raw = ragged_reversals(t, noise, offsets, ignore_seconds=None)
+    _, debounced = ragged_reversals(t, noise, offsets, ignore_seconds=None, debounce_seconds=1.0)
+    expected = [DEBOUNCE_GOLDEN[name]['app_reversal_count'] for name in names]
+    np.testing.assert_array_equal(debounced, expected)
+    # Taps inside the guardrail are reversals of the raw path that the app never counted
+    by_name = dict(zip(names, raw - debounced))
+    assert by_name['taps_inside_guardrail'] > 0
+    assert by_name['presses_outside_guardrail'] == 0
@@ -0,0 +1,35 @@
+import json
+
+from batch_reports import render_batch
+
+
+def session(name):
+    history = [{'t': round(0.1 * i, 1), 'noise': 60 + (i % 40 if i % 80 < 40 else 40 - i % 40) / 4}
+               for i in range(400)]
+    result = {
+        'score': {'eANL': 0.9, 'eBNL': 75.9},
+        'validity': {'aANL': 2.6, 'aBNL': 77.6, 'se': 0.11, 'ci95': 0.22, 'stability_status': 'High',
+                     'stability_sd': 0.73, 'avg_excursion_height': 0.6, 'reliability_status': 'High',
+                     'reliability_diff': 0.73, 'stabilization_status': 'High Certainty (Fast Convergence)'},
+        'meta': {'speech_level': 75, 'reversal_count': 9, 'duration_seconds': 39.9, 'stabilization_seconds': 20.6},
+        'mcl': 75, 'bnl': 76, 'history': history
+    }
+    return {'patientName': name, 'testDate': '2024-01-01', 'labelA': 'Unaided', 'labelB': 'Aided',
+            'resultsA': result, 'resultsB': None, 'activeTestId': 'A', 'phase': 'results'}
+
+
+def test_corrupt_file_is_skipped_and_the_batch_finishes(tmp_path):
+    files = []
+    for i in range(3):
+        path = tmp_path / f'ANL_Test_Patient_{i}_2024-01-01.json'
+        path.write_text(json.dumps(session(f'Patient {i}')))
+        files.append(str(path))
+    broken = tmp_path / 'ANL_Test_Broken_2024-01-01.json'
+    broken.write_text(json.dumps(session('Broken'))[:500])
+    files.insert(1, str(broken))
+
+    results = render_batch(files, str(tmp_path / 'reports'), {}, workers=2)
+    assert [path for path, _, _ in results] == files
+    errors = {path: error for path, output, error in results if error}
+    assert list(errors) == [str(broken)] and errors[str(broken)].startswith('JSONDecodeError')
+    assert all(output and output.endswith('.pdf') for path, output, _ in results if path != str(broken))
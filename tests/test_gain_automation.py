@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from gain_automation import db_to_gain, event_starts, gain_curve
+
+
+def sequential_starts(times, targets, time_constants, initial=0.0):
+    """Event-by-event reference for event_starts."""
+    starts = np.empty(len(times))
+    value = initial
+    for k in range(len(times)):
+        if k > 0:
+            tau = time_constants[k - 1]
+            a = np.exp(-(times[k] - times[k - 1]) / tau) if tau > 0 else 0.0
+            value = targets[k - 1] + (value - targets[k - 1]) * a
+        starts[k] = value
+    return starts
+
+
+def sequential_curve(times, targets, time_constants, sample_times, initial=0.0):
+    """Sample-by-sample reference: the value follows the latest event that has started."""
+    curve = np.empty(len(sample_times))
+    k, start = -1, initial
+    for i, ts in enumerate(sample_times):
+        while k + 1 < len(times) and times[k + 1] <= ts:
+            if k >= 0:
+                tau = time_constants[k]
+                a = np.exp(-(times[k + 1] - times[k]) / tau) if tau > 0 else 0.0
+                start = targets[k] + (start - targets[k]) * a
+            k += 1
+        if k < 0:
+            curve[i] = initial
+        else:
+            tau = time_constants[k]
+            a = np.exp(-(ts - times[k]) / tau) if tau > 0 else 0.0
+            curve[i] = targets[k] + (start - targets[k]) * a
+    return curve
+
+
+def random_events(n, seed=0):
+    """Tracking-like events: 0.1 s ticks with jitter, levels across the full range, mixed time constants."""
+    rng = np.random.default_rng(seed)
+    times = np.cumsum(rng.uniform(0.05, 0.15, n))
+    targets = db_to_gain(rng.uniform(-100, 0, n))
+    time_constants = rng.choice([0.0, 0.05, 0.1], n)
+    return times, targets, time_constants
+
+
+def test_single_step_matches_analytic_response():
+    t = np.linspace(0, 1, 44101)
+    curve = gain_curve([0.0], [1.0], [0.05], t)
+    np.testing.assert_allclose(curve, 1 - np.exp(-t / 0.05), rtol=0, atol=1e-12)
+
+
+def test_repeated_target_continues_the_segment():
+    t = np.linspace(0, 1, 44101)
+    curve = gain_curve(np.array([0.0, 0.3, 0.7]), [1.0, 1.0, 1.0], [0.1, 0.1, 0.1], t)
+    np.testing.assert_allclose(curve, 1 - np.exp(-t / 0.1), rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('n_events', [1, 2, 3, 1000, 4097])
+def test_doubling_scan_matches_event_loop(n_events):
+    times, targets, time_constants = random_events(n_events)
+    np.testing.assert_allclose(event_starts(times, targets, time_constants),
+                               sequential_starts(times, targets, time_constants), rtol=0, atol=1e-12)
+
+
+def test_gain_curve_matches_sample_loop():
+    times, targets, time_constants = random_events(50, seed=1)
+    sample_times = np.arange(int(times[-1] * 8000) + 400) / 8000
+    np.testing.assert_allclose(gain_curve(times, targets, time_constants, sample_times, initial=0.25),
+                               sequential_curve(times, targets, time_constants, sample_times, initial=0.25),
+                               rtol=0, atol=1e-12)
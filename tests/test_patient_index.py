@@ -0,0 +1,31 @@
+import json
+
+from anl_scoring import normalize_patient
+from patient_index import connect, patient_history, update_index
+
+
+def session(name, date):
+    history = [{'t': 0, 'noise': 60}, {'t': 0.1, 'noise': 61}]
+    return {'patientName': name, 'testDate': date, 'labelA': 'Aided',
+            'resultsA': {'history': history, 'score': {'eANL': 5}}}
+
+
+def test_patient_keys_ignore_case_accents_and_underscores():
+    assert normalize_patient('José_  GARCÍA') == normalize_patient('jose garcia') == 'jose garcia'
+
+
+def test_update_indexes_bundles_and_skips_bad_files(tmp_path):
+    (tmp_path / 'ANL_Test_Jose_Garcia_2024-01-01.json').write_text(json.dumps(session('José García', '2024-01-01')))
+    bundle = tmp_path / 'exports' / 'clinic.jsonl'
+    bundle.parent.mkdir()
+    bundle.write_text('\n'.join(json.dumps(session('JOSE GARCIA', d)) for d in ('2024-02-01', '2024-03-01')))
+    bad = tmp_path / 'ANL_Test_Broken_2024-01-01.json'
+    bad.write_text('{"patientName": "Broken", "resultsA": {"history": [')
+
+    conn = connect(str(tmp_path / 'index.sqlite'))
+    indexed, removed, errors = update_index(conn, [str(tmp_path)], workers=1)
+    assert (indexed, removed) == (2, 0)
+    assert [path for path, _ in errors] == [str(bad)]
+    assert [row['test_date'] for row in patient_history(conn, 'jose garcia')] == ['2024-01-01', '2024-02-01',
+                                                                                  '2024-03-01']
+    conn.close()
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from render_session import DB_OFFSET, NOISE_TIME_CONSTANT, SPEECH_TIME_CONSTANT, render, volume_to_gain
+from test_gain_automation import sequential_curve
+
+SAMPLE_RATE = 8000
+LEVEL = 0.5
+
+
+@pytest.fixture
+def constant_assets(tmp_path):
+    """Speech and babble files holding a constant level, so the rendered channels are the gain curves."""
+    speech, noise = tmp_path / 'speech.flac', tmp_path / 'babble.flac'
+    sf.write(speech, np.full(3 * SAMPLE_RATE, LEVEL), SAMPLE_RATE, subtype='PCM_24')
+    sf.write(noise, np.full(7 * SAMPLE_RATE, LEVEL), SAMPLE_RATE, subtype='PCM_24')
+    return str(speech), str(noise)
+
+
+@pytest.mark.parametrize('swap_channels', [False, True])
+def test_rendered_gains_match_sample_loop(tmp_path, constant_assets, swap_channels):
+    # 15 s of 0.1 s ticks (crossing a 10 s render block), with a silent stretch below -100 dB
+    t = np.round(np.arange(151) * 0.1, 1)
+    noise = 60 + 10 * np.sin(t)
+    noise[40:50] = -10
+    result = {'meta': {'speech_level': 75},
+              'history': [{'t': a, 'noise': b} for a, b in zip(t.tolist(), noise.tolist())]}
+    output = str(tmp_path / 'render.flac')
+    render(result, *constant_assets, output, swap_channels=swap_channels, noise_offset=-3.0)
+
+    audio, sample_rate = sf.read(output)
+    assert sample_rate == SAMPLE_RATE and len(audio) == 15 * SAMPLE_RATE
+    sample_times = np.arange(len(audio)) / SAMPLE_RATE
+    speech_gain = sequential_curve([0.0], volume_to_gain([75 - DB_OFFSET]), [SPEECH_TIME_CONSTANT], sample_times)
+    noise_gain = sequential_curve(t, volume_to_gain(noise - DB_OFFSET, -3.0), np.full(len(t), NOISE_TIME_CONSTANT),
+                                  sample_times)
+    speech_channel, noise_channel = (0, 1) if swap_channels else (1, 0)
+    # 24-bit output: one quantisation step is about 1.2e-7
+    np.testing.assert_allclose(audio[:, speech_channel], LEVEL * speech_gain, rtol=0, atol=2e-7)
+    np.testing.assert_allclose(audio[:, noise_channel], LEVEL * noise_gain, rtol=0, atol=2e-7)
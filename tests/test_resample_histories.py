@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from resample_histories import tick_intervals, timing_stats
+from timing_diagnostics import diagnose
+
+
+def steady_session(seconds=120, frame_rate=60):
+    """A history recorded on a perfectly steady display: a tick every 6th 60 Hz frame."""
+    frames = np.arange(0, seconds * frame_rate + 1, 6)
+    # App timestamps are whole milliseconds, starting with the t = 0 start point
+    t = np.round(frames * 1000 / frame_rate) / 1000
+    noise = 60 + 0.1 * np.arange(len(t)) % 5
+    return t, noise
+
+
+def test_steady_cadence_has_no_jitter():
+    t, noise = steady_session()
+    offsets = np.array([0, len(t)])
+    stats = timing_stats(t, offsets)
+    assert stats['mean_interval_ms'][0] == pytest.approx(100.0)
+    assert stats['jitter_ms'][0] == pytest.approx(0.0, abs=1e-6)
+    assert stats['dropped_ticks'][0] == 0
+    assert stats['skipped_ticks'][0] == 0
+
+    diagnostics = diagnose(t, noise, offsets)
+    assert diagnostics['step_rate_error'][0] == pytest.approx(0.0, abs=1e-9)
+    assert diagnostics['long_frame_fraction'][0] == 0
+
+
+def test_intervals_start_at_the_second_point():
+    t = np.array([0.0, 0.1, 0.3, 0.2, 0.3])
+    offsets = np.array([0, 3, 5])
+    interval = tick_intervals(t, offsets)
+    # The t = 0 start point has no interval; a session starting later is timed from 0
+    assert np.isnan(interval[0])
+    np.testing.assert_allclose(interval[1:], [0.1, 0.2, 0.2, 0.1])
+
+    stats = timing_stats(t, offsets)
+    np.testing.assert_array_equal(stats['dropped_ticks'], [1, 1])
+    np.testing.assert_array_equal(stats['skipped_ticks'], [1, 1])